@@ -0,0 +1,54 @@
+"""Measures how GVmage scales with the length of a measurement.
+
+Run from the root of the repository:
+
+    python -m benchmarks.bench_mage
+
+Prints the time of one MAGE calculation and the time per record
+for measurements from one day up to one year of 5 minute data.
+Time per record staying flat means MAGE scales linearly.
+
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from glyculator.Index import GVmage
+from glyculator.configs import CalcConfig
+from glyculator.utils import DT, GLUCOSE
+
+
+INTERVAL = 5
+RECORDS_PER_DAY = 24 * 60 // INTERVAL
+DAYS = [1, 7, 30, 90, 180, 365]
+
+
+def _measurement(records: int, seed: int = 0) -> pd.DataFrame:
+    random_state = np.random.RandomState(seed)
+    minutes = np.arange(records) * INTERVAL
+    glucose = 140 + 50 * np.sin(minutes * 2 * np.pi / 180) + random_state.normal(0, 10, records)
+    return pd.DataFrame({
+        DT : pd.date_range("2020/01/01", periods=records, freq="{}min".format(INTERVAL)),
+        GLUCOSE : glucose,
+    })
+
+
+def run(days: list = DAYS, repeats: int = 3) -> list:
+    index = GVmage(calc_config=CalcConfig(interval=INTERVAL))
+    results = []
+    for day_count in days:
+        df = _measurement(day_count * RECORDS_PER_DAY)
+        times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            index(df)
+            times.append(time.perf_counter() - start)
+        results.append((day_count, len(df), min(times)))
+    return results
+
+
+if __name__ == "__main__":
+    print("{:>6} {:>10} {:>12} {:>16}".format("days", "records", "seconds", "us per record"))
+    for day_count, records, seconds in run():
+        print("{:>6} {:>10} {:>12.4f} {:>16.3f}".format(day_count, records, seconds, seconds / records * 1e6))
@@ -0,0 +1,337 @@
+"""Benchmark suite of reading, cleaning, date fixing and every index.
+
+Run from the root of the repository:
+
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --output results.json --baseline baseline.json
+
+Every benchmark is run `--repeats` times and the fastest and the median
+time are written to a JSON file together with the versions of Python,
+numpy and pandas. With `--baseline`, the fastest times are compared with
+a previous JSON file and the process exits with 1 if any benchmark got
+slower by more than `--tolerance` (and by more than `--min-difference` seconds).
+
+`--quick` limits the recordings to 1 and 7 days. `--filter` runs only
+the benchmarks, which names contain the given text.
+
+Benchmarks of the date fixing model are reported as skipped when the
+model can not be set up, e.g. when its weights are missing.
+
+Flagger benchmarks time the grid flagger and the Cleaner5 date fixing
+model on synthetic recordings and store their agreement with the ground
+truth of SyntheticCGM (and with each other) under "metrics".
+
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import statistics
+
+import numpy as np
+import pandas as pd
+
+from glyculator.__version__ import __version__
+from glyculator.FileReader import FileReader
+from glyculator.FileCleaner import FileCleaner
+from glyculator.DateFixer import DateFixer
+from glyculator.GridFlagger import align_to_grid
+from glyculator.Synthetic import SyntheticCGM, score_flags
+from glyculator.Index import INDICES_TO_CALC
+from glyculator.configs import ReadConfig, CleanConfig, CalcConfig
+from glyculator.utils import DT, GLUCOSE, UNIT_INDEX_KWARGS
+import glyculator.cleaner.ModelRegistry as ModelRegistry
+
+
+DAYS = [1, 7, 30, 90, 365]
+QUICK_DAYS = [1, 7]
+INTERVALS = [5, 15]
+
+EXCEL_EXAMPLE = os.path.join("tests", "test_files", "excel-example1.xlsx")
+
+
+class Skip(Exception):
+    """Raised by a benchmark setup, which can not run in this environment."""
+
+
+class Benchmark():
+    """A timed call.
+
+    Attributes:
+        name (str):
+            unique name of the benchmark
+        setup (callable):
+            called once before timing, returns the timed callable
+        metrics (callable):
+            called with the return value of the last timed call,
+            returns a dict stored with the results, or None
+        params (dict):
+            parameters of the benchmark stored with its results
+
+    """
+    def __init__(self, name: str, setup, metrics=None, **params):
+        self.name = name
+        self.setup = setup
+        self.metrics = metrics
+        self.params = params
+
+    def run(self, repeats: int) -> dict:
+        result = {"name" : self.name, "params" : self.params}
+        try:
+            function = self.setup()
+        except Skip as e:
+            result["skipped"] = str(e)
+            return result
+
+        times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            returned = function()
+            times.append(time.perf_counter() - start)
+        result["min"] = min(times)
+        result["median"] = statistics.median(times)
+        result["repeats"] = repeats
+        if(self.metrics is not None):
+            result["metrics"] = self.metrics(returned)
+        return result
+
+
+def measurement(days: int, interval: int, seed: int = 0) -> pd.DataFrame:
+    """Synthetic measurement with a daily rhythm, noise and 1% missing values."""
+    random_state = np.random.RandomState(seed)
+    records = days * 24 * 60 // interval
+    minutes = np.arange(records) * interval
+    glucose = np.round(140 + 50 * np.sin(minutes * 2 * np.pi / (24 * 60)) + random_state.normal(0, 20, records))
+    glucose = np.clip(glucose, 40, 400)
+    glucose[random_state.choice(records, records // 100, replace=False)] = np.nan
+    return pd.DataFrame({
+        DT : pd.date_range("2020/01/01", periods=records, freq="{}min".format(interval)),
+        GLUCOSE : glucose,
+    })
+
+
+def _write_csv(df: pd.DataFrame, directory: str) -> str:
+    """Writes a measurement in the layout of tests/test_files/csv-example1.csv.
+
+    Missing readings are left out of the file, like in CGM exports.
+
+    """
+    df = df.dropna()
+    file_name = os.path.join(directory, "benchmark-{}.csv".format(len(df)))
+    with open(file_name, "w") as f:
+        f.write("ID\t\t\t\ndt\tglucose\tdate\ttime\n")
+        for date, glucose in zip(df[DT].dt.strftime("%d/%m/%Y %H:%M"), df[GLUCOSE]):
+            f.write("{}\t{}\t\t\n".format(date, int(glucose)))
+    return file_name
+
+
+def _local_model(clean_config: CleanConfig):
+    try:
+        return ModelRegistry.get_model(ModelRegistry.BACKEND_MODELS[clean_config.model_backend])
+    except Exception as e:
+        raise Skip("model could not be set up: {}".format(e))
+
+
+def reader_benchmarks(days: list, directory: str) -> list:
+    read_config = ReadConfig(header_skip=2, date_time_column=0, glucose_values_column=1)
+    benchmarks = []
+    for day_count in days:
+        for columnar in [False, True]:
+            def setup(day_count=day_count, columnar=columnar):
+                file_name = _write_csv(measurement(day_count, 5), directory)
+                reader = FileReader(file_name, read_config=read_config, columnar=columnar)
+                return reader.read_file
+            benchmarks.append(Benchmark(
+                "FileReader.read_file[csv,days={},columnar={}]".format(day_count, columnar), setup,
+                days=day_count, columnar=columnar))
+
+    def excel_setup():
+        if(not os.path.isfile(EXCEL_EXAMPLE)):
+            raise Skip("{} not found".format(EXCEL_EXAMPLE))
+        reader = FileReader(EXCEL_EXAMPLE, read_config=ReadConfig(header_skip=2, date_time_column=0, glucose_values_column=1))
+        return reader.read_file
+    benchmarks.append(Benchmark("FileReader.read_file[xlsx,example]", excel_setup, file=EXCEL_EXAMPLE))
+    return benchmarks
+
+
+def cleaner_benchmarks(days: list) -> list:
+    benchmarks = []
+    for backend in ModelRegistry.BACKEND_MODELS:
+        clean_config = CleanConfig(interval=5, use_api=False, model_backend=backend)
+        for day_count in days:
+            dates = measurement(day_count, 5)[DT]
+
+            def tidy_setup(dates=dates, clean_config=clean_config):
+                _local_model(clean_config)
+                df = pd.DataFrame({DT : dates, GLUCOSE : np.full(len(dates), 100.0)})
+                return lambda: FileCleaner(df.copy(), clean_config).tidy()
+
+            def prepare_setup(dates=dates, clean_config=clean_config):
+                return lambda: DateFixer(clean_config)._prepare_windows(dates)
+
+            def predict_setup(dates=dates, clean_config=clean_config):
+                _local_model(clean_config)
+                date_fixer = DateFixer(clean_config)
+                # Repeats would be answered from the cache of predictions
+                date_fixer.prediction_cache = None
+                forward, reverse = date_fixer._prepare_windows(dates)
+                return lambda: date_fixer._predict_unique(
+                    *date_fixer._unique_windows(forward, reverse), predict=date_fixer._predict_local)
+
+            def merge_setup(dates=dates, clean_config=clean_config):
+                date_fixer = DateFixer(clean_config)
+                probabilities = np.random.RandomState(0).uniform(size=len(dates) - date_fixer.variables_no_model)
+                return lambda: date_fixer._probas_to_predictions(
+                    date_fixer._merge_metronome_probabilities(probabilities, probabilities))
+
+            params = {"days" : day_count, "backend" : backend}
+            suffix = "[backend={},days={}]".format(backend, day_count)
+            benchmarks.append(Benchmark("FileCleaner.tidy" + suffix, tidy_setup, **params))
+            benchmarks.append(Benchmark("DateFixer.predict" + suffix, predict_setup, **params))
+            # Stages without the model do not depend on the backend
+            if(backend == "tensorflow"):
+                suffix = "[days={}]".format(day_count)
+                benchmarks.append(Benchmark("DateFixer.prepare" + suffix, prepare_setup, days=day_count))
+                benchmarks.append(Benchmark("DateFixer.merge" + suffix, merge_setup, days=day_count))
+    return benchmarks
+
+
+def flagger_benchmarks(days: list) -> list:
+    benchmarks = []
+    for day_count in days:
+        df = SyntheticCGM(interval=5, seed=0).generate(days=day_count)
+        for backend in ModelRegistry.BACKEND_MODELS:
+            def model_setup(df=df, clean_config=CleanConfig(interval=5, use_api=False, model_backend=backend)):
+                _local_model(clean_config)
+                date_fixer = DateFixer(clean_config)
+                date_fixer.prediction_cache = None
+                return lambda: date_fixer(df[DT])
+            benchmarks.append(Benchmark("Flagger.model[backend={},days={}]".format(backend, day_count), model_setup,
+                metrics=lambda flags, df=df: score_flags(flags, df), days=day_count, backend=backend))
+
+        def grid_metrics(flags, df=df):
+            metrics = score_flags(flags, df)
+            clean_config = CleanConfig(interval=5, use_api=False)
+            try:
+                _local_model(clean_config)
+            except Skip:
+                return metrics
+            model_flags = np.asarray(DateFixer(clean_config)(df[DT]), dtype=bool)
+            metrics["Agreement with model"] = float(np.mean(flags == model_flags))
+            return metrics
+        # The grid flagger does not use a model backend
+        benchmarks.append(Benchmark("Flagger.grid[days={}]".format(day_count),
+            lambda df=df: lambda: align_to_grid(df[DT], 5), metrics=grid_metrics, days=day_count))
+    return benchmarks
+
+
+def index_benchmarks(days: list) -> list:
+    benchmarks = []
+    for interval in INTERVALS:
+        calc_config = CalcConfig(interval=interval)
+        for day_count in days:
+            df = measurement(day_count, interval)
+            for name, index_class in INDICES_TO_CALC.items():
+                def setup(df=df, index_class=index_class, name=name, calc_config=calc_config):
+                    index = index_class(calc_config=calc_config)
+                    kwargs = UNIT_INDEX_KWARGS[calc_config.unit].get(name, {})
+                    # Some indices modify the dataframe
+                    return lambda: index(df.copy(), **kwargs)
+                benchmarks.append(Benchmark(
+                    "{}[interval={},days={}]".format(name, interval, day_count), setup,
+                    index=name, interval=interval, days=day_count))
+    return benchmarks
+
+
+def run_suite(days: list = DAYS, repeats: int = 3, name_filter: str = None) -> dict:
+    directory = tempfile.mkdtemp()
+    try:
+        benchmarks = reader_benchmarks(days, directory) + cleaner_benchmarks(days) + flagger_benchmarks(days) + \
+            index_benchmarks(days)
+        if(name_filter is not None):
+            benchmarks = [benchmark for benchmark in benchmarks if name_filter in benchmark.name]
+
+        results = []
+        for benchmark in benchmarks:
+            result = benchmark.run(repeats)
+            results.append(result)
+            if("skipped" in result):
+                print("{:<70} skipped: {}".format(benchmark.name, result["skipped"]))
+            else:
+                print("{:<70} {:>10.4f}s".format(benchmark.name, result["min"]))
+                for key, value in result.get("metrics", {}).items():
+                    print("    {}: {}".format(key, value))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    return {
+        "metadata" : {
+            "glyculator" : __version__,
+            "python" : platform.python_version(),
+            "numpy" : np.__version__,
+            "pandas" : pd.__version__,
+            "machine" : platform.machine(),
+            "created" : time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results" : results,
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float = 0.2, min_difference: float = 0.001) -> list:
+    """Compares the fastest times of benchmarks present in both results.
+
+    A benchmark regressed if it got slower by more than tolerance
+    and by more than min_difference seconds, so the noise of
+    sub-millisecond benchmarks is not reported.
+
+    Returns:
+        list:
+            (name, baseline seconds, current seconds, ratio, regressed) tuples
+
+    """
+    baseline_times = {result["name"] : result["min"] for result in baseline["results"] if "min" in result}
+    comparison = []
+    for result in results["results"]:
+        if("min" in result and result["name"] in baseline_times):
+            before, after = baseline_times[result["name"]], result["min"]
+            regressed = after / before > 1 + tolerance and after - before > min_difference
+            comparison.append((result["name"], before, after, after / before, regressed))
+    return comparison
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Runs the glyculator benchmark suite.")
+    parser.add_argument("--output", default="benchmark-results.json", help="JSON file for the results")
+    parser.add_argument("--baseline", help="JSON file with results to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown")
+    parser.add_argument("--min-difference", type=float, default=0.001,
+        help="slowdowns smaller than this many seconds are ignored")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--filter", dest="name_filter", help="run benchmarks with names containing this text")
+    parser.add_argument("--quick", action="store_true", help="only 1 and 7 day recordings")
+    args = parser.parse_args(argv)
+
+    results = run_suite(QUICK_DAYS if args.quick else DAYS, args.repeats, args.name_filter)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    if(args.baseline is None):
+        return 0
+
+    with open(args.baseline, "r") as f:
+        baseline = json.load(f)
+    comparison = compare(results, baseline, args.tolerance, args.min_difference)
+    regressions = 0
+    print("\n{:<70} {:>10} {:>10} {:>8}".format("benchmark", "baseline", "current", "ratio"))
+    for name, before, after, ratio, regressed in comparison:
+        regressions = regressions + regressed
+        print("{:<70} {:>10.4f} {:>10.4f} {:>8.2f}{}".format(name, before, after, ratio, " SLOWER" if regressed else ""))
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+import logging
+import typing
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from .utils import DT, GLUCOSE
+
+
+MINUTES_PER_DAY = 24 * 60
+
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def day_slot_matrix(df: pd.DataFrame, interval: int) -> typing.Tuple[np.ndarray, pd.DatetimeIndex]:
+    """Rearranges glucose values into a days x time-of-day slots matrix.
+
+    Every reading is placed in the slot of its time of day rounded down
+    to interval minutes. Slots without a reading are NaN. Meant for the
+    regular grid returned by FileCleaner, where every slot has at most
+    one reading; otherwise the last reading of a slot is kept.
+
+    Arguments:
+        df (pandas.DataFrame):
+            dataframe with DT and GLUCOSE columns
+        interval (int):
+            length of a slot in minutes
+
+    Returns:
+        tuple:
+            numpy.ndarray of shape (days, 1440 / interval)
+            and pandas.DatetimeIndex of the days
+
+    """
+    dates = pd.DatetimeIndex(df[DT])
+    glucose = np.asarray(df[GLUCOSE], dtype=np.float64)
+    days = dates.normalize()
+    first_day = days.min()
+
+    rows = ((days - first_day) // pd.Timedelta(days=1)).values.astype(np.int64)
+    columns = (((dates - days) // pd.Timedelta(minutes=1)).values // interval).astype(np.int64)
+
+    n_days = int(rows.max()) + 1 if len(rows) else 0
+    matrix = np.full((n_days, MINUTES_PER_DAY // interval), np.nan)
+    matrix[rows, columns] = glucose
+    return matrix, pd.date_range(first_day, periods=n_days, freq="D")
+
+
+class AGP():
+    """Ambulatory Glucose Profile.
+
+    Percentiles of glucose values in every time-of-day slot across
+    all days of a measurement, e.g. 288 slots for 5 minute readings.
+
+    Attributes:
+        interval (int):
+            length of a time-of-day slot in minutes
+        percentiles (tuple):
+            percentiles calculated for every slot
+
+    """
+    __attrs__ = [
+        "interval", "percentiles"
+    ]
+
+    def __init__(self, interval: int = 5, percentiles: typing.Iterable[float] = DEFAULT_PERCENTILES) -> None:
+        if(type(interval) != int or interval <= 0 or MINUTES_PER_DAY % interval != 0):
+            raise ValueError("interval must be a positive int dividing a day into slots")
+        percentiles = tuple(percentiles)
+        if(not percentiles or any(percentile < 0 or percentile > 100 for percentile in percentiles)):
+            raise ValueError("percentiles must be between 0 and 100")
+
+        self.interval = interval
+        self.percentiles = percentiles
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def slots(self) -> int:
+        return MINUTES_PER_DAY // self.interval
+
+    def slot_times(self) -> pd.TimedeltaIndex:
+        """Time of day of the start of every slot."""
+        return pd.timedelta_range(start=0, periods=self.slots, freq="{}min".format(self.interval))
+
+    def calculate(self, df: pd.DataFrame) -> np.ndarray:
+        """Calculates the profile.
+
+        All the percentiles are calculated in a single nanpercentile call.
+
+        Arguments:
+            df (pandas.DataFrame):
+                dataframe with DT and GLUCOSE columns
+
+        Returns:
+            numpy.ndarray:
+                float32 array of shape (len(percentiles), slots).
+                NaN for slots without readings.
+
+        Raises:
+            ValueError:
+                if df is not a pandas.DataFrame
+
+        """
+        if(type(df) != pd.DataFrame):
+            raise ValueError("df must be a pandas.DataFrame")
+
+        matrix, _ = day_slot_matrix(df, self.interval)
+        if(len(matrix) == 0):
+            return np.full((len(self.percentiles), self.slots), np.nan, dtype=np.float32)
+
+        # Slots without any reading give an all-NaN slice warning
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", category=RuntimeWarning)
+            profile = np.nanpercentile(matrix, self.percentiles, axis=0)
+
+        self.logger.debug("AGP - calculate - return shape: {}".format(profile.shape))
+        return profile.astype(np.float32)
+
+    def to_frame(self, profile: np.ndarray) -> pd.DataFrame:
+        """Labels a profile with slot times and percentiles."""
+        return pd.DataFrame(profile.T, index=self.slot_times(), columns=list(self.percentiles))
+
+    def __call__(self, df: pd.DataFrame) -> np.ndarray:
+        return self.calculate(df)
@@ -0,0 +1,620 @@
+import logging
+import functools
+import typing
+
+import numpy as np
+import pandas as pd
+
+from .utils import GLUCOSE, UNIT_INDEX_KWARGS
+from .configs import CalcConfig
+from .Index import INDICES_TO_CALC, GVmage
+from .Episodes import find_episodes
+from .Lags import lagged_differences
+from .Histogram import GlucoseHistogram, HISTOGRAM_INDICES, is_histogrammable
+from .ResultCache import ResultCache, result_key
+from .Compact import CompactRecording
+from . import Formulas
+
+
+def _shared(func):
+    """Caches the result of an Intermediates property.
+
+    The decorated method is evaluated at most once per Intermediates
+    object. Subsequent accesses return the stored value.
+
+    """
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(self):
+        if(name not in self._cache):
+            self._cache[name] = func(self)
+            self.computed.append(name)
+        return self._cache[name]
+
+    return property(wrapper)
+
+
+class Intermediates():
+    """Values shared between glycemic variability indices of one measurement.
+
+    Every value is computed lazily on the first access and stored,
+    so indices evaluated on the same Intermediates object never
+    repeat the same reduction. Intermediates, which depend on an
+    argument (a threshold or a lag), are methods cached per argument.
+
+    Attributes:
+        glucose (numpy.ndarray):
+            glucose values as float64
+        calc_config (CalcConfig):
+            configuration for calculations
+        custom (dict):
+            name - (function, requirements) pairs of intermediates
+            registered in an IndexScheduler
+        computed (list):
+            keys of the intermediates in the order they were computed
+
+    """
+    # Intermediates every built-in intermediate is computed from
+    DEPENDENCIES = {
+        "length" : (),
+        "valid" : (),
+        "valid_count" : ("valid", ),
+        "valid_values" : ("valid", ),
+        "mean" : (),
+        "var" : ("valid_values", "mean"),
+        "std" : ("var", ),
+        "mmol" : (),
+        "log10" : (),
+        "grade" : ("mmol", ),
+        "risk" : ("log10", ),
+        "smoothed" : ("mean", ),
+        "extrema" : ("smoothed", ),
+        "below" : (),
+        "above" : (),
+        "lagged" : (),
+        "episodes_below" : (),
+    }
+
+    def __init__(self, glucose: typing.Union[pd.Series, np.ndarray], calc_config: CalcConfig,
+        custom: dict = None) -> None:
+        self.glucose = np.asarray(glucose, dtype=np.float64)
+        self.calc_config = calc_config
+        self.custom = {} if custom is None else custom
+        self.computed = []
+        self._cache = {}
+
+    def get(self, key: typing.Union[str, tuple]):
+        """Returns an intermediate by its key.
+
+        Arguments:
+            key (str or tuple):
+                name of the intermediate or a (name, argument) tuple
+
+        Raises:
+            ValueError:
+                if there is no such intermediate
+
+        """
+        name, arguments = (key, ()) if isinstance(key, str) else (key[0], tuple(key[1:]))
+        if(name in self.custom):
+            if(key not in self._cache):
+                self._cache[key] = self.custom[name][0](self, *arguments)
+                self.computed.append(key)
+            return self._cache[key]
+        if(name not in self.DEPENDENCIES):
+            raise ValueError("Unknown intermediate: {}".format(name))
+        value = getattr(self, name)
+        return value(*arguments) if arguments else value
+
+    def _cached(self, key: tuple, function):
+        if(key not in self._cache):
+            self._cache[key] = function()
+            self.computed.append(key)
+        return self._cache[key]
+
+    @_shared
+    def length(self) -> int:
+        return len(self.glucose)
+
+    @_shared
+    def valid(self) -> np.ndarray:
+        return np.invert(np.isnan(self.glucose))
+
+    @_shared
+    def valid_count(self) -> int:
+        return int(np.sum(self.valid))
+
+    @_shared
+    def valid_values(self) -> np.ndarray:
+        return self.glucose[self.valid]
+
+    @_shared
+    def mean(self) -> float:
+        return np.nanmean(self.glucose)
+
+    @_shared
+    def var(self) -> float:
+        return np.mean(np.power(self.valid_values - self.mean, 2))
+
+    @_shared
+    def std(self) -> float:
+        return np.sqrt(self.var)
+
+    @_shared
+    def mmol(self) -> np.ndarray:
+        """Glucose values in mmol/l"""
+        return Formulas.to_mmol(self.glucose, self.calc_config.unit)
+
+    @_shared
+    def log10(self) -> np.ndarray:
+        """Logarithm of glucose values, NaN for non-positive values"""
+        return Formulas.log10(self.glucose)
+
+    @_shared
+    def grade(self) -> np.ndarray:
+        """GRADE score of every glucose value"""
+        return Formulas.grade(self.mmol)
+
+    @_shared
+    def risk(self) -> np.ndarray:
+        """Symmetrized glucose scale used by LBGI and HBGI"""
+        return Formulas.risk(self.log10)
+
+    @_shared
+    def smoothed(self) -> np.ndarray:
+        """Glucose values smoothed for MAGE"""
+        return GVmage(calc_config=self.calc_config)._smooth(pd.Series(self.glucose), self.mean)
+
+    @_shared
+    def extrema(self) -> list:
+        """Positions of alternating extremas of smoothed glucose values"""
+        return GVmage(calc_config=self.calc_config)._extremas(self.smoothed)
+
+    def below(self, threshold: float) -> np.ndarray:
+        """Boolean mask of valid glucose values below threshold"""
+        return self._cached(("below", threshold), lambda: Formulas.below(self.glucose, threshold))
+
+    def above(self, threshold: float) -> np.ndarray:
+        """Boolean mask of valid glucose values above threshold"""
+        return self._cached(("above", threshold), lambda: Formulas.above(self.glucose, threshold))
+
+    def lagged(self, lag: int) -> np.ndarray:
+        """Differences between glucose values lag minutes apart"""
+        return self._cached(("lagged", lag),
+            lambda: lagged_differences(self.glucose, self.calc_config.interval, [lag])[lag])
+
+    def episodes_below(self, threshold: float) -> pd.DataFrame:
+        """Hypoglycemic episodes of glucose values below threshold"""
+        return self._cached(("episodes_below", threshold),
+            lambda: find_episodes(self.glucose, self.calc_config.interval, hypo_thresholds=[threshold]))
+
+
+def _m100(shared: Intermediates) -> float:
+    return np.nanmean(Formulas.m100(shared.log10, shared.calc_config.unit))
+
+
+def _mage(shared: Intermediates) -> float:
+    return GVmage(calc_config=shared.calc_config)._excursions(shared.smoothed, shared.extrema, shared.std)
+
+
+def _modd(shared: Intermediates) -> float:
+    return np.nanmean(shared.lagged(24 * 60))
+
+
+def _conga(shared: Intermediates, hours: int) -> float:
+    return np.nanvar(shared.lagged(Formulas.check_hours(hours) * 60))
+
+
+def _hypoglycemia(shared: Intermediates, threshold: float) -> float:
+    Formulas.check_threshold(threshold)
+    return np.sum(shared.below(threshold)) / shared.valid_count
+
+
+def _hyperglycemia(shared: Intermediates, threshold: float) -> float:
+    Formulas.check_threshold(threshold)
+    return np.sum(shared.above(threshold)) / shared.valid_count
+
+
+def _grade_fraction(shared: Intermediates, mask: np.ndarray) -> float:
+    return np.nansum(shared.grade[mask]) / np.nansum(shared.grade)
+
+
+def _bgi(shared: Intermediates, low: bool) -> float:
+    return np.nanmean(Formulas.bgi(shared.risk, low))
+
+
+def _auc(shared: Intermediates, standardize: bool = True) -> float:
+    return Formulas.auc(np.trapz(shared.glucose, dx=shared.calc_config.interval), shared.length, standardize)
+
+
+def _hypo_events_count(shared: Intermediates, threshold: float, threshold_duration: int = 15) -> int:
+    Formulas.check_threshold(threshold)
+    if(type(threshold_duration) != int):
+        raise ValueError("hypo_event_records_threshold_duration must be int")
+    records = shared.episodes_below(threshold)["records"]
+    return int(np.sum(records >= threshold_duration / shared.calc_config.interval))
+
+
+def _time_in_hypo(shared: Intermediates, threshold: typing.Union[int, float]) -> float:
+    Formulas.check_threshold(threshold)
+    return np.sum(shared.below(threshold)) * shared.calc_config.interval
+
+
+def _mean_hypo_event_duration(shared: Intermediates, threshold: float, records_duration: int = 15) -> float:
+    Formulas.check_threshold(threshold)
+    if(type(records_duration) != int):
+        raise ValueError("records_duration")
+    episodes = shared.episodes_below(threshold)
+    durations = episodes["duration"][episodes["records"] >= records_duration / shared.calc_config.interval]
+    if(len(durations)):
+        return np.mean(durations)
+    else:
+        return 0
+
+
+def _time_in_range(shared: Intermediates, lower_bound: float = None, upper_bound: float = None) -> float:
+    lower_bound, upper_bound = Formulas.time_in_range_bounds(shared.calc_config, lower_bound, upper_bound)
+    in_range = shared.above(lower_bound) & shared.below(upper_bound)
+    return np.sum(in_range) / shared.valid_count
+
+
+# Checks of arguments, which FUSED_INDICES evaluators run themselves.
+# Run before the evaluators of HISTOGRAM_INDICES, so both paths reject the same arguments.
+ARGUMENT_CHECKS = {
+    "Hypoglycemia fraction" : lambda threshold: Formulas.check_threshold(threshold),
+    "Hyperglycemia fraction" : lambda threshold: Formulas.check_threshold(threshold),
+    "Time in hypoglycemia" : lambda threshold: Formulas.check_threshold(threshold),
+    "Time in range" : lambda lower_bound=None, upper_bound=None: Formulas.check_bounds(
+        lower_bound if lower_bound is not None else 0, upper_bound if upper_bound is not None else 0),
+}
+
+
+# Evaluators of INDICES_TO_CALC entries working on shared Intermediates
+FUSED_INDICES = {
+    "Mean" : lambda shared: shared.mean,
+    "Median" : lambda shared: np.median(shared.valid_values) if shared.valid_count else np.nan,
+    "Variance" : lambda shared: shared.var,
+    "CV" : lambda shared: shared.std / shared.mean,
+    "Missing values" : lambda shared: (shared.length - shared.valid_count) / shared.length,
+    "Total time points No" : lambda shared: shared.length,
+    "Standard deviation" : lambda shared: shared.std,
+    "M100" : _m100,
+    "J-index" : lambda shared: Formulas.j_index(shared.mean, shared.std),
+    "MAGE" : _mage,
+    "MODD" : _modd,
+    "CONGA" : _conga,
+    "Hypoglycemia fraction" : _hypoglycemia,
+    "Hyperglycemia fraction" : _hyperglycemia,
+    "GRADE" : lambda shared: np.nanmean(shared.grade),
+    "GRADE hypoglycemia" : lambda shared: _grade_fraction(shared, Formulas.below(shared.mmol, Formulas.GRADE_HYPO_MMOL)),
+    "GRADE hyperglycemia" : lambda shared: _grade_fraction(shared, Formulas.above(shared.mmol, Formulas.GRADE_HYPER_MMOL)),
+    "Low Blood Glucose Index" : lambda shared: _bgi(shared, low=True),
+    "High Blood Glucose Index" : lambda shared: _bgi(shared, low=False),
+    "eA1c" : lambda shared: Formulas.ea1c(shared.mean, shared.calc_config.unit),
+    "AUC" : _auc,
+    "Hypoglycemic events No" : _hypo_events_count,
+    "Time in hypoglycemia" : _time_in_hypo,
+    "Mean duration of hypoglycemic event" : _mean_hypo_event_duration,
+    "Time in range" : _time_in_range,
+}
+
+
+class IndexScheduler():
+    """Evaluates indices over intermediates declared by the indices.
+
+    Every index declares the intermediates it is calculated from (see
+    GVIndex.requires and GVIndex.requirements) and every intermediate
+    declares the intermediates it is computed from. The scheduler
+    resolves the requested indices into a dependency ordered plan, in
+    which every intermediate appears once. Intermediates of the plan are
+    computed on first use and cached, so intermediates no requested
+    index needs are never computed and an invalid argument of an index
+    is reported by the index itself.
+
+    Custom indices and intermediates can be registered. A custom index
+    reuses every intermediate cached for the other requested indices.
+
+    Attributes:
+        indices (dict):
+            index name - (evaluate function, requirements function) pairs.
+            evaluate(shared, **kwargs) returns the value of the index,
+            requirements(calc_config, **kwargs) returns its intermediates.
+        intermediates (dict):
+            name - (function, requirements) pairs of custom intermediates.
+            function(shared, *arguments) returns the intermediate.
+        version (str):
+            version of the custom indices and intermediates or None.
+            Results of custom indices are cached (see ResultCache)
+            only with a version, which must change with their code.
+
+    """
+    __attrs__ = [
+        "indices", "intermediates", "version"
+    ]
+
+    def __init__(self, version: str = None) -> None:
+        self.logger = logging.getLogger(__name__)
+        self.indices = {name : (FUSED_INDICES[name], INDICES_TO_CALC[name].requirements) for name in FUSED_INDICES}
+        self.intermediates = {}
+        self.version = version
+
+    def register_index(self, name: str, evaluate: typing.Callable, requires: typing.Iterable = (),
+        requirements: typing.Callable = None) -> None:
+        """Registers a custom index.
+
+        Arguments:
+            name (str):
+                name of the index
+            evaluate (callable):
+                evaluate(shared, **kwargs) returning the value of the index
+                from an Intermediates object
+            requires (list, optional):
+                intermediates the index is calculated from
+            requirements (callable, optional):
+                requirements(calc_config, **kwargs) returning the intermediates
+                for the given arguments. Overrides requires.
+
+        Raises:
+            ValueError:
+                if evaluate is not callable
+            ValueError:
+                if any of the required intermediates is unknown
+
+        """
+        if(not callable(evaluate)):
+            raise ValueError("evaluate must be callable")
+        if(requirements is None):
+            requires = list(requires)
+            for key in requires:
+                self._dependencies(key)
+            requirements = lambda calc_config, **kwargs: list(requires)
+        self.indices[name] = (evaluate, requirements)
+
+    def register_intermediate(self, name: str, function: typing.Callable, requires: typing.Iterable = ()) -> None:
+        """Registers a custom intermediate.
+
+        Arguments:
+            name (str):
+                name of the intermediate
+            function (callable):
+                function(shared, *arguments) computing the intermediate.
+                Other intermediates are available with shared.get.
+            requires (list, optional):
+                intermediates the intermediate is computed from
+
+        Raises:
+            ValueError:
+                if name is a built-in intermediate or function is not callable
+
+        """
+        if(name in Intermediates.DEPENDENCIES):
+            raise ValueError("{} is a built-in intermediate".format(name))
+        if(not callable(function)):
+            raise ValueError("function must be callable")
+        self.intermediates[name] = (function, tuple(requires))
+
+    def _dependencies(self, key: typing.Union[str, tuple]) -> tuple:
+        name = key if isinstance(key, str) else key[0]
+        if(name in self.intermediates):
+            return self.intermediates[name][1]
+        if(name in Intermediates.DEPENDENCIES):
+            return Intermediates.DEPENDENCIES[name]
+        raise ValueError("Unknown intermediate: {}".format(name))
+
+    def _kwargs(self, name: str, calc_config: CalcConfig, index_kwargs: dict = None) -> dict:
+        index_kwargs = index_kwargs if index_kwargs is not None else {}
+        return index_kwargs.get(name, UNIT_INDEX_KWARGS[calc_config.unit].get(name, {}))
+
+    def custom_indices(self, indices: typing.Iterable[str]) -> list:
+        """Indices evaluated by registered functions instead of the built-in ones."""
+        return [name for name in indices if FUSED_INDICES.get(name) is not self.indices[name][0]]
+
+    def _check_indices(self, indices: list) -> None:
+        unknown = [name for name in indices if name not in self.indices]
+        if(unknown):
+            raise ValueError("Unknown indices: {}. Available indices: {}".format(unknown, list(self.indices.keys())))
+
+    def plan(self, calc_config: CalcConfig, indices: typing.Iterable[str], index_kwargs: dict = None) -> list:
+        """Resolves indices into the intermediates they need.
+
+        Arguments:
+            calc_config (CalcConfig):
+                configuration for calculations
+            indices (list of str):
+                names of registered indices
+            index_kwargs (dict, optional):
+                index name - dict of arguments pairs.
+                Falls back to UNIT_INDEX_KWARGS of calc_config.unit.
+
+        Returns:
+            list:
+                unique intermediate keys, every one after its dependencies
+
+        Raises:
+            ValueError:
+                if any of the indices or intermediates is unknown
+            ValueError:
+                if intermediates depend on each other cyclically
+
+        """
+        indices = list(indices)
+        self._check_indices(indices)
+
+        order = []
+
+        def visit(key, path):
+            if(key in order):
+                return
+            if(key in path):
+                raise ValueError("Cyclic dependency of intermediates: {}".format(path + (key, )))
+            for dependency in self._dependencies(key):
+                visit(dependency, path + (key, ))
+            order.append(key)
+
+        for name in indices:
+            for key in self.indices[name][1](calc_config, **self._kwargs(name, calc_config, index_kwargs)):
+                visit(key, ())
+
+        self.logger.debug("IndexScheduler - plan - return: {}".format(order))
+        return order
+
+    def intermediates_of(self, glucose: typing.Union[pd.Series, np.ndarray], calc_config: CalcConfig) -> Intermediates:
+        """Intermediates object of glucose values with the custom intermediates."""
+        return Intermediates(glucose, calc_config, custom=self.intermediates)
+
+    def evaluate(self, shared: Intermediates, indices: typing.Iterable[str], index_kwargs: dict = None) -> dict:
+        """Evaluates indices on an Intermediates object.
+
+        Returns:
+            dict:
+                index name - index value pairs in the order of `indices`
+
+        """
+        indices = list(indices)
+        self._check_indices(indices)
+        return {name : self.indices[name][0](shared, **self._kwargs(name, shared.calc_config, index_kwargs)) for name in indices}
+
+    def run(self, glucose: typing.Union[pd.Series, np.ndarray], calc_config: CalcConfig,
+        indices: typing.Iterable[str] = None, index_kwargs: dict = None) -> dict:
+        """Evaluates indices on glucose values.
+
+        Arguments:
+            glucose (list-like):
+                glucose values
+            calc_config (CalcConfig):
+                configuration for calculations
+            indices (list of str, optional):
+                names of registered indices. Evaluates all of them if None.
+            index_kwargs (dict, optional):
+                index name - dict of arguments pairs.
+                Falls back to UNIT_INDEX_KWARGS of calc_config.unit.
+
+        Returns:
+            dict:
+                index name - index value pairs in the order of `indices`
+
+        """
+        indices = list(self.indices.keys()) if indices is None else list(indices)
+        return self.evaluate(self.intermediates_of(glucose, calc_config), indices, index_kwargs)
+
+
+class BatchCalculator():
+    """Calculates many glycemic variability indices at once.
+
+    Unlike calling every GVIndex separately, BatchCalculator extracts
+    the glucose values once and shares intermediate results (nan mask,
+    mean, standard deviation, unit conversions, logarithms) between all
+    the requested indices. The indices are evaluated by an IndexScheduler,
+    so custom indices registered in it can be calculated too.
+
+    Attributes:
+        calc_config (CalcConfig):
+            configuration for calculations
+        index_kwargs (dict):
+            index name - dict of arguments pairs used for indices,
+            which take arguments. Falls back to UNIT_INDEX_KWARGS of calc_config.unit.
+        use_histogram (bool):
+            evaluate distribution-only indices on a GlucoseHistogram,
+            when the glucose values are integers in mg/dl
+        scheduler (IndexScheduler):
+            scheduler of the indices and their intermediates
+        cache (ResultCache):
+            cache of results of measurements calculated before or None
+
+    """
+    __attrs__ = [
+        "calc_config", "index_kwargs", "use_histogram", "scheduler", "cache"
+    ]
+
+    def __init__(self, calc_config: CalcConfig, index_kwargs: dict = None, use_histogram: bool = False,
+        scheduler: IndexScheduler = None, cache: ResultCache = None) -> None:
+        self.logger = logging.getLogger(__name__)
+        self.set_calc_config(calc_config)
+        self.set_index_kwargs(index_kwargs)
+        self.use_histogram = use_histogram
+        if(scheduler is not None and not isinstance(scheduler, IndexScheduler)):
+            raise ValueError("scheduler must be an IndexScheduler or None")
+        self.scheduler = scheduler if scheduler is not None else IndexScheduler()
+        if(cache is not None and not isinstance(cache, ResultCache)):
+            raise ValueError("cache must be a ResultCache or None")
+        self.cache = cache
+
+    def set_calc_config(self, calc_config: CalcConfig) -> None:
+        if(not isinstance(calc_config, CalcConfig)):
+            raise ValueError("calc_config needs to be a CalcConfig")
+        self.calc_config = calc_config
+
+    def set_index_kwargs(self, index_kwargs: dict) -> None:
+        if(index_kwargs is not None and type(index_kwargs) != dict):
+            raise ValueError("index_kwargs must be a dict or None")
+        self.index_kwargs = index_kwargs if index_kwargs is not None else {}
+
+    def calculate(self, df: pd.DataFrame, indices: typing.Iterable[str] = None) -> dict:
+        """Calculates the indices in a single pass.
+
+        With a cache, results of a measurement calculated before
+        with the same configuration are returned without calculation.
+        Results of custom indices are cached only, if the scheduler
+        has a version.
+
+        Arguments:
+            df (pandas.DataFrame or CompactRecording):
+                dataframe with a GLUCOSE column
+            indices (list of str, optional):
+                names of indices from INDICES_TO_CALC or registered
+                in the scheduler. Calculates INDICES_TO_CALC if None.
+
+        Returns:
+            dict:
+                index name - index value pairs in the order of `indices`
+
+        Raises:
+            ValueError:
+                if df is not a pandas.DataFrame
+            ValueError:
+                if any of the indices is unknown
+
+        """
+        if(isinstance(df, CompactRecording)):
+            df = df.to_frame()
+        if(type(df) != pd.DataFrame):
+            raise ValueError("df must be a pandas.DataFrame")
+
+        indices = list(INDICES_TO_CALC.keys()) if indices is None else list(indices)
+        self.scheduler._check_indices(indices)
+
+        key = None
+        custom = self.scheduler.custom_indices(indices)
+        if(self.cache is not None and custom and self.scheduler.version is None):
+            self.logger.debug("BatchCalculator - calculate - not cached, custom indices without version: {}".format(custom))
+        elif(self.cache is not None):
+            key = result_key(df, self.calc_config, indices, self.index_kwargs, self.use_histogram, self.scheduler.version)
+            results = self.cache.get(key)
+            if(results is not None):
+                self.logger.debug("BatchCalculator - calculate - cached: {}".format(key))
+                return results
+
+        shared = self.scheduler.intermediates_of(df[GLUCOSE], self.calc_config)
+        histogram = None
+        if(self.use_histogram and shared.length and is_histogrammable(shared.glucose, self.calc_config.unit)):
+            histogram = GlucoseHistogram(shared.glucose, self.calc_config)
+
+        results = {}
+        for name in indices:
+            if(histogram is not None and name in HISTOGRAM_INDICES):
+                kwargs = self.scheduler._kwargs(name, self.calc_config, self.index_kwargs)
+                if(name in ARGUMENT_CHECKS):
+                    ARGUMENT_CHECKS[name](**kwargs)
+                results[name] = HISTOGRAM_INDICES[name](histogram, **kwargs)
+            else:
+                results.update(self.scheduler.evaluate(shared, [name], self.index_kwargs))
+
+        if(key is not None):
+            self.cache.put(key, results)
+
+        self.logger.debug("BatchCalculator - calculate - return:\n{}".format(results))
+        return results
+
+    def __call__(self, df: pd.DataFrame, indices: typing.Iterable[str] = None) -> dict:
+        return self.calculate(df, indices)
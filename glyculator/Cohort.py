@@ -0,0 +1,353 @@
+import logging
+import typing
+
+import numpy as np
+import pandas as pd
+
+from .utils import DT, GLUCOSE, UNIT_INDEX_KWARGS
+from .configs import CalcConfig
+from .Index import INDICES_TO_CALC, GVmage
+from .Lags import lag_to_records
+from .Compact import CompactRecording
+from . import Formulas
+
+
+class Cohort():
+    """Glucose measurements of many patients stored in flat arrays.
+
+    Measurements are concatenated into one glucose and one date array.
+    offsets[i]:offsets[i + 1] is the slice of the i-th patient.
+    Indices are calculated for all patients at once with segment
+    reductions, so the Python overhead is paid once per index instead
+    of once per patient and index.
+
+    Attributes:
+        ids (list):
+            identifiers of the patients
+        glucose (numpy.ndarray):
+            concatenated glucose values
+        dates (numpy.ndarray):
+            concatenated datetime64 dates
+        offsets (numpy.ndarray):
+            start of every patient's measurement and the total length
+
+    """
+    __attrs__ = [
+        "ids", "glucose", "dates", "offsets"
+    ]
+
+    def __init__(self, ids: list, glucose: np.ndarray, dates: np.ndarray, offsets: np.ndarray) -> None:
+        offsets = np.asarray(offsets, dtype=np.int64)
+        if(len(ids) != len(offsets) - 1):
+            raise ValueError("offsets must have one element more than ids")
+        if(np.any(np.diff(offsets) <= 0)):
+            raise ValueError("Every patient must have at least one record")
+        if(len(glucose) != offsets[-1] or len(dates) != offsets[-1]):
+            raise ValueError("glucose and dates must have offsets[-1] elements")
+
+        self.ids = list(ids)
+        self.glucose = np.asarray(glucose, dtype=np.float64)
+        self.dates = np.asarray(dates)
+        self.offsets = offsets
+        self.logger = logging.getLogger(__name__)
+
+        self.starts = offsets[:-1]
+        self.lengths = np.diff(offsets)
+        # Patient number of every record
+        self.patient = np.repeat(np.arange(len(self.ids)), self.lengths)
+
+    @classmethod
+    def from_frames(cls, frames: typing.Union[dict, list]):
+        """Creates a Cohort from dataframes with DT and GLUCOSE columns.
+
+        Arguments:
+            frames (dict or list):
+                patient id - dataframe pairs or a list of dataframes.
+                Ids of a list are the positions of dataframes in the list.
+                CompactRecordings can be used instead of dataframes.
+
+        Returns:
+            Cohort
+
+        """
+        if(type(frames) == dict):
+            ids, frames = list(frames.keys()), list(frames.values())
+        else:
+            ids, frames = list(range(len(frames))), list(frames)
+
+        lengths = [len(frame) for frame in frames]
+        offsets = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+        glucose = np.concatenate([frame.decoded_glucose() if isinstance(frame, CompactRecording)
+            else np.asarray(frame[GLUCOSE], dtype=np.float64) for frame in frames]) \
+            if frames else np.array([])
+        dates = np.concatenate([frame.decoded_dates() if isinstance(frame, CompactRecording)
+            else np.asarray(frame[DT], dtype="datetime64[ns]") for frame in frames]) \
+            if frames else np.array([], dtype="datetime64[ns]")
+
+        return cls(ids, glucose, dates, offsets)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def frame(self, i: int) -> pd.DataFrame:
+        """Returns the measurement of the i-th patient as a dataframe."""
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return pd.DataFrame({DT : self.dates[start:end], GLUCOSE : self.glucose[start:end]})
+
+    def segment_sum(self, values: np.ndarray) -> np.ndarray:
+        """Sums values of every patient."""
+        return np.add.reduceat(values, self.starts)
+
+    def segment_mean(self, values: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        """Means of values of every patient, where mask is True.
+
+        NaN for patients with no masked values.
+
+        """
+        sums = self.segment_sum(np.where(mask, values, 0))
+        counts = self.segment_sum(mask.astype(np.int64))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return sums / counts
+
+    def calculate(self, calc_config: CalcConfig, indices: typing.Iterable[str] = None,
+        index_kwargs: dict = None) -> pd.DataFrame:
+        """Calculates indices for all the patients.
+
+        Arguments:
+            calc_config (CalcConfig):
+                configuration for calculations
+            indices (list of str, optional):
+                names of indices from INDICES_TO_CALC.
+                Calculates all of them if None.
+            index_kwargs (dict, optional):
+                index name - dict of arguments pairs used for indices,
+                which take arguments. Falls back to UNIT_INDEX_KWARGS of calc_config.unit.
+
+        Returns:
+            pandas.DataFrame:
+                patients x indices dataframe
+
+        Raises:
+            ValueError:
+                if any of the indices is not in INDICES_TO_CALC
+
+        """
+        indices = list(INDICES_TO_CALC.keys()) if indices is None else list(indices)
+        unknown = [name for name in indices if name not in COHORT_INDICES]
+        if(unknown):
+            raise ValueError("Unknown indices: {}. Available indices: {}".format(unknown, list(INDICES_TO_CALC.keys())))
+
+        index_kwargs = {} if index_kwargs is None else index_kwargs
+        shared = _CohortIntermediates(self, calc_config)
+        results = {}
+        for name in indices:
+            kwargs = index_kwargs.get(name, UNIT_INDEX_KWARGS[calc_config.unit].get(name, {}))
+            results[name] = COHORT_INDICES[name](shared, **kwargs)
+
+        result = pd.DataFrame(results, index=pd.Index(self.ids, name="patient"), columns=indices)
+        self.logger.debug("Cohort - calculate - return:\n{}".format(result))
+        return result
+
+
+class _CohortIntermediates():
+    """Values shared between indices calculated for a Cohort."""
+    def __init__(self, cohort: Cohort, calc_config: CalcConfig) -> None:
+        self.cohort = cohort
+        self.calc_config = calc_config
+        self.glucose = cohort.glucose
+        self._cache = {}
+
+    def get(self, name: str, function):
+        if(name not in self._cache):
+            self._cache[name] = function()
+        return self._cache[name]
+
+    @property
+    def valid(self) -> np.ndarray:
+        return self.get("valid", lambda: ~np.isnan(self.glucose))
+
+    @property
+    def valid_count(self) -> np.ndarray:
+        return self.get("valid_count", lambda: self.cohort.segment_sum(self.valid.astype(np.int64)))
+
+    @property
+    def mean(self) -> np.ndarray:
+        return self.get("mean", lambda: self.cohort.segment_mean(self.glucose, self.valid))
+
+    @property
+    def var(self) -> np.ndarray:
+        def var():
+            deviations = np.power(self.glucose - self.mean[self.cohort.patient], 2)
+            return self.cohort.segment_mean(deviations, self.valid)
+        return self.get("var", var)
+
+    @property
+    def std(self) -> np.ndarray:
+        return np.sqrt(self.var)
+
+    @property
+    def mmol(self) -> np.ndarray:
+        return self.get("mmol", lambda: Formulas.to_mmol(self.glucose, self.calc_config.unit))
+
+    @property
+    def log10(self) -> np.ndarray:
+        """Logarithm of glucose values, NaN for non-positive values"""
+        return self.get("log10", lambda: Formulas.log10(self.glucose))
+
+    @property
+    def risk(self) -> np.ndarray:
+        """Symmetrized glucose scale used by LBGI and HBGI, NaN where undefined"""
+        return self.get("risk", lambda: Formulas.risk(self.log10))
+
+    @property
+    def grade(self) -> np.ndarray:
+        """GRADE score of every glucose value, NaN where undefined"""
+        return self.get("grade", lambda: Formulas.grade(self.mmol))
+
+    def finite_mean(self, values: np.ndarray) -> np.ndarray:
+        """Means of every patient skipping undefined values."""
+        return self.cohort.segment_mean(values, np.isfinite(values))
+
+    def count(self, mask: np.ndarray) -> np.ndarray:
+        return self.cohort.segment_sum(mask.astype(np.int64))
+
+    def lagged(self, lag: int) -> typing.Tuple[np.ndarray, np.ndarray]:
+        """Differences lag minutes apart within every patient and their patient numbers."""
+        def lagged():
+            records = lag_to_records(lag, self.calc_config.interval)
+            patient = self.cohort.patient
+            same_patient = patient[records:] == patient[:-records]
+            differences = (self.glucose[records:] - self.glucose[:-records])[same_patient]
+            return differences, patient[records:][same_patient]
+        return self.get(("lagged", lag), lagged)
+
+    def runs_below(self, threshold: float) -> typing.Tuple[np.ndarray, np.ndarray]:
+        """Lengths and patient numbers of runs below threshold within every patient."""
+        def runs():
+            below = Formulas.below(self.glucose, threshold)
+            segment_start = np.zeros(len(below), dtype=bool)
+            segment_start[self.cohort.starts] = True
+            previous = np.concatenate(([False], below[:-1])) & ~segment_start
+            following = np.concatenate((below[1:], [False])) & ~np.roll(segment_start, -1)
+            starts = np.flatnonzero(below & ~previous)
+            ends = np.flatnonzero(below & ~following) + 1
+            return ends - starts, self.cohort.patient[starts]
+        return self.get(("runs_below", threshold), runs)
+
+    def grouped(self, values: np.ndarray, patient: np.ndarray, reduction: str) -> np.ndarray:
+        """Reduces values grouped by patient. NaN for patients with no values."""
+        grouped = pd.Series(values).groupby(patient).agg(reduction)
+        return grouped.reindex(np.arange(len(self.cohort))).values
+
+
+def _nanmean_lagged(shared: _CohortIntermediates, lag: int) -> np.ndarray:
+    differences, patient = shared.lagged(lag)
+    return shared.grouped(differences, patient, "mean")
+
+
+def _nanvar_lagged(shared: _CohortIntermediates, lag: int) -> np.ndarray:
+    differences, patient = shared.lagged(lag)
+    valid = ~np.isnan(differences)
+    counts = np.bincount(patient[valid], minlength=len(shared.cohort))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        means = np.bincount(patient[valid], weights=differences[valid], minlength=len(shared.cohort)) / counts
+        deviations = np.power(differences[valid] - means[patient[valid]], 2)
+        return np.bincount(patient[valid], weights=deviations, minlength=len(shared.cohort)) / counts
+
+
+def _grade_fraction(shared: _CohortIntermediates, mask: np.ndarray) -> np.ndarray:
+    defined = np.isfinite(shared.grade)
+    return shared.cohort.segment_sum(np.where(defined & mask, shared.grade, 0)) / \
+        shared.cohort.segment_sum(np.where(defined, shared.grade, 0))
+
+
+def _bgi(shared: _CohortIntermediates, low: bool) -> np.ndarray:
+    return shared.finite_mean(Formulas.bgi(shared.risk, low))
+
+
+def _m100(shared: _CohortIntermediates) -> np.ndarray:
+    return shared.finite_mean(Formulas.m100(shared.log10, shared.calc_config.unit))
+
+
+def _mage(shared: _CohortIntermediates) -> np.ndarray:
+    # The search of excursions is sequential, so it is done patient by patient
+    mage = GVmage(calc_config=shared.calc_config)
+    glucose = np.split(shared.glucose, shared.cohort.offsets[1:-1])
+    return np.array([mage._mage(pd.Series(values), mean, std) \
+        for values, mean, std in zip(glucose, shared.mean, shared.std)])
+
+
+def _auc(shared: _CohortIntermediates, standardize: bool = True) -> np.ndarray:
+    # Trapezoid rule: sum of all values minus half of the first and the last value
+    cohort = shared.cohort
+    ends = cohort.offsets[1:] - 1
+    area = (cohort.segment_sum(shared.glucose) - (shared.glucose[cohort.starts] + shared.glucose[ends]) / 2) \
+        * shared.calc_config.interval
+    return Formulas.auc(area, cohort.lengths, standardize)
+
+
+def _hypo_events_count(shared: _CohortIntermediates, threshold: float, threshold_duration: int = 15) -> np.ndarray:
+    Formulas.check_threshold(threshold)
+    if(type(threshold_duration) != int):
+        raise ValueError("hypo_event_records_threshold_duration must be int")
+    lengths, patient = shared.runs_below(threshold)
+    events = lengths >= threshold_duration / shared.calc_config.interval
+    return np.bincount(patient[events], minlength=len(shared.cohort))
+
+
+def _mean_hypo_event_duration(shared: _CohortIntermediates, threshold: float, records_duration: int = 15) -> np.ndarray:
+    Formulas.check_threshold(threshold)
+    if(type(records_duration) != int):
+        raise ValueError("records_duration")
+    lengths, patient = shared.runs_below(threshold)
+    events = lengths >= records_duration / shared.calc_config.interval
+    counts = np.bincount(patient[events], minlength=len(shared.cohort))
+    records = np.bincount(patient[events], weights=lengths[events], minlength=len(shared.cohort))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(counts > 0, records / counts * shared.calc_config.interval, 0)
+
+
+def _time_in_range(shared: _CohortIntermediates, lower_bound: float = None, upper_bound: float = None) -> np.ndarray:
+    lower_bound, upper_bound = Formulas.time_in_range_bounds(shared.calc_config, lower_bound, upper_bound)
+    in_range = Formulas.above(shared.glucose, lower_bound) & Formulas.below(shared.glucose, upper_bound)
+    return shared.count(in_range) / shared.valid_count
+
+
+def _below(shared: _CohortIntermediates, threshold: float) -> np.ndarray:
+    Formulas.check_threshold(threshold)
+    return shared.count(Formulas.below(shared.glucose, threshold))
+
+
+def _above(shared: _CohortIntermediates, threshold: float) -> np.ndarray:
+    Formulas.check_threshold(threshold)
+    return shared.count(Formulas.above(shared.glucose, threshold))
+
+
+# Evaluators of INDICES_TO_CALC entries returning one value per patient
+COHORT_INDICES = {
+    "Mean" : lambda shared: shared.mean,
+    "Median" : lambda shared: shared.grouped(shared.glucose, shared.cohort.patient, "median"),
+    "Variance" : lambda shared: shared.var,
+    "CV" : lambda shared: shared.std / shared.mean,
+    "Missing values" : lambda shared: (shared.cohort.lengths - shared.valid_count) / shared.cohort.lengths,
+    "Total time points No" : lambda shared: shared.cohort.lengths,
+    "Standard deviation" : lambda shared: shared.std,
+    "M100" : _m100,
+    "J-index" : lambda shared: Formulas.j_index(shared.mean, shared.std),
+    "MAGE" : _mage,
+    "MODD" : lambda shared: _nanmean_lagged(shared, 24 * 60),
+    "CONGA" : lambda shared, hours: _nanvar_lagged(shared, Formulas.check_hours(hours) * 60),
+    "Hypoglycemia fraction" : lambda shared, threshold: _below(shared, threshold) / shared.valid_count,
+    "Hyperglycemia fraction" : lambda shared, threshold: _above(shared, threshold) / shared.valid_count,
+    "GRADE" : lambda shared: shared.finite_mean(shared.grade),
+    "GRADE hypoglycemia" : lambda shared: _grade_fraction(shared, Formulas.below(shared.mmol, Formulas.GRADE_HYPO_MMOL)),
+    "GRADE hyperglycemia" : lambda shared: _grade_fraction(shared, Formulas.above(shared.mmol, Formulas.GRADE_HYPER_MMOL)),
+    "Low Blood Glucose Index" : lambda shared: _bgi(shared, low=True),
+    "High Blood Glucose Index" : lambda shared: _bgi(shared, low=False),
+    "eA1c" : lambda shared: Formulas.ea1c(shared.mean, shared.calc_config.unit),
+    "AUC" : _auc,
+    "Hypoglycemic events No" : _hypo_events_count,
+    "Time in hypoglycemia" : lambda shared, threshold: _below(shared, threshold) * shared.calc_config.interval,
+    "Mean duration of hypoglycemic event" : _mean_hypo_event_duration,
+    "Time in range" : _time_in_range,
+}
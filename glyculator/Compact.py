@@ -0,0 +1,220 @@
+import logging
+import typing
+
+import numpy as np
+import pandas as pd
+
+from .utils import DT, GLUCOSE
+
+
+DATE_DTYPES = ["datetime64[s]", "int32"]
+GLUCOSE_DTYPES = ["float32", "uint16"]
+
+# Missing values of compact arrays without a NaN
+MISSING_GLUCOSE = np.iinfo(np.uint16).max
+MISSING_DATE = np.iinfo(np.int32).min
+
+
+class DtypePolicy():
+    """Compact representation of CGM dates and glucose values.
+
+    Dates are stored as datetime64[s] or as int32 seconds since the
+    origin of the recording (the first date). Glucose values are stored
+    as float32 or as uint16 mg/dl with MISSING_GLUCOSE for missing values.
+    Integer mg/dl values are stored exactly by both glucose dtypes; values
+    with decimals (e.g. mmol/l) are restored exactly by float32 when
+    decimals is set to the number of decimals of the source.
+
+    Dataframes, which are read and cleaned, can not hold uint16 with
+    missing values nor int32 dates, so the compact dtypes are used only
+    by CompactRecording. Dataframes (see frame) get datetime64[ns] dates
+    and float64 glucose values equal to the decoded values of a
+    CompactRecording, so indices are the same on both. The exception is
+    float32 without decimals, which can not restore values with decimals:
+    frame keeps such glucose values as they are.
+
+    Only CompactRecording saves memory. Dataframes returned by frame -
+    and so by FileReader and Pipeline with a dtype_policy - take as much
+    memory as dataframes read without a policy. Recordings kept in memory
+    for a long time, e.g. before building a Cohort, should be converted
+    with CompactRecording.from_frame.
+
+    Attributes:
+        dates (str):
+            one of DATE_DTYPES
+        glucose (str):
+            one of GLUCOSE_DTYPES
+        decimals (int):
+            decimals glucose values are rounded to when restored or None
+
+    """
+    __attrs__ = [
+        "dates", "glucose", "decimals"
+    ]
+
+    def __init__(self, dates: str = "int32", glucose: str = "float32", decimals: int = None) -> None:
+        if(dates not in DATE_DTYPES):
+            raise ValueError("dates must be one of {}".format(DATE_DTYPES))
+        if(glucose not in GLUCOSE_DTYPES):
+            raise ValueError("glucose must be one of {}".format(GLUCOSE_DTYPES))
+        if(decimals is not None and (type(decimals) != int or decimals < 0)):
+            raise ValueError("decimals must be a non-negative int or None")
+        self.dates = dates
+        self.glucose = glucose
+        self.decimals = decimals
+        self.logger = logging.getLogger(__name__)
+
+    def frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Converts a dataframe to datetime64[ns] dates and float64 glucose values.
+
+        Glucose values go through encode_glucose and decode_glucose,
+        so they are the values restored from a CompactRecording, unless
+        the policy is float32 without decimals - then they are kept
+        unchanged, so the dataframe is never less precise than the file.
+        Unparseable dates become NaT and unparseable glucose values
+        (e.g. empty strings) become NaN.
+
+        Raises:
+            ValueError:
+                if glucose values can not be encoded (see encode_glucose)
+
+        """
+        glucose = pd.to_numeric(df[GLUCOSE], errors="coerce").values.astype(np.float64)
+        if(self.glucose != "float32" or self.decimals is not None):
+            glucose = self.decode_glucose(self.encode_glucose(glucose))
+        return pd.DataFrame({
+            DT : pd.to_datetime(df[DT], errors="coerce").values,
+            GLUCOSE : glucose,
+        })
+
+    def encode_dates(self, dates) -> typing.Tuple[np.ndarray, np.datetime64]:
+        """Encodes dates.
+
+        Returns:
+            tuple:
+                encoded dates and their origin
+
+        Raises:
+            ValueError:
+                if dates are not whole seconds or int32 offsets overflow
+
+        """
+        dates = np.asarray(pd.to_datetime(dates), dtype="datetime64[ns]")
+        seconds = dates.astype("datetime64[s]")
+        present = ~np.isnat(dates)
+        if(np.any(seconds[present] != dates[present])):
+            raise ValueError("dates must be whole seconds")
+        origin = seconds[present][0] if present.any() else np.datetime64(0, "s")
+        if(self.dates == "datetime64[s]"):
+            return seconds, origin
+
+        offsets = (seconds - origin).astype(np.int64)
+        if(present.any() and (offsets[present].min() <= MISSING_DATE or offsets[present].max() > np.iinfo(np.int32).max)):
+            raise ValueError("dates span too long for int32 offsets")
+        return np.where(present, offsets, MISSING_DATE).astype(np.int32), origin
+
+    def decode_dates(self, encoded: np.ndarray, origin: np.datetime64) -> np.ndarray:
+        """Decodes dates to datetime64[ns]."""
+        if(encoded.dtype.kind == "M"):
+            return encoded.astype("datetime64[ns]")
+        dates = origin + encoded.astype("timedelta64[s]")
+        dates[encoded == MISSING_DATE] = np.datetime64("NaT")
+        return dates.astype("datetime64[ns]")
+
+    def encode_glucose(self, glucose) -> np.ndarray:
+        """Encodes glucose values.
+
+        Raises:
+            ValueError:
+                if uint16 is used for values, which are not integers
+                from 0 to MISSING_GLUCOSE - 1
+
+        """
+        glucose = np.asarray(glucose, dtype=np.float64)
+        if(self.glucose == "float32"):
+            return glucose.astype(np.float32)
+
+        missing = np.isnan(glucose)
+        valid = glucose[~missing]
+        if(np.any(np.mod(valid, 1) != 0) or np.any(valid < 0) or np.any(valid >= MISSING_GLUCOSE)):
+            raise ValueError("uint16 glucose values must be integer mg/dl values")
+        return np.where(missing, MISSING_GLUCOSE, glucose).astype(np.uint16)
+
+    def decode_glucose(self, encoded: np.ndarray) -> np.ndarray:
+        """Decodes glucose values to float64 with NaN for missing values."""
+        glucose = encoded.astype(np.float64)
+        if(encoded.dtype == np.uint16):
+            glucose[encoded == MISSING_GLUCOSE] = np.nan
+        elif(self.decimals is not None):
+            glucose = np.round(glucose, self.decimals)
+        return glucose
+
+
+class CompactRecording():
+    """CGM recording stored with the dtypes of a DtypePolicy.
+
+    With the default policy a reading takes 8 bytes instead of 16 bytes
+    of a dataframe with datetime64[ns] dates and float64 glucose values,
+    or about 80 bytes of a dataframe of datetime objects.
+
+    Attributes:
+        dates (numpy.ndarray):
+            encoded dates
+        origin (numpy.datetime64):
+            date int32 offsets are counted from
+        glucose (numpy.ndarray):
+            encoded glucose values
+        policy (DtypePolicy):
+            policy of the encoding
+
+    """
+    __attrs__ = [
+        "dates", "origin", "glucose", "policy"
+    ]
+
+    def __init__(self, dates: np.ndarray, origin: np.datetime64, glucose: np.ndarray, policy: DtypePolicy) -> None:
+        if(len(dates) != len(glucose)):
+            raise ValueError("dates and glucose must have the same length")
+        self.dates = dates
+        self.origin = origin
+        self.glucose = glucose
+        self.policy = policy
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, policy: DtypePolicy = None):
+        """Encodes a dataframe with DT and GLUCOSE columns.
+
+        Arguments:
+            df (pandas.DataFrame):
+                dataframe with DT and GLUCOSE columns
+            policy (DtypePolicy, optional):
+                policy of the encoding. DtypePolicy() if None.
+
+        Returns:
+            CompactRecording
+
+        """
+        if(type(df) != pd.DataFrame):
+            raise ValueError("df must be a pandas.DataFrame")
+        policy = policy if policy is not None else DtypePolicy()
+        if(not isinstance(policy, DtypePolicy)):
+            raise ValueError("policy must be a DtypePolicy")
+        dates, origin = policy.encode_dates(df[DT])
+        return cls(dates, origin, policy.encode_glucose(df[GLUCOSE]), policy)
+
+    def __len__(self) -> int:
+        return len(self.glucose)
+
+    @property
+    def nbytes(self) -> int:
+        return self.dates.nbytes + self.glucose.nbytes
+
+    def decoded_dates(self) -> np.ndarray:
+        return self.policy.decode_dates(self.dates, self.origin)
+
+    def decoded_glucose(self) -> np.ndarray:
+        return self.policy.decode_glucose(self.glucose)
+
+    def to_frame(self) -> pd.DataFrame:
+        """Decodes the recording to a dataframe with DT and GLUCOSE columns."""
+        return pd.DataFrame({DT : self.decoded_dates(), GLUCOSE : self.decoded_glucose()})
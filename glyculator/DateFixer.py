@@ -2,6 +2,7 @@ import pandas as pd
 import numpy as np
 import json 
 import requests
+from numpy.lib.stride_tricks import as_strided
 
 from typing import Union
 
@@ -10,6 +11,9 @@ import logging
 from glyculator.configs import CleanConfig
 import glyculator.utils as utils
 from glyculator.cleaner.config import WINDOW_SIZE
+import glyculator.cleaner.ModelRegistry as ModelRegistry
+import glyculator.cleaner.PredictionCache as PredictionCache
+from glyculator.GridFlagger import align_to_grid
 
 
 
@@ -17,29 +21,55 @@ from glyculator.cleaner.config import WINDOW_SIZE
 # TODO (konrad.pagacz@gmail.com) write unit tests with no integration with CleanConfig
 
 
+def window_matrix(values: np.ndarray, size: int) -> np.ndarray:
+    """Read-only view of all windows of size consecutive values.
+
+    Row j of the view is values[j:j + size]. No values are copied.
+
+    Arguments:
+        values (numpy.ndarray):
+            one dimensional array
+        size (int):
+            number of values in a window
+
+    Returns:
+        numpy.ndarray:
+            array of shape (max(len(values) - size + 1, 0), size)
+
+    """
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    rows = max(len(values) - size + 1, 0)
+    return as_strided(values, shape=(rows, size), strides=(values.strides[0], values.strides[0]), writeable=False)
+
+
 class DateFixer(object):
     """Removes unnecessary timepoints from a CGM measurement.
 
     Attributes:
         clean_config (CleanConfig):
             configuration for cleaning
+        prediction_cache (PredictionCache):
+            cache of probabilities of windows predicted by the local model.
+            The cache shared by the process by default, None disables caching.
 
     """
     def __init__(self, clean_config: CleanConfig):
         self.clean_config = clean_config
         self.logger = logging.getLogger(__name__)
         self.variables_no_model = WINDOW_SIZE - 1
+        self.prediction_cache = PredictionCache.get_cache()
         self._cleaner = None
 
     def __call__(self, data: Union[pd.Series, np.ndarray, list], alternative_flagger=None, **kwargs):
         if(alternative_flagger is None):
-            if(type(self.clean_config.use_api) == str):
-                if(self.clean_config.use_api == "metronome"):
-                    predictions = self._metronome_predict(data)
-                elif (self.clean_config.use_api == False):
-                    predictions = self._metronome_predict_local(data)
-                else:
-                    raise ValueError("Unsupported API type.")
+            if(self.clean_config.flagger == "grid"):
+                predictions = align_to_grid(data, self.clean_config.interval)
+            elif(self.clean_config.use_api == "metronome"):
+                predictions = self._metronome_predict(data)
+            elif(self.clean_config.use_api is False):
+                predictions = self._metronome_predict_local(data)
+            else:
+                raise ValueError("Unsupported API type.")
         else:
             predictions = \
                 alternative_flagger(data, **kwargs)
@@ -50,32 +80,102 @@ class DateFixer(object):
         
 
     def _metronome_predict(self, data: Union[pd.Series, np.ndarray, list]):
-        prepared_timepoints_forward, prepared_timepoints_reverse = \
-            self._prepare_timepoints_to_metronome(dates=data)
-        forward_probas = self._calculate_clean_probas(prepared_timepoints_forward)
-        reverse_probas = self._calculate_clean_probas(prepared_timepoints_reverse)
+        windows, inverse = self._unique_windows(*self._prepare_windows(dates=data))
+        probas = self._predict_unique(windows, inverse, self._calculate_clean_probas)
 
-        overall_probas = self._merge_metronome_probabilities(forward_probas, reverse_probas)
+        overall_probas = self._merge_metronome_probabilities(probas)
         return self._probas_to_predictions(overall_probas)
 
 
     def _metronome_predict_local(self, data: Union[pd.Series, np.ndarray, list]):
-        prepared_timepoints_forward, prepared_timepoints_reverse = \
-            self._prepare_timepoints_to_metronome(dates=data)
-        forward_probas = self._predict_local(prepared_timepoints_forward)
-        reverse_probas = self._predict_local(prepared_timepoints_reverse)
+        windows, inverse = self._unique_windows(*self._prepare_windows(dates=data))
+        probas = self._predict_unique(windows, inverse, self._predict_local)
 
-        overall_probas = self._merge_metronome_probabilities(forward_probas, reverse_probas)
+        overall_probas = self._merge_metronome_probabilities(probas)
         return self._probas_to_predictions(overall_probas)
 
 
+    def _unique_windows(self, forward: np.ndarray, reverse: np.ndarray):
+        """Stacks forward and reverse windows into one batch without duplicates.
+
+        Regular parts of a measurement give many identical windows
+        and a window of equal differences is the same in both directions,
+        so the batch is usually much smaller than both window matrices.
+
+        Args:
+            forward (numpy.ndarray):
+                forward window matrix of _prepare_windows
+            reverse (numpy.ndarray):
+                reverse window matrix of _prepare_windows
+
+        Returns:
+            tuple:
+                numpy.ndarray of unique windows and numpy.ndarray of positions
+                of every forward window, followed by every reverse window,
+                in the unique windows
+
+        """
+        windows = np.concatenate((forward, reverse))
+        if(len(windows) == 0):
+            return windows, np.zeros(0, dtype=np.int64)
+        unique, inverse = np.unique(windows, axis=0, return_inverse=True)
+        self.logger.debug("DateFixer - _unique_windows - {} unique of {} windows".format(len(unique), len(windows)))
+        return unique, inverse
+
+
+    def _predict_unique(self, windows: np.ndarray, inverse: np.ndarray, predict) -> np.ndarray:
+        """Predicts unique windows in one call and expands the probabilities to all windows."""
+        if(len(windows) == 0):
+            return np.zeros(0)
+        return np.asarray(predict(windows), dtype=np.float64)[inverse]
+
+
+    def _prepare_windows(self, dates: pd.Series):
+        """Transforms a series of dates to the input matrices of the model.
+
+        Row j of the forward matrix holds the differences (in seconds)
+        between dates j, j + 1, ..., j + 14. Row j of the reverse matrix
+        holds the same differences in the reverse order. Both matrices
+        are read-only views of one array of differences.
+
+        Args:
+            dates (pandas.Series):
+                series of dates in datetime format
+
+        Returns:
+            tuple:
+                forward and reverse numpy.ndarray of shape
+                (<dates number> - 14, 14)
+
+        """
+        differences = np.diff(np.asarray(dates, dtype="datetime64[ns]"), n=1) / np.timedelta64(1, "s")
+        self.logger.debug("DateFixer - _prepare_windows - differences:\n{}".format(differences))
+
+        forward = window_matrix(differences, self.variables_no_model)
+        reverse = forward[:, ::-1]
+        return forward, reverse
+
+    def _windows_to_records(self, windows: np.ndarray) -> dict:
+        """Converts a window matrix to the dictionary accepted by the Metronome API.
+
+        Returns:
+            dict:
+                dictionary with keys: "var0", "var1" to "var13" and "interval".
+                "var<i>" holds column i of the matrix.
+
+        """
+        records = {"var" + str(i) : windows[:, i].tolist() for i in range(self.variables_no_model)}
+        records["interval"] = self.clean_config.interval
+        return records
+
     def _prepare_timepoints_to_metronome(self, dates: pd.Series):
         """Transforms a series of dates to dictionary of
         variable name - list of values pairs.
 
         Dates in dates should be in a datetime format.
         This form of the input is accepted by a Cleaner class
-        and Metronome API.
+        and Metronome API. Kept for compatibility - the model
+        is fed with the matrices of _prepare_windows.
 
         Args:
             dates (pandas.Series):
@@ -86,35 +186,19 @@ class DateFixer(object):
                 dictionary with keys: "var0", "var1" to "var13" and "interval"
 
         """
-        differences = np.diff(dates, n=1)
-        self.logger.debug("DateFixer - _prepare_timepoints_to_model - differences:\n{}".format(differences))
-
-        differences = list(differences / np.timedelta64(1, "s"))
-
-        # Creates list of differences
-        # Under "var0" are values of var0 for all records
-        # For more details look at the Metronome API
-        forward = {
-            "var" + str(i) : differences[i:-1 * (self.variables_no_model - 1) + i] for i in range(self.variables_no_model - 1)
-        }
-        forward["var13"] = differences[13:]
-        forward["interval"] = self.clean_config.interval
-
-
-        reverse = {
-            "var" + str(i) : differences[self.variables_no_model - 1 - i: len(differences) - i] for i in range(self.variables_no_model)
-        }
-        reverse["interval"] = self.clean_config.interval
+        forward, reverse = self._prepare_windows(dates)
+        forward, reverse = self._windows_to_records(forward), self._windows_to_records(reverse)
 
         self.logger.debug("DateFixer - _prepare_timepoints_to_model - return dict:\n{}\n{}".format(forward, reverse))
         return forward, reverse
 
 
-    def _calculate_clean_probas(self, dates_records: dict):
+    def _calculate_clean_probas(self, dates_records: Union[dict, np.ndarray]):
         """Returns a boolean mask of necessary time points.
 
         Args:
-            dates_records (dict):
+            dates_records (dict or numpy.ndarray):
+                window matrix of _prepare_windows or
                 dictionary of variable : values pairs.
                 Variables should be "var0", "var1", ... to
                 "var13" and "interval". Values must be list-like
@@ -130,18 +214,27 @@ class DateFixer(object):
         """
         if(self.clean_config.use_api):
             # use api
+            if(isinstance(dates_records, np.ndarray)):
+                dates_records = self._windows_to_records(dates_records)
             return self._predict_api(dates_records)
         else:
             # use local
             return self._predict_local(dates_records)
 
 
-    def _predict_local(self, dates_records: dict):
-        from glyculator.cleaner.Cleaner import Cleaner5
+    def _predict_local(self, dates_records: Union[dict, np.ndarray]):
+        backend = self.clean_config.model_backend
         if(self._cleaner is None):
-            self._cleaner = Cleaner5()
-
-        interval = dates_records.pop("interval")
+            # The model is shared by all DateFixers in the process
+            self._cleaner = ModelRegistry.get_model(ModelRegistry.BACKEND_MODELS[backend])
+
+        if(isinstance(dates_records, np.ndarray)):
+            interval = self.clean_config.interval
+            if(self.prediction_cache is not None):
+                return self.prediction_cache.predict(dates_records, interval, self._cleaner.predict_proba,
+                    model=(ModelRegistry.BACKEND_MODELS[backend], self._cleaner.model_path))
+        else:
+            interval = dates_records.pop("interval")
         probabilities = self._cleaner.predict_proba(dates_records, interval=interval)
         return probabilities
 
@@ -164,13 +257,15 @@ class DateFixer(object):
         return probas_and_preds["probabilities"]
 
 
-    def _merge_metronome_probabilities(self, forward_probas: list, reverse_probas: list) -> np.ndarray:
+    def _merge_metronome_probabilities(self, forward_probas: list, reverse_probas: list = None) -> np.ndarray:
         """Merges the probabilites from forward and reverse window approaches.
 
 
         Args:
             forward_probas:
-                list of probabilities from a forward window approach
+                list of probabilities from a forward window approach.
+                If reverse_probas is None, probabilities of the forward
+                windows followed by probabilities of the reverse windows.
             reverse_probas:
                 list of probabilties from a reverse window approach
 
@@ -181,6 +276,9 @@ class DateFixer(object):
 
         """
 
+        if(reverse_probas is None):
+            forward_probas, reverse_probas = np.split(np.asarray(forward_probas), 2)
+
         # forward probas contain the probas of the same elements as reverse probas with a notable exception.
         # First variables_no_model probas of reverse_probas concern first variables_no_model elements of dates index
         # and last variables_no_model probas of forward_probas concern last variables_no_model elements of dates index
@@ -0,0 +1,105 @@
+import typing
+
+import numpy as np
+import pandas as pd
+
+
+EPISODE_COLUMNS = [
+    "kind", "threshold", "start", "end", "records", "duration", "nadir", "peak", "auc"
+]
+
+
+def find_runs(mask: typing.Union[np.ndarray, pd.Series]) -> typing.Tuple[np.ndarray, np.ndarray]:
+    """Finds runs of consecutive True values.
+
+    Arguments:
+        mask:
+            list-like of booleans
+
+    Returns:
+        tuple:
+            Two numpy.ndarrays - positions of the first record of every run
+            and positions right after the last record of every run
+
+    """
+    padded = np.concatenate(([0], np.asarray(mask, dtype=np.int8), [0]))
+    changes = np.diff(padded)
+    return np.flatnonzero(changes == 1), np.flatnonzero(changes == -1)
+
+
+def _reduce_runs(ufunc: np.ufunc, values: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    # reduceat reduces between consecutive indices, so run starts and ends
+    # are interleaved and every other result is taken.
+    # The extra element keeps the last end a valid index.
+    padded = np.append(values, 0)
+    bounds = np.empty(2 * len(starts), dtype=np.int64)
+    bounds[0::2] = starts
+    bounds[1::2] = ends
+    return ufunc.reduceat(padded, bounds)[0::2]
+
+
+def find_episodes(glucose: typing.Union[np.ndarray, pd.Series], interval: int,
+    hypo_thresholds: typing.Iterable[float] = (), hyper_thresholds: typing.Iterable[float] = ()) -> pd.DataFrame:
+    """Finds hypo- and hyperglycemic episodes for many thresholds at once.
+
+    A hypoglycemic episode is a run of consecutive glucose values below the threshold.
+    A hyperglycemic episode is a run of consecutive glucose values above the threshold.
+    Missing glucose values end an episode.
+
+    Arguments:
+        glucose:
+            list-like of glucose values measured every interval minutes
+        interval (int):
+            number of minutes between glucose measurements
+        hypo_thresholds (list-like):
+            thresholds of hypoglycemic episodes
+        hyper_thresholds (list-like):
+            thresholds of hyperglycemic episodes
+
+    Returns:
+        pandas.DataFrame:
+            one row per episode with columns:
+                kind - "hypo" or "hyper"
+                threshold
+                start - position of the first record of the episode
+                end - position right after the last record of the episode
+                records - number of records in the episode
+                duration - duration in minutes
+                nadir - the lowest glucose value in the episode
+                peak - the highest glucose value in the episode
+                auc - area between the threshold and glucose curve
+                    (rectangle rule, glucose unit times minutes)
+
+    """
+    glucose = np.asarray(glucose, dtype=np.float64)
+    thresholds = [("hypo", threshold) for threshold in hypo_thresholds] + \
+        [("hyper", threshold) for threshold in hyper_thresholds]
+
+    tables = []
+    for kind, threshold in thresholds:
+        if(kind == "hypo"):
+            mask = glucose < threshold
+            excess = np.where(mask, threshold - glucose, 0)
+        else:
+            mask = glucose > threshold
+            excess = np.where(mask, glucose - threshold, 0)
+
+        starts, ends = find_runs(mask)
+        cumulative_excess = np.concatenate(([0], np.cumsum(excess)))
+
+        tables.append(pd.DataFrame({
+            "kind" : kind,
+            "threshold" : np.repeat(threshold, len(starts)),
+            "start" : starts,
+            "end" : ends,
+            "records" : ends - starts,
+            "duration" : (ends - starts) * interval,
+            "nadir" : _reduce_runs(np.minimum, glucose, starts, ends) if len(starts) else np.array([]),
+            "peak" : _reduce_runs(np.maximum, glucose, starts, ends) if len(starts) else np.array([]),
+            "auc" : (cumulative_excess[ends] - cumulative_excess[starts]) * interval,
+        }, columns=EPISODE_COLUMNS))
+
+    if(len(tables) == 0):
+        return pd.DataFrame(columns=EPISODE_COLUMNS)
+
+    return pd.concat(tables, ignore_index=True)
@@ -5,9 +5,16 @@ import numpy as np
 
 from .utils import DT, GLUCOSE, PANDAS_FILL_FREQUENCIES, PANDAS_TOLERANCES
 from .configs import CleanConfig
+from .cleaner.config import WINDOW_SIZE
 import glyculator.DateFixer as DateFixer
 
 
+# Paths of fix_dates stored in tidy_report under "Date fixing path"
+REGULAR_PATH = "regular"
+PARTIAL_PATH = "partial"
+MODEL_PATH = "model"
+
+
 class FileCleaner():
     """Cleans the raw CGM data file
 
@@ -28,6 +35,7 @@ class FileCleaner():
 
     def __init__(self, data_df: pd.DataFrame = None, clean_config: CleanConfig = None):
         self.logger = logging.getLogger(__name__)
+        self.tidy_report = {}
         self.set_untidy(data_df)
         self.set_clean_config(clean_config)
 
@@ -127,6 +135,16 @@ class FileCleaner():
     def fix_dates(self, data_df: pd.DataFrame):
         """Flags measurements of data_df
 
+        Differences between consecutive dates are checked first. If all
+        of them are within regularity_tolerance of CleanConfig (seconds)
+        from the interval, every record is flagged without DateFixer.
+        Otherwise only the stretches around irregular differences, with
+        WINDOW_SIZE - 1 records of context on each side, are flagged
+        by DateFixer and all other records are kept. The path taken is
+        stored in tidy_report under "Date fixing path" (REGULAR_PATH,
+        PARTIAL_PATH or MODEL_PATH) and the number of records flagged
+        by DateFixer under "Records sent to date fixing model".
+
         Args:
             data_df:
                 Dataframe of measurements.
@@ -140,11 +158,69 @@ class FileCleaner():
 
         """
         dates = data_df[DT]
+        tolerance = self.clean_config.regularity_tolerance
+        stretches = self._irregular_stretches(dates, tolerance) if tolerance is not None else None
+
+        if(stretches is not None and len(stretches) == 0):
+            self.tidy_report["Date fixing path"] = REGULAR_PATH
+            self.tidy_report["Records sent to date fixing model"] = 0
+            return np.ones(len(dates), dtype=bool)
+
         date_fixer = DateFixer.DateFixer(self.clean_config)
-        flags = date_fixer(dates)
+        if(stretches is None):
+            self.tidy_report["Date fixing path"] = MODEL_PATH
+            self.tidy_report["Records sent to date fixing model"] = len(dates)
+            return date_fixer(dates)
+
+        flags = np.ones(len(dates), dtype=bool)
+        for start, end in stretches:
+            flags[start:end] = date_fixer(dates.iloc[start:end])
+        self.tidy_report["Date fixing path"] = PARTIAL_PATH
+        self.tidy_report["Records sent to date fixing model"] = int(sum(end - start for start, end in stretches))
+        self.logger.debug("FileCleaner - fix_dates - irregular stretches: {}".format(stretches))
 
         return flags
 
+    def _irregular_stretches(self, dates: pd.Series, tolerance: int):
+        """Finds stretches of records, which need the date fixing model.
+
+        A difference between consecutive dates is irregular, if it deviates
+        from the interval by more than tolerance seconds. Both records of an
+        irregular difference and WINDOW_SIZE - 1 records on each side of them
+        form a stretch; overlapping stretches are joined.
+
+        Args:
+            dates:
+                Series of dates
+            tolerance:
+                Seconds a difference may deviate from the interval
+
+        Returns:
+            list:
+                (start, end) positions of the stretches. Empty if the dates
+                are regular. None if the whole measurement needs the model,
+                e.g. when a stretch would be shorter than WINDOW_SIZE.
+
+        """
+        differences = np.diff(np.asarray(dates, dtype="datetime64[ns]")) / np.timedelta64(1, "s")
+        irregular = np.abs(differences - self.clean_config.interval * 60) > tolerance
+        if(not irregular.any()):
+            return []
+
+        # Records joined by an irregular difference, widened by the context
+        context = WINDOW_SIZE - 1
+        needed = np.zeros(len(dates) + 1, dtype=np.int64)
+        positions = np.flatnonzero(irregular)
+        np.add.at(needed, np.maximum(positions - context, 0), 1)
+        np.add.at(needed, np.minimum(positions + 2 + context, len(dates)), -1)
+        needed = np.cumsum(needed[:-1]) > 0
+
+        edges = np.flatnonzero(np.diff(np.concatenate(([False], needed, [False])).astype(np.int8)))
+        stretches = list(zip(edges[::2].tolist(), edges[1::2].tolist()))
+        if(stretches == [(0, len(dates))] or any(end - start < WINDOW_SIZE for start, end in stretches)):
+            return None
+        return stretches
+
 
     def _replace_empty_strings_with_nans(self, data_df: pd.DataFrame):
         """Replaces values in cells containing empty strings with NaN
@@ -175,7 +251,11 @@ class FileCleaner():
         """Attempts to fill missing glucose values.
 
         Does not guarantee that missing values will be filled. Does not change index
-        of date_fixed.
+        of date_fixed. A missing value is filled with the glucose value of
+        the neighbouring record in not_fixed, if the neighbour is closer than
+        fill_glucose_tolerance minutes. The record after takes precedence over
+        the record before. The number of filled values is stored
+        in tidy_report under "Glucose values filled".
 
         Args:
             date_fixed:
@@ -189,30 +269,35 @@ class FileCleaner():
                 based on not_fixed dataframe. 
 
         """
-        def fill_missing_value(index, row):
-            filled = np.nan
-            index_no = not_fixed.index.get_loc(index)
-            try:
-                row_before = not_fixed.iloc[index_no - 1, :]
-                difference = (row[DT] - row_before[DT]) / np.timedelta64(1, "s")
-                if(difference < self.clean_config.fill_glucose_tolerance * 60):
-                    filled = row_before[GLUCOSE]
-            except:
-                pass
-
-            try:
-                row_after = not_fixed.iloc[index_no + 1, :]
-                difference = (row_after[DT] - row[DT]) / np.timedelta64(1, "s")
-                if(difference < self.clean_config.fill_glucose_tolerance * 60):
-                    filled = row_after[GLUCOSE]
-            except:
-                pass
-            return filled
-        
-        for index, row in date_fixed.iterrows():
-            if(pd.isnull(row[GLUCOSE])):
-                fill = fill_missing_value(index, row)
-                date_fixed.loc[index, GLUCOSE] = fill
+        missing = date_fixed[GLUCOSE].isnull().values
+        tolerance = self.clean_config.fill_glucose_tolerance
+        if(not missing.any() or tolerance is None):
+            self.tidy_report["Glucose values filled"] = 0
+            return date_fixed
+
+        # Positions of the records with missing glucose in not_fixed
+        positions = not_fixed.index.get_indexer(date_fixed.index[missing])
+        dates = not_fixed[DT].values
+        glucose = not_fixed[GLUCOSE].values.astype(np.float64)
+        tolerance = np.timedelta64(int(tolerance * 60), "s")
+        last_position = len(not_fixed) - 1
+
+        has_before = positions > 0
+        before = np.where(has_before, positions - 1, 0)
+        use_before = has_before & (dates[positions] - dates[before] < tolerance)
+
+        has_after = positions < last_position
+        after = np.where(has_after, positions + 1, last_position)
+        use_after = has_after & (dates[after] - dates[positions] < tolerance)
+
+        # The record after takes precedence over the record before
+        filled = np.full(len(positions), np.nan)
+        filled[use_before] = glucose[before[use_before]]
+        filled[use_after] = glucose[after[use_after]]
+
+        # The glucose dtype of the input is kept
+        date_fixed.loc[missing, GLUCOSE] = filled.astype(date_fixed[GLUCOSE].dtype)
+        self.tidy_report["Glucose values filled"] = int(np.sum(~np.isnan(filled)))
 
         return date_fixed
 
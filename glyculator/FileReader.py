@@ -9,6 +9,7 @@ import pandas as pd
 from pandas.core.tools.datetimes import _guess_datetime_format
 
 from .configs import ReadConfig
+from .Compact import DtypePolicy
 from .utils import ACCEPTED_EXTENSIONS, TEXT_EXTENSIONS, DT, GLUCOSE, DATE, TIME
 
 # TODO (konrad.pagacz@gmail.com) expand docs
@@ -24,14 +25,19 @@ class FileReader:
         string_io:
         bytes_io:
         read_report (dict): contains diagnostic information about the reading process
+        columnar (bool): flag for reading delimited files with the vectorized pandas parser
+        dtype_policy (DtypePolicy): if supplied, the returned dataframe has datetime64[ns] dates
+            and float64 glucose values restored by the policy (see DtypePolicy.frame).
+            It does not reduce memory - only CompactRecording does.
     
     """
     __attrs__ = [
         "file_name", "read_config", "extension", "delimited", "string_io", "bytes_io", "read_report",
-        "delimited"
+        "delimited", "columnar", "dtype_policy"
     ]
 
-    def __init__(self, file_name: str = None, string_io = None, bytes_io = None, read_config: ReadConfig = None):
+    def __init__(self, file_name: str = None, string_io = None, bytes_io = None, read_config: ReadConfig = None,
+        columnar: bool = False, dtype_policy: DtypePolicy = None):
 
         # File name, which contains the data to be read
         self.file_name = file_name
@@ -46,6 +52,13 @@ class FileReader:
         # Flag for the file being delimited
         self.delimited = False
 
+        # Flag for reading delimited files column-wise with pandas instead of row by row
+        self.columnar = columnar
+
+        if(dtype_policy is not None and not isinstance(dtype_policy, DtypePolicy)):
+            raise ValueError("dtype_policy must be a DtypePolicy or None")
+        self.dtype_policy = dtype_policy
+
         self.read_report = dict()
         self.logger = logging.getLogger(__name__)
 
@@ -109,6 +122,14 @@ class FileReader:
                 raise ValueError("The supplied ReadConfig fails to validate.\n")
 
         
+        # Columnar reading returns the final dataframe directly
+        if(self.file_name != None and self.delimited and self.columnar):
+            data = self.read_delimited_columnar()
+            if(self.dtype_policy is not None):
+                data = self.dtype_policy.frame(data)
+            self.logger.debug("FileReader - read_file - return:\n{}".format(data))
+            return data
+
         # Reading to a list of lists
         if(self.file_name != None):
             if(self.delimited):
@@ -137,6 +158,8 @@ class FileReader:
 
         # Initialize the dict as a pandas.DataFrame()
         data = pd.DataFrame(data_dict)
+        if(self.dtype_policy is not None):
+            data = self.dtype_policy.frame(data)
         self.logger.debug("FileReader - read_file - return:\n{}".format(data))
 
         return data
@@ -220,6 +243,92 @@ class FileReader:
         return file_
 
 
+    def read_delimited_columnar(self) -> pd.DataFrame:
+        """Reads a csv file column-wise
+
+        Faster alternative to read_delimited. Sniffs the format of the csv
+        and reads only the columns specified in read_config with the C parser
+        of pandas. Dates are converted in one vectorized call using
+        the detected format. Cells, which cannot be parsed, become NaT or NaN
+        instead of raising.
+
+        Returns:
+            pandas.DataFrame: dataframe with DT and GLUCOSE columns - the same
+                as the one returned by read_file
+
+        Raises:
+            RuntimeError: When file is empty or could not read its contents.
+            ValueError: When a date or time column has no values.
+
+        """
+        with open(self.file_name, newline='') as csv_file:
+            dialect = csv.Sniffer().sniff(csv_file.read(1024))
+
+        if(self.read_config.date_time_column != None):
+            columns = {
+                DT : self.read_config.date_time_column,
+                GLUCOSE : self.read_config.glucose_values_column,
+            }
+        else:
+            columns = {
+                DATE : self.read_config.date_column,
+                TIME : self.read_config.time_column,
+                GLUCOSE : self.read_config.glucose_values_column,
+            }
+
+        try:
+            raw = pd.read_csv(self.file_name, sep=dialect.delimiter, quotechar=dialect.quotechar,
+                              skipinitialspace=dialect.skipinitialspace, header=None,
+                              skiprows=self.read_config.header_skip, usecols=sorted(set(columns.values())),
+                              dtype=str, keep_default_na=False, engine="c")
+        except pd.errors.EmptyDataError:
+            raw = pd.DataFrame()
+
+        if(raw.shape[0] == 0):
+            raise RuntimeError("File {} empty or could not read its content.\n".\
+                format(self.file_name))
+
+        def first_value(col_name: str) -> str:
+            values = raw[columns[col_name]]
+            values = values[values != ""]
+            if(len(values) == 0):
+                raise ValueError("Column {} ({}) of file {} has no values.\n".format(
+                    columns[col_name], col_name, self.file_name))
+            return values.iloc[0]
+
+        parsed = {}
+        for col_name in [DT, DATE]:
+            if(col_name in columns):
+                dt_array = raw[columns[col_name]]
+                dt_format = _guess_datetime_format(first_value(col_name), dayfirst=True)
+                self.logger.debug("FileReader - read_delimited_columnar - detected {} format: {}"    \
+                    .format(col_name, dt_format))
+                parsed[col_name] = pd.to_datetime(dt_array, format=dt_format, errors="coerce")
+
+        if(TIME in columns):
+            time_array = raw[columns[TIME]]
+            if(len(first_value(TIME).split(":")) == 2):
+                dt_format = "%H:%M"
+            else:
+                dt_format = "%H:%M:%S"
+            self.logger.debug("FileReader - read_delimited_columnar - detected {} format: {}"    \
+                .format(TIME, dt_format))
+            times = pd.to_datetime(time_array, format=dt_format, errors="coerce")
+            parsed[DT] = parsed[DATE].dt.normalize() + (times - times.dt.normalize())
+
+        glucose = pd.to_numeric(raw[columns[GLUCOSE]], errors="coerce")
+
+        data = pd.DataFrame({
+            DT : parsed[DT].values,
+            GLUCOSE : glucose.values.astype(np.float64),
+        })
+        self.read_report["Unparsed dates"] = int(data[DT].isnull().sum())
+        self.read_report["Unparsed glucose values"] = int((glucose.isnull() & (raw[columns[GLUCOSE]] != "")).sum())
+
+        self.logger.debug("FileReader - read_delimited_columnar - return: {}".format(data))
+        return data
+
+
     def read_excel(self):
         """Reads an excel file
 
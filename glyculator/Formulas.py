@@ -0,0 +1,122 @@
+"""Formulas of glycemic variability indices shared by GVIndex classes
+and every engine calculating them (BatchCalculator, GlucoseHistogram,
+Cohort, StreamingAccumulator, GlucoseSummary, WindowIndex).
+
+Per-reading formulas accept numpy arrays or scalars and return NaN,
+where the formula is undefined, so engines skip undefined values
+with nan-aware reductions.
+
+"""
+
+import typing
+
+import numpy as np
+
+from .configs import CalcConfig
+
+
+# mg/dl in 1 mmol/l
+MG_PER_MMOL = 18
+# mg/dl in 1 mmol/l used by the eA1c formula
+EA1C_MG_PER_MMOL = 18.02
+# GRADE hypoglycemia and hyperglycemia thresholds in mmol/l
+GRADE_HYPO_MMOL = 90 / 18
+GRADE_HYPER_MMOL = 140 / 18
+# Reference glucose value of M100 in mg/dl
+M100_REFERENCE = 100
+
+
+def to_mmol(glucose, unit: str):
+    """Glucose values in mmol/l"""
+    return glucose / MG_PER_MMOL if unit == "mg" else glucose
+
+
+def log10(glucose):
+    """Logarithm of glucose values, NaN for non-positive values"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(glucose > 0, np.log10(np.where(glucose > 0, glucose, 1)), np.nan)
+
+
+def below(glucose, threshold: float):
+    """Boolean mask of glucose values below threshold, False for NaN"""
+    with np.errstate(invalid="ignore"):
+        return glucose < threshold
+
+
+def above(glucose, threshold: float):
+    """Boolean mask of glucose values above threshold, False for NaN"""
+    with np.errstate(invalid="ignore"):
+        return glucose > threshold
+
+
+def m100(log10_glucose, unit: str):
+    """M100 of every reading from the logarithm of its glucose value"""
+    reference = M100_REFERENCE if unit == "mg" else M100_REFERENCE / MG_PER_MMOL
+    return 1000 * np.abs(log10_glucose - np.log10(reference))
+
+
+def grade(mmol):
+    """GRADE score of every reading from its glucose value in mmol/l"""
+    with np.errstate(invalid="ignore"):
+        return 425 * np.power(log10(log10(mmol) + 0.16), 2)
+
+
+def risk(log10_glucose):
+    """Symmetrized glucose scale of LBGI and HBGI. NaN for glucose values below 1"""
+    with np.errstate(invalid="ignore"):
+        return 1.509 * (np.power(log10_glucose, 1.084) - 5.381)
+
+
+def bgi(risk_values, low: bool):
+    """Low (low=True) or high blood glucose risk of every reading. NaN where risk is undefined"""
+    with np.errstate(invalid="ignore"):
+        return np.where(risk_values > 0 if low else risk_values < 0, 0, 10 * np.power(risk_values, 2))
+
+
+def ea1c(mean: float, unit: str) -> float:
+    """Estimated haemoglobin A1c from the mean glucose value"""
+    mean = mean / EA1C_MG_PER_MMOL if unit == "mg" else mean
+    return (mean + 2.52) / 1.583
+
+
+def j_index(mean: float, std: float) -> float:
+    return 0.001 * np.power(mean + std, 2)
+
+
+def check_threshold(threshold) -> None:
+    if(type(threshold) not in [int, float]):
+        raise ValueError("threshold must be int or float")
+
+
+def auc(area, records, standardize: bool = True):
+    """AUC from the trapezoid area of records readings, standardized to the length of the measurement"""
+    if(not standardize):
+        return area
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.divide(area, records - 1)
+
+
+def check_hours(hours: int) -> int:
+    if(type(hours) != int or hours <= 0):
+        raise ValueError("hours must be a positive int")
+    return hours
+
+
+def check_bounds(lower_bound, upper_bound) -> None:
+    if(type(lower_bound) not in [float, int] or type(upper_bound) not in [int, float]):
+        raise ValueError("lower_bound and upper_bound must be int")
+
+
+def time_in_range_bounds(calc_config: CalcConfig, lower_bound: float = None,
+    upper_bound: float = None) -> typing.Tuple[float, float]:
+    """Bounds of Time in range - calc_config.tir_range unless given.
+
+    Raises:
+        ValueError:
+            if any of the bounds is not int or float
+
+    """
+    lower_bound = lower_bound if lower_bound is not None else calc_config.tir_range[0]
+    upper_bound = upper_bound if upper_bound is not None else calc_config.tir_range[1]
+    check_bounds(lower_bound, upper_bound)
+    return lower_bound, upper_bound
@@ -0,0 +1,97 @@
+import typing
+
+import numpy as np
+import pandas as pd
+
+from .cleaner.config import MAX_ADDITIONAL_RECORDS
+
+
+def align_to_grid(dates: typing.Union[pd.Series, np.ndarray, list], interval: int,
+    lookback: int = MAX_ADDITIONAL_RECORDS + 1) -> np.ndarray:
+    """Flags dates, which best match a regular grid of interval minutes.
+
+    Deterministic alternative to the date fixing model. Finds the chain
+    of dates, in which consecutive dates are a whole number of intervals
+    apart, maximizing the number of kept dates minus their deviations
+    from the grid. Deviations are measured between consecutive kept
+    dates, so a slowly drifting sensor clock is followed. Dates less
+    than half an interval after a kept date (extra readings, duplicates)
+    can not be kept. Of equally good chains the earliest dates are kept.
+
+    Repeated dates are collapsed into their first occurrence before the
+    search. The dynamic programming looks back at most lookback dates
+    for the previous kept date and at the end of the best chain found
+    so far, so the cost is O(len(dates) * lookback). A date, which is
+    more than half an interval before all of them (the sensor clock was
+    set back), continues the best chain found so far, so dates after
+    the reset are kept as well.
+
+    Arguments:
+        dates:
+            list-like of sorted dates
+        interval (int):
+            minutes between readings of the grid
+        lookback (int):
+            maximal number of dates between two kept dates plus one
+
+    Returns:
+        numpy.ndarray:
+            boolean array - True for dates on the grid
+
+    Raises:
+        ValueError:
+            if interval or lookback is not a positive int
+
+    """
+    if(type(interval) != int or interval <= 0):
+        raise ValueError("interval must be a positive int")
+    if(type(lookback) != int or lookback <= 0):
+        raise ValueError("lookback must be a positive int")
+
+    seconds = np.asarray(dates, dtype="datetime64[ns]").astype(np.int64) / 1e9
+    length = len(seconds)
+    step = interval * 60
+    if(length < 2):
+        return np.ones(length, dtype=bool)
+
+    # Most recordings are regular - every date is kept
+    differences = np.diff(seconds)
+    if(np.all(np.abs(differences - step) < step / 2)):
+        return np.ones(length, dtype=bool)
+
+    # Only the first of repeated dates can be kept
+    unique = np.flatnonzero(np.concatenate(([True], differences != 0)))
+    seconds = seconds[unique].tolist()
+    length = len(seconds)
+
+    score = [1.0] * length
+    previous = [-1] * length
+    # Best score of the dates before i and its position
+    top, top_position = score[0], 0
+    for i in range(1, length):
+        best, best_previous = 1.0, -1
+        current = seconds[i]
+        first = max(i - lookback, 0)
+        candidates = list(range(first, i))
+        if(top_position < first):
+            candidates.insert(0, top_position)
+        for j in candidates:
+            steps = round((current - seconds[j]) / step)
+            if(steps < 1):
+                continue
+            candidate = score[j] + 1 - abs(current - seconds[j] - steps * step) / step
+            if(candidate > best):
+                best, best_previous = candidate, j
+        if(best_previous == -1 and all(current < seconds[j] - step / 2 for j in candidates)):
+            best, best_previous = top + 1, top_position
+        score[i] = best
+        previous[i] = best_previous
+        if(best > top):
+            top, top_position = best, i
+
+    flags = np.zeros(len(differences) + 1, dtype=bool)
+    position = int(np.argmax(score))
+    while(position != -1):
+        flags[unique[position]] = True
+        position = previous[position]
+    return flags
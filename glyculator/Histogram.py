@@ -0,0 +1,140 @@
+import functools
+import typing
+
+import numpy as np
+import pandas as pd
+
+from .configs import CalcConfig
+from . import Formulas
+
+
+# Lookup tables cover glucose values from 0 to at least this value (mg/dl)
+DEFAULT_TABLE_SIZE = 512
+
+
+def is_histogrammable(glucose: np.ndarray, unit: str = "mg") -> bool:
+    """Checks whether glucose values can be evaluated with GlucoseHistogram.
+
+    Values must be in mg/dl and all non-missing values must be non-negative integers.
+
+    """
+    if(unit != "mg"):
+        return False
+    valid = glucose[~np.isnan(glucose)]
+    return bool(np.all(valid >= 0) and np.all(np.mod(valid, 1) == 0))
+
+
+@functools.lru_cache(maxsize=None)
+def _lookup_table(name: str, size: int) -> np.ndarray:
+    """Value of a per-reading function for every glucose value from 0 to size - 1.
+
+    Values, for which the function is undefined, are NaN.
+
+    """
+    values = np.arange(size, dtype=np.float64)
+    if(name == "m100"):
+        table = Formulas.m100(Formulas.log10(values), "mg")
+    elif(name == "grade"):
+        table = Formulas.grade(Formulas.to_mmol(values, "mg"))
+    elif(name in ["lbgi", "hbgi"]):
+        table = Formulas.bgi(Formulas.risk(Formulas.log10(values)), low=name == "lbgi")
+    else:
+        raise ValueError("Unknown lookup table: {}".format(name))
+
+    table[~np.isfinite(table)] = np.nan
+    table.flags.writeable = False
+    return table
+
+
+class GlucoseHistogram():
+    """Histogram of integer glucose values of one measurement.
+
+    Indices, which depend only on the distribution of glucose values,
+    are evaluated as dot products of the histogram and lookup tables
+    of per-value functions. Building the histogram is the only pass
+    over the measurement; every index after that costs O(size of the table).
+
+    Attributes:
+        counts (numpy.ndarray):
+            counts[v] is the number of readings equal to v mg/dl
+        length (int):
+            number of readings including the missing ones
+        valid_count (int):
+            number of non-missing readings
+
+    """
+    def __init__(self, glucose: typing.Union[np.ndarray, pd.Series], calc_config: CalcConfig) -> None:
+        glucose = np.asarray(glucose, dtype=np.float64)
+        if(not is_histogrammable(glucose, calc_config.unit)):
+            raise ValueError("GlucoseHistogram needs non-negative integer glucose values in mg/dl")
+
+        self.calc_config = calc_config
+        self.length = len(glucose)
+        valid = glucose[~np.isnan(glucose)].astype(np.int64)
+        self.valid_count = len(valid)
+
+        size = DEFAULT_TABLE_SIZE
+        if(self.valid_count and valid.max() >= size):
+            size = int(valid.max()) + 1
+        self.counts = np.bincount(valid, minlength=size)
+        self.values = np.arange(size, dtype=np.float64)
+
+    def table(self, name: str) -> np.ndarray:
+        return _lookup_table(name, len(self.counts))
+
+    def expectation(self, table: np.ndarray) -> float:
+        """Mean of table values over the readings, skipping undefined values."""
+        defined = ~np.isnan(table)
+        counts = self.counts[defined]
+        if(np.sum(counts) == 0):
+            return np.nan
+        return np.dot(counts, table[defined]) / np.sum(counts)
+
+    def fraction(self, mask: np.ndarray) -> float:
+        """Fraction of non-missing readings, which values satisfy mask."""
+        return np.sum(self.counts[mask]) / self.valid_count
+
+    def mean(self) -> float:
+        return np.dot(self.counts, self.values) / self.valid_count
+
+    def variance(self) -> float:
+        return np.dot(self.counts, np.power(self.values - self.mean(), 2)) / self.valid_count
+
+    def median(self) -> float:
+        cumulative = np.cumsum(self.counts)
+        lower = np.searchsorted(cumulative, (self.valid_count - 1) // 2, side="right")
+        upper = np.searchsorted(cumulative, self.valid_count // 2, side="right")
+        return (lower + upper) / 2
+
+    def lbgi(self) -> float:
+        return self.expectation(self.table("lbgi"))
+
+    def hbgi(self) -> float:
+        return self.expectation(self.table("hbgi"))
+
+
+def _time_in_range(hist: GlucoseHistogram, lower_bound: float = None, upper_bound: float = None) -> float:
+    lower_bound, upper_bound = Formulas.time_in_range_bounds(hist.calc_config, lower_bound, upper_bound)
+    return hist.fraction((hist.values > lower_bound) & (hist.values < upper_bound))
+
+
+# Evaluators of INDICES_TO_CALC entries working on a GlucoseHistogram
+HISTOGRAM_INDICES = {
+    "Mean" : lambda hist: hist.mean(),
+    "Median" : lambda hist: hist.median(),
+    "Variance" : lambda hist: hist.variance(),
+    "Standard deviation" : lambda hist: np.sqrt(hist.variance()),
+    "CV" : lambda hist: np.sqrt(hist.variance()) / hist.mean(),
+    "Missing values" : lambda hist: (hist.length - hist.valid_count) / hist.length,
+    "Total time points No" : lambda hist: hist.length,
+    "M100" : lambda hist: hist.expectation(hist.table("m100")),
+    "J-index" : lambda hist: Formulas.j_index(hist.mean(), np.sqrt(hist.variance())),
+    "Hypoglycemia fraction" : lambda hist, threshold: hist.fraction(hist.values < threshold),
+    "Hyperglycemia fraction" : lambda hist, threshold: hist.fraction(hist.values > threshold),
+    "GRADE" : lambda hist: hist.expectation(hist.table("grade")),
+    "Low Blood Glucose Index" : lambda hist: hist.lbgi(),
+    "High Blood Glucose Index" : lambda hist: hist.hbgi(),
+    "eA1c" : lambda hist: Formulas.ea1c(hist.mean(), hist.calc_config.unit),
+    "Time in hypoglycemia" : lambda hist, threshold: np.sum(hist.counts[hist.values < threshold]) * hist.calc_config.interval,
+    "Time in range" : lambda hist, lower_bound=None, upper_bound=None: _time_in_range(hist, lower_bound, upper_bound),
+}
@@ -8,6 +8,9 @@ from scipy import signal
 
 from .utils import DT, GLUCOSE
 from .configs import CalcConfig
+from .Episodes import find_episodes
+from .Lags import lagged_differences
+from . import Formulas
 
 class GVIndex():
     """Abstraction of a glycemic variability index.
@@ -15,11 +18,25 @@ class GVIndex():
     Attributes:
         calc_config: configuration for calculations
         df: dataframe with a datetime column and a glucose values column
+        requires: names of intermediates (see BatchCalculator.Intermediates)
+            the index is calculated from. Used by IndexScheduler to compute
+            only the intermediates needed by the requested indices.
     """
     __attrs__ = [
         "calc_config", "df"
     ]
 
+    requires = ()
+
+    @classmethod
+    def requirements(cls, calc_config: CalcConfig, **kwargs) -> list:
+        """Intermediates needed to calculate the index with the given arguments.
+
+        Intermediates, which depend on an argument, are (name, argument) tuples.
+
+        """
+        return list(cls.requires)
+
     def __init__(self, calc_config: CalcConfig, df: pd.DataFrame = None) -> None:
         self.set_df(df)
         self.set_calc_config(calc_config)
@@ -46,6 +63,8 @@ class GVIndex():
 
 
 class GVMean(GVIndex):
+    requires = ("mean", )
+
     def __init__(self, **kwargs) -> None:
         super(GVMean, self).__init__(**kwargs)
 
@@ -54,6 +73,8 @@ class GVMean(GVIndex):
     
 
 class GVMedian(GVIndex):
+    requires = ("valid_values", "valid_count")
+
     def __init__(self, **kwargs) -> None:
         super(GVMedian, self).__init__(**kwargs)
 
@@ -62,6 +83,8 @@ class GVMedian(GVIndex):
 
 
 class GVVariance(GVIndex):
+    requires = ("var", )
+
     def __init__(self, **kwargs) -> None:
         super(GVVariance, self).__init__(**kwargs)
 
@@ -70,6 +93,8 @@ class GVVariance(GVIndex):
 
 
 class GVNanFraction(GVIndex):
+    requires = ("length", "valid_count")
+
     def __init__(self, **kwargs) -> None:
         super(GVNanFraction, self).__init__(**kwargs)
 
@@ -78,6 +103,8 @@ class GVNanFraction(GVIndex):
 
 
 class GVRecordsNo(GVIndex):
+    requires = ("length", )
+
     def __init__(self, **kwargs) -> None:
         super(GVRecordsNo, self).__init__(**kwargs)
 
@@ -86,6 +113,8 @@ class GVRecordsNo(GVIndex):
 
 
 class GVCV(GVIndex):
+    requires = ("mean", "std")
+
     def __init__(self, **kwargs) -> None:
         super(GVCV, self).__init__(**kwargs)
 
@@ -94,6 +123,8 @@ class GVCV(GVIndex):
 
 
 class GVstd(GVIndex):
+    requires = ("std", )
+
     def __init__(self, **kwargs) -> None:
         super(GVstd, self).__init__(**kwargs)
 
@@ -102,29 +133,28 @@ class GVstd(GVIndex):
 
 
 class GVm100(GVIndex):
+    requires = ("log10", )
+
     def __init__(self, **kwargs) -> None:
         super(GVm100, self).__init__(**kwargs)
 
     def calculate(self) -> float:
-        if(self.calc_config.unit == "mg"):
-            # np.ma.array is numpy built-in mask function
-            # numpy functions will mask elements that are inf in
-            # calculations with masked array
-            return np.nanmean(1000 * np.abs(np.log10(np.ma.array(self.df[GLUCOSE]) / 100)))
-        if(self.calc_config.unit == "mmol"):
-            # glucose: mmol/l * 18 = mg/dl
-            return np.nanmean(1000 * np.abs(np.log10(np.ma.array(self.df[GLUCOSE]) / (100 / 18))))
+        return np.nanmean(Formulas.m100(Formulas.log10(self.df[GLUCOSE].values), self.calc_config.unit))
 
 
 class GVj(GVIndex):
+    requires = ("mean", "std")
+
     def __init__(self, **kwargs) -> None:
         super(GVj, self).__init__(**kwargs)
 
     def calculate(self) -> float:
-        return 0.001 * np.power(np.nanmean(self.df[GLUCOSE]) + np.nanstd(self.df[GLUCOSE]), 2)
+        return Formulas.j_index(np.nanmean(self.df[GLUCOSE]), np.nanstd(self.df[GLUCOSE]))
 
 
 class GVmage(GVIndex):
+    requires = ("extrema", "std")
+
     def __init__(self, **kwargs) -> None:
         super(GVmage, self).__init__(**kwargs)
 
@@ -141,15 +171,41 @@ class GVmage(GVIndex):
                 value of MAGE
 
         """
+        return self._mage(self.df[GLUCOSE], np.nanmean(self.df[GLUCOSE]), np.nanstd(self.df[GLUCOSE]))
+
+    def _mage(self, glucose: pd.Series, mean: float, std: float) -> float:
+        """Calculates MAGE from precomputed mean and standard deviation.
+
+        Arguments:
+            glucose (pandas.Series):
+                glucose values
+            mean (float):
+                mean of glucose values ignoring nans
+            std (float):
+                standard deviation of glucose values ignoring nans
+
+        Returns:
+            float:
+                value of MAGE
+
+        """
+        smoothed = self._smooth(glucose, mean)
+        return self._excursions(smoothed, self._extremas(smoothed), std)
+
+    def _smooth(self, glucose: pd.Series, mean: float) -> np.ndarray:
+        """Replaces nans with the mean and smooths glucose values with a moving average."""
         # Mean substitution of nans
-        nans_replaced = self.df[GLUCOSE].replace(to_replace=np.nan, value=np.nanmean(self.df[GLUCOSE]))
+        nans_replaced = glucose.replace(to_replace=np.nan, value=mean)
         self.logger.debug("GVmage - calculate - nans_replaced: {}".format(nans_replaced))
 
         # Smoothing
         smoothed = self._moving_average(nans_replaced,
             window=self.calc_config.mage_moving_average_window_size)
         self.logger.debug("GVmage - calculate - smoothed: {}".format(smoothed))
+        return smoothed
 
+    def _extremas(self, smoothed: np.ndarray) -> list:
+        """Positions of alternating local minimas and maximas of smoothed glucose values."""
         # Finding local maximas and minimas
         maximas = signal.find_peaks(smoothed, distance=self.calc_config.mage_peak_distance)[0]
         minimas = signal.find_peaks(-1 * smoothed, distance=self.calc_config.mage_peak_distance)[0]
@@ -158,8 +214,10 @@ class GVmage(GVIndex):
 
         # minimas and maximas are joined in an alternating manner
         # example: minimas[0] maximas[0] minimas[1] maximas[1]
-        joined = self._join_extremas(minimas, maximas)
+        return self._join_extremas(minimas, maximas)
 
+    def _excursions(self, smoothed: np.ndarray, joined: list, std: float) -> float:
+        """Mean of differences between consecutive extremas greater than the excursion threshold."""
         if (joined == []):
             raise RuntimeError("No maximas or minimas found in the measurement")
 
@@ -169,9 +227,9 @@ class GVmage(GVIndex):
         self.logger.debug("GVmage - calculate - joined values: \n{} \nvalue_differences: \n{}".format(joined_values, value_differences))
 
         if(self.calc_config.mage_excursion_threshold == "sd"):
-            threshold = np.nanstd(self.df[GLUCOSE])
+            threshold = std
         if(self.calc_config.mage_excursion_threshold == "half_sd"):
-            threshold = np.nanstd(self.df[GLUCOSE]) * 0.5
+            threshold = std * 0.5
 
         self.logger.debug("GVmage - calculate - threshold: {}".format(threshold))
         value_differences = value_differences[value_differences > threshold]
@@ -236,58 +294,50 @@ class GVmage(GVIndex):
         if(len(minimas) == 0 or len(maximas) == 0):
             return []
 
-        joined = []
-        if(minimas[0] < maximas[0]):
-            minimas_turn = False
-            joined.append(minimas[0])
-        else:
-            minimas_turn = True
-            joined.append(maximas[0])
+        # Merge both sorted lists and keep only the first extremum
+        # of every run of extremas of the same type
+        positions = np.concatenate((np.asarray(minimas, dtype=np.int64), np.asarray(maximas, dtype=np.int64)))
+        is_minima = np.concatenate((np.ones(len(minimas), dtype=bool), np.zeros(len(maximas), dtype=bool)))
+        order = np.argsort(positions, kind="mergesort")
+        positions = positions[order]
+        is_minima = is_minima[order]
 
-        self._join_extremas_util(joined, minimas, maximas, int(not minimas_turn), int(minimas_turn), minimas_turn)
-        return joined
+        type_changes = np.concatenate(([True], is_minima[1:] != is_minima[:-1]))
+        return positions[type_changes].tolist()
 
-    def _join_extremas_util(self, joined, minimas, maximas, minimas_ind, maximas_ind, minimas_turn) -> list:
-        self.logger.debug("GVmage - _join_extremas_util - called with: \njoined {} \nminimas {} \nmaximas {} \nminimas_ind {} \nmaximas_ind {} \nminimas_turn {}"    \
-            .format(joined, minimas, maximas, minimas_ind, maximas_ind, minimas_turn))
 
-        if(minimas_turn):
-            if(minimas_ind >= len(minimas)):
-                self.logger.debug("GVmage - _join_extremas_util - return: {}".format(joined))
-                return joined
-
-            if(minimas[minimas_ind] > joined[-1]):
-                joined.append(minimas[minimas_ind])
-                minimas_turn = False
-            self._join_extremas_util(joined, minimas, maximas, minimas_ind + 1, maximas_ind, minimas_turn)
-        else:
-            if(maximas_ind >= len(maximas)):
-                self.logger.debug("GVmage - _join_extremas_util - return: {}".format(joined))
-                return joined
-            
-            if(maximas[maximas_ind] > joined[-1]):
-                joined.append(maximas[maximas_ind])
-                minimas_turn = True
-            self._join_extremas_util(joined, minimas, maximas, minimas_ind, maximas_ind + 1, minimas_turn)
-
-        
 class GVmodd(GVIndex):
+    @classmethod
+    def requirements(cls, calc_config: CalcConfig, **kwargs) -> list:
+        return [("lagged", 24 * 60)]
+
     def __init__(self, **kwargs) -> None:
         super(GVmodd, self).__init__(**kwargs)
 
     def calculate(self) -> float:
-        daily_differences = np.diff(self.df[GLUCOSE], n=int(24 * 60 / self.calc_config.interval))
+        """Calculates MODD (mean of daily differences)
+
+        Pairs every glucose value with the value 24 hours earlier.
+        Assumes the measurement lies on a regular grid like the output
+        of FileCleaner.
+
+        """
+        daily_differences = lagged_differences(self.df[GLUCOSE], self.calc_config.interval, [24 * 60])[24 * 60]
         return np.nanmean(daily_differences)
 
 
 class GVcongaX(GVIndex):
+    @classmethod
+    def requirements(cls, calc_config: CalcConfig, hours: int = None, **kwargs) -> list:
+        return [("lagged", hours * 60)] if type(hours) == int else []
+
     def __init__(self, **kwargs) -> None:
         super(GVcongaX, self).__init__(**kwargs)
 
     def calculate(self, hours: int) -> float:
         if(type(hours) != int or hours <= 0):
             raise ValueError("hours must be a positive int")
-        differences = np.diff(self.df[GLUCOSE], n=int(hours * 60 / self.calc_config.interval))
+        differences = lagged_differences(self.df[GLUCOSE], self.calc_config.interval, [hours * 60])[hours * 60]
         return np.nanvar(differences)
 
     def __call__(self, df: pd.DataFrame, hours: int) -> float:
@@ -298,16 +348,19 @@ class GVcongaX(GVIndex):
 
 
 class GVhypoglycemia(GVIndex):
+    @classmethod
+    def requirements(cls, calc_config: CalcConfig, threshold: float = None, **kwargs) -> list:
+        return [("below", threshold), "valid_count"]
+
     def __init__(self, **kwargs) ->None:
         super(GVhypoglycemia, self).__init__(**kwargs)
 
-    def calculate(self, threshold: int) -> float:
-        if(type(threshold) != int):
-            raise ValueError("threshold must be int")
+    def calculate(self, threshold: float) -> float:
+        Formulas.check_threshold(threshold)
         
         return np.nansum(self.df[GLUCOSE] < threshold) / np.sum(np.invert(np.isnan(self.df[GLUCOSE])))
 
-    def __call__(self, df: pd.DataFrame, threshold: int) -> float:
+    def __call__(self, df: pd.DataFrame, threshold: float) -> float:
         if(type(df) != pd.DataFrame):
             raise ValueError("df must be a pandas.DataFrame")
         self.df = df
@@ -315,16 +368,19 @@ class GVhypoglycemia(GVIndex):
 
 
 class GVhyperglycemia(GVIndex):
+    @classmethod
+    def requirements(cls, calc_config: CalcConfig, threshold: float = None, **kwargs) -> list:
+        return [("above", threshold), "valid_count"]
+
     def __init__(self, **kwargs) -> None:
         super(GVhyperglycemia, self).__init__(**kwargs)
 
-    def calculate(self, threshold: int) -> float:
-        if(type(threshold) != int):
-            raise ValueError("threshold must be int")
+    def calculate(self, threshold: float) -> float:
+        Formulas.check_threshold(threshold)
 
         return np.nansum(self.df[GLUCOSE] > threshold) / np.sum(np.invert(np.isnan(self.df[GLUCOSE])))
 
-    def __call__(self, df: pd.DataFrame, threshold: int) -> float:
+    def __call__(self, df: pd.DataFrame, threshold: float) -> float:
         if(type(df) != pd.DataFrame):
             raise ValueError("df must be a pandas.DataFrame")
         self.df = df
@@ -332,110 +388,88 @@ class GVhyperglycemia(GVIndex):
 
 
 class GVgrade(GVIndex):
+    requires = ("grade", )
+
     def __init__(self, **kwargs) -> None:
         super(GVgrade, self).__init__(**kwargs)
 
     def calculate(self) -> float:
-        if(self.calc_config.unit == "mg"):
-            self.df[GLUCOSE] = self.df[GLUCOSE] / 18
-        if(self.calc_config.unit == "mmol"):
-            self.df[GLUCOSE] = self.df[GLUCOSE]
-        
-        GRADEs = self.GRADE(self.df[GLUCOSE])
+        GRADEs = self.GRADE(Formulas.to_mmol(self.df[GLUCOSE], self.calc_config.unit))
         return np.nanmean(GRADEs)
 
-    def GRADE(self, array: pd.Series) -> pd.Series:
-        return 425 * np.power(np.log10(np.log10(np.ma.array(array)) + 0.16), 2)
+    def GRADE(self, array: pd.Series) -> np.ndarray:
+        return Formulas.grade(np.asarray(array))
 
 
 class GVgrade_hypo(GVIndex):
+    requires = ("grade", "mmol")
+
     def __init__(self, **kwargs) -> None:
         super(GVgrade_hypo, self).__init__(**kwargs)
 
     def calculate(self) -> float:
-        if(self.calc_config.unit == "mg"):
-            threshold = 90 / 18
-            glucose_values = self.df[GLUCOSE] / 18
-
-        if(self.calc_config.unit == "mmol"):
-            threshold = 90 / 18
-            glucose_values = self.df[GLUCOSE]
-
+        glucose_values = Formulas.to_mmol(self.df[GLUCOSE], self.calc_config.unit)
 
         GRADEs = self.GRADE(glucose_values)
-        hypoglycemias = glucose_values < threshold
+        hypoglycemias = glucose_values < Formulas.GRADE_HYPO_MMOL
 
-        return np.nansum(GRADEs[hypoglycemias]) / np.nansum(GRADEs)
+        return np.nansum(GRADEs[hypoglycemias.values]) / np.nansum(GRADEs)
 
-    def GRADE(self, array: pd.Series) -> pd.Series:
-        return 425 * np.power(np.log10(np.log10(np.ma.array(array)) + 0.16), 2)
+    def GRADE(self, array: pd.Series) -> np.ndarray:
+        return Formulas.grade(np.asarray(array))
 
 
 class GVgrade_hyper(GVIndex):
+    requires = ("grade", "mmol")
+
     def __init__(self, **kwargs) -> None:
         super(GVgrade_hyper, self).__init__(**kwargs)
 
     def calculate(self) -> float:
-        if(self.calc_config.unit == "mg"):
-            threshold = 140 / 18
-            glucose_values = self.df[GLUCOSE] / 18
-
-        if(self.calc_config.unit == "mmol"):
-            threshold = 140 / 18
-            glucose_values = self.df[GLUCOSE]
+        glucose_values = Formulas.to_mmol(self.df[GLUCOSE], self.calc_config.unit)
 
         GRADEs = self.GRADE(glucose_values)
-        hyperglycemias = glucose_values > threshold
+        hyperglycemias = glucose_values > Formulas.GRADE_HYPER_MMOL
+
+        return np.nansum(GRADEs[hyperglycemias.values]) / np.nansum(GRADEs)
 
-        return np.nansum(GRADEs[hyperglycemias]) / np.nansum(GRADEs)
+    def GRADE(self, array: pd.Series) -> np.ndarray:
+        return Formulas.grade(np.asarray(array))
 
-    def GRADE(self, array: pd.Series) -> pd.Series:
-        return 425 * np.power(np.log10(np.log10(np.ma.array(array)) + 0.16), 2)
-            
 
 class GVlbgi(GVIndex):
+    requires = ("risk", )
+
     def __init__(self, **kwargs) -> None:
         super(GVlbgi, self).__init__(**kwargs)
 
     def calculate(self) -> float:
-        f_glucose = 1.509 * (np.power(np.log10(np.ma.array(self.df[GLUCOSE])), 1.084) - 5.381)
-        r_glucose = 10 * np.power(f_glucose, 2)
-
-        rl = np.array(r_glucose)
-        rl[f_glucose > 0] = 0
-
-        return np.nanmean(rl)
+        f_glucose = Formulas.risk(Formulas.log10(self.df[GLUCOSE].values))
+        return np.nanmean(Formulas.bgi(f_glucose, low=True))
 
 
 class GVhbgi(GVIndex):
+    requires = ("risk", )
+
     def __init__(self, **kwargs) -> None:
         super(GVhbgi, self).__init__(**kwargs)
 
     def calculate(self) -> float:
-        f_glucose = 1.509 * (np.power(np.log10(np.ma.array(self.df[GLUCOSE])), 1.084) - 5.381)
-        r_glucose = 10 * np.power(f_glucose, 2)
-
-        rh = np.array(r_glucose)
-        rh[f_glucose < 0] = 0
-
-        return np.nanmean(rh)
+        f_glucose = Formulas.risk(Formulas.log10(self.df[GLUCOSE].values))
+        return np.nanmean(Formulas.bgi(f_glucose, low=False))
 
 
 class GVeA1c(GVIndex):
     """Calculates estimated haemoglobin A1c
 
     """
+    requires = ("mean", )
+
     def __init__(self, **kwargs) -> None:
         super(GVeA1c, self).__init__(**kwargs)
 
     def calculate(self) -> float:
-        if(self.calc_config.unit == "mg"):
-            glucose_values = self.df[GLUCOSE] / 18.02
-        
-        if(self.calc_config.unit == "mmol"):
-            glucose_values = self.df[GLUCOSE]
-
-        return (np.nanmean(glucose_values) + 2.52) / 1.583
+        return Formulas.ea1c(np.nanmean(self.df[GLUCOSE]), self.calc_config.unit)
 
 
 class GVauc(GVIndex):
@@ -447,6 +481,8 @@ class GVauc(GVIndex):
     length of the measurement (supplied via calc_config)
 
     """
+    requires = ("length", )
+
     def __init__(self, **kwargs) -> None:
         super(GVauc, self).__init__(**kwargs)
 
@@ -454,24 +490,22 @@ class GVauc(GVIndex):
         # nan replacement is required for the auc functions
         glucose_values = np.where(self.df[GLUCOSE] == np.nan, 0, self.df[GLUCOSE])
 
-        if(standardize):
-            auc = np.trapz(glucose_values, dx=self.calc_config.interval)   \
-                / (len(glucose_values) - 1)
-        else:
-            auc = np.trapz(glucose_values, dx=self.calc_config.interval) 
-
-        return auc
+        return Formulas.auc(np.trapz(glucose_values, dx=self.calc_config.interval), len(glucose_values), standardize)
 
 
 class GVhypo_events_count(GVIndex):
+    @classmethod
+    def requirements(cls, calc_config: CalcConfig, threshold: float = None, **kwargs) -> list:
+        return [("episodes_below", threshold)]
+
     def __init__(self, **kwargs) -> None:
         super(GVhypo_events_count, self).__init__(**kwargs)
 
-    def calculate(self, threshold: int, threshold_duration: int = 15) -> float:
+    def calculate(self, threshold: float, threshold_duration: int = 15) -> float:
         """Calculates number of hypoglycemic events.
 
         Arguments:
-            threshold (int):
+            threshold (int or float):
                 Values of glycemia below this are treated as hypoglycemias
             hypo_event_records_threshold_duration (int, optional, default=15):
                 Sequence of hypoglycemic glucose values must have duration
@@ -488,42 +522,30 @@ class GVhypo_events_count(GVIndex):
                 are not int
 
         """
-        if(type(threshold) != int):
-            raise ValueError("threshold must be int")
+        Formulas.check_threshold(threshold)
 
         if(type(threshold_duration) != int):
             raise ValueError("hypo_event_records_threshold_duration must be int")
 
-        hypoglycemias = self.df[GLUCOSE] < threshold
-
+        episodes = find_episodes(self.df[GLUCOSE], self.calc_config.interval, hypo_thresholds=[threshold])
         hypo_event_records_threshold = threshold_duration / self.calc_config.interval
 
-        current_hypo_records = 0
-        total_hypo_event_count = 0
-        for record in hypoglycemias:
-            if(record):
-                current_hypo_records = current_hypo_records + 1
-            else:
-                if(current_hypo_records >= hypo_event_records_threshold):
-                    total_hypo_event_count = total_hypo_event_count + 1
-                current_hypo_records = 0
-
-        if(current_hypo_records >= hypo_event_records_threshold):
-            total_hypo_event_count = total_hypo_event_count + 1
-            
-        return total_hypo_event_count
+        return int(np.sum(episodes["records"] >= hypo_event_records_threshold))
 
 
 class GVtime_in_hypo(GVIndex):
     """Calculates total time spent in hypoglycemia (in minutes)
 
     """
+    @classmethod
+    def requirements(cls, calc_config: CalcConfig, threshold: float = None, **kwargs) -> list:
+        return [("below", threshold)]
+
     def __init__(self, **kwargs) -> None:
         super(GVtime_in_hypo, self).__init__(**kwargs)
 
     def calculate(self, threshold: typing.Union[int, float]) -> float:
-        if(type(threshold) not in [int, float]):
-            raise ValueError("threshold must be int")
+        Formulas.check_threshold(threshold)
 
         hypoglycemias = self.df[GLUCOSE] < threshold
 
@@ -534,17 +556,22 @@ class GVmean_hypo_event_duration(GVIndex):
     """Calculates mean duration of hypoglycemic events.
 
     Hypoglycemic event is defined as a sequence of hypoglycemic
-    glucose values.
+    glucose values. Events lasting until the end of the measurement
+    are included.
 
     """
+    @classmethod
+    def requirements(cls, calc_config: CalcConfig, threshold: float = None, **kwargs) -> list:
+        return [("episodes_below", threshold)]
+
     def __init__(self, **kwargs) -> None:
         super(GVmean_hypo_event_duration, self).__init__(**kwargs)
 
-    def calculate(self, threshold: int, records_duration: int = 15) -> float:
+    def calculate(self, threshold: float, records_duration: int = 15) -> float:
         """Calculates mean duration of hypoglycemic events.
 
         Arguments:
-            threshold (int):
+            threshold (int or float):
                 Values of glycemia below this are treated as hypoglycemias
             records_duration (int):
                 Sequence of hypoglycemic glucose values must have duration
@@ -561,44 +588,32 @@ class GVmean_hypo_event_duration(GVIndex):
                 are not int
 
         """
-        if(type(threshold) != int):
-            raise ValueError("threshold must be int")
+        Formulas.check_threshold(threshold)
 
         if(type(records_duration) != int):
             raise ValueError("records_duration")
 
-        hypoglycemias = self.df[GLUCOSE] < threshold
-
+        episodes = find_episodes(self.df[GLUCOSE], self.calc_config.interval, hypo_thresholds=[threshold])
         hypo_event_records_threshold = records_duration / self.calc_config.interval
-
-        current_hypo_records = 0
-        total_hypo_event_count = 0
-        hypo_events_duration = []
-        for record in hypoglycemias:
-            if(record):
-                current_hypo_records = current_hypo_records + 1
-            else:
-                if(current_hypo_records >= hypo_event_records_threshold):
-                    total_hypo_event_count = total_hypo_event_count + 1
-                    hypo_events_duration.append(current_hypo_records)
-                current_hypo_records = 0
+        hypo_events_duration = episodes["duration"][episodes["records"] >= hypo_event_records_threshold]
 
         if (len(hypo_events_duration)):
-            return np.nanmean(hypo_events_duration) * self.calc_config.interval
+            return np.mean(hypo_events_duration)
         else:
             return 0
 
 
 class GVtime_in_range(GVIndex):
+    @classmethod
+    def requirements(cls, calc_config: CalcConfig, lower_bound: float = None, upper_bound: float = None, **kwargs) -> list:
+        lower_bound, upper_bound = Formulas.time_in_range_bounds(calc_config, lower_bound, upper_bound)
+        return [("above", lower_bound), ("below", upper_bound), "valid_count"]
+
     def __init__(self, **kwargs) -> None:
         super(GVtime_in_range, self).__init__(**kwargs)
 
     def calculate(self, lower_bound: int = None, upper_bound: int = None) -> float:
-        lower_bound = lower_bound if lower_bound is not None else self.calc_config.tir_range[0]
-        upper_bound = upper_bound if upper_bound is not None else self.calc_config.tir_range[1]
-
-        if(type(lower_bound) not in [float, int] or type(upper_bound) not in [int, float]):
-            raise ValueError("lower_bound and upper_bound must be int")
+        lower_bound, upper_bound = Formulas.time_in_range_bounds(self.calc_config, lower_bound, upper_bound)
 
         return np.nansum(
             (self.df[GLUCOSE] > lower_bound) & (self.df[GLUCOSE] < upper_bound)
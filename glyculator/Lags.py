@@ -0,0 +1,74 @@
+import typing
+
+import numpy as np
+import pandas as pd
+
+
+def lag_to_records(lag: int, interval: int) -> int:
+    """Converts a lag in minutes to a number of records.
+
+    Arguments:
+        lag (int):
+            lag in minutes
+        interval (int):
+            number of minutes between glucose measurements
+
+    Returns:
+        int:
+            number of records spanning the lag
+
+    Raises:
+        ValueError:
+            if lag is not a positive multiple of interval
+
+    """
+    if(lag <= 0 or lag % interval != 0):
+        raise ValueError("lag must be a positive multiple of interval. Received lag: {} interval: {}".format(lag, interval))
+    return int(lag // interval)
+
+
+def lagged_differences(glucose: typing.Union[np.ndarray, pd.Series], interval: int,
+    lags: typing.Iterable[int]) -> dict:
+    """Differences between every glucose value and the value lag minutes earlier.
+
+    Assumes glucose values lie on a regular grid - every interval minutes
+    with missing measurements as NaN - like the output of FileCleaner.
+    Differences of all the lags are written into one buffer, and each
+    difference is computed once, so the cost is linear in the number
+    of records for every lag.
+
+    Arguments:
+        glucose:
+            list-like of glucose values
+        interval (int):
+            number of minutes between glucose measurements
+        lags (list-like of int):
+            lags in minutes, e.g. [60, 120, 240, 1440]
+
+    Returns:
+        dict:
+            lag - numpy.ndarray of differences pairs. The array for lag
+            has len(glucose) - lag / interval elements. Arrays are
+            read-only views of the shared buffer.
+
+    Raises:
+        ValueError:
+            if any lag is not a positive multiple of interval
+
+    """
+    glucose = np.asarray(glucose, dtype=np.float64)
+    lags = list(lags)
+    records = [lag_to_records(lag, interval) for lag in lags]
+    sizes = [max(len(glucose) - record, 0) for record in records]
+
+    buffer = np.empty(sum(sizes), dtype=np.float64)
+    differences = {}
+    offset = 0
+    for lag, record, size in zip(lags, records, sizes):
+        view = buffer[offset : offset + size]
+        np.subtract(glucose[record:], glucose[:size], out=view)
+        view.flags.writeable = False
+        differences[lag] = view
+        offset = offset + size
+
+    return differences
@@ -0,0 +1,183 @@
+import glob
+import time
+import logging
+import typing
+import concurrent.futures
+
+import pandas as pd
+
+from .configs import ReadConfig, CleanConfig, CalcConfig
+from .FileReader import FileReader
+from .FileCleaner import FileCleaner
+from .BatchCalculator import BatchCalculator
+from .Compact import DtypePolicy
+from .Index import INDICES_TO_CALC
+
+
+FILE = "File"
+ERROR = "Error"
+STAGE_TIMES = ["Read time", "Clean time", "Calculate time"]
+
+
+def process_file(file_name: str, read_config: ReadConfig, clean_config: CleanConfig, calc_config: CalcConfig,
+    indices: list = None, index_kwargs: dict = None, columnar: bool = False,
+    dtype_policy: DtypePolicy = None) -> dict:
+    """Reads, cleans and calculates indices of one file.
+
+    Never raises - an exception of any stage is stored under ERROR
+    and the indices are left out.
+
+    Arguments:
+        file_name (str):
+            path to the file
+        read_config (ReadConfig):
+            configuration for reading
+        clean_config (CleanConfig):
+            configuration for cleaning
+        calc_config (CalcConfig):
+            configuration for calculations
+        indices (list of str, optional):
+            names of indices from INDICES_TO_CALC. All of them if None.
+        index_kwargs (dict, optional):
+            passed to BatchCalculator
+        columnar (bool):
+            passed to FileReader
+        dtype_policy (DtypePolicy, optional):
+            passed to FileReader
+
+    Returns:
+        dict:
+            FILE, the indices, the seconds every stage took and ERROR
+            (None if the file was processed)
+
+    """
+    result = {FILE : file_name, ERROR : None}
+    stage = STAGE_TIMES[0]
+    try:
+        start = time.perf_counter()
+        df = FileReader(file_name=file_name, read_config=read_config, columnar=columnar,
+            dtype_policy=dtype_policy).read_file()
+        result[stage] = time.perf_counter() - start
+
+        stage = STAGE_TIMES[1]
+        start = time.perf_counter()
+        tidied = FileCleaner(df, clean_config).tidy()
+        result[stage] = time.perf_counter() - start
+
+        stage = STAGE_TIMES[2]
+        start = time.perf_counter()
+        result.update(BatchCalculator(calc_config, index_kwargs=index_kwargs).calculate(tidied, indices))
+        result[stage] = time.perf_counter() - start
+    except Exception as e:
+        result[stage] = time.perf_counter() - start
+        result[ERROR] = "{}: {}".format(type(e).__name__, e)
+        logging.getLogger(__name__).warning("Pipeline - process_file - {} failed: {}".format(file_name, result[ERROR]))
+
+    return result
+
+
+class Pipeline():
+    """Calculates indices of many CGM files in parallel.
+
+    Every file goes through FileReader, FileCleaner and BatchCalculator
+    in a separate process. Each worker process sets up the date fixing
+    model once, when the first of its files needs it, and reuses it for
+    all of its files (see ModelRegistry). Files flagged without the model,
+    e.g. regular recordings or CleanConfig(flagger="grid"), never set it
+    up, and a model, which failed to set up, is not retried for
+    ModelRegistry.retry_seconds. A failure of one file is reported in
+    its row and does not stop the others.
+
+    Attributes:
+        read_config (ReadConfig):
+            configuration for reading
+        clean_config (CleanConfig):
+            configuration for cleaning
+        calc_config (CalcConfig):
+            configuration for calculations
+        indices (list of str):
+            names of indices from INDICES_TO_CALC. All of them if None.
+        index_kwargs (dict):
+            index name - dict of arguments pairs passed to BatchCalculator
+        workers (int):
+            number of worker processes. None uses the number of CPUs,
+            1 processes the files in the current process
+        columnar (bool):
+            read delimited files with the columnar FileReader
+        dtype_policy (DtypePolicy):
+            passed to FileReader (see DtypePolicy.frame), or None.
+            Files are cleaned and calculated as dataframes, so the policy
+            does not reduce memory of the pipeline.
+
+    """
+    __attrs__ = [
+        "read_config", "clean_config", "calc_config", "indices", "index_kwargs", "workers", "columnar",
+        "dtype_policy"
+    ]
+
+    def __init__(self, read_config: ReadConfig, clean_config: CleanConfig, calc_config: CalcConfig,
+        indices: typing.Iterable[str] = None, index_kwargs: dict = None, workers: int = None,
+        columnar: bool = False, dtype_policy: DtypePolicy = None) -> None:
+        if(not isinstance(read_config, ReadConfig)):
+            raise ValueError("read_config needs to be a ReadConfig")
+        if(not isinstance(clean_config, CleanConfig)):
+            raise ValueError("clean_config needs to be a CleanConfig")
+        if(not isinstance(calc_config, CalcConfig)):
+            raise ValueError("calc_config needs to be a CalcConfig")
+        if(workers is not None and (type(workers) != int or workers < 1)):
+            raise ValueError("workers must be a positive int or None")
+        if(dtype_policy is not None and not isinstance(dtype_policy, DtypePolicy)):
+            raise ValueError("dtype_policy must be a DtypePolicy or None")
+
+        self.read_config = read_config
+        self.clean_config = clean_config
+        self.calc_config = calc_config
+        self.indices = list(indices) if indices is not None else None
+        self.index_kwargs = index_kwargs
+        self.workers = workers
+        self.columnar = columnar
+        self.dtype_policy = dtype_policy
+        self.logger = logging.getLogger(__name__)
+
+    @staticmethod
+    def expand_files(files: typing.Union[str, typing.Iterable[str]]) -> list:
+        """Expands a glob pattern to a sorted list of files.
+
+        Lists of files are returned unchanged.
+
+        """
+        if(isinstance(files, str)):
+            return sorted(glob.glob(files))
+        return list(files)
+
+    def run(self, files: typing.Union[str, typing.Iterable[str]]) -> pd.DataFrame:
+        """Processes the files.
+
+        Arguments:
+            files (str or list of str):
+                glob pattern or list of paths
+
+        Returns:
+            pandas.DataFrame:
+                one row per file in the order of `files` with columns
+                FILE, the indices, the stage times in seconds and ERROR
+
+        """
+        files = self.expand_files(files)
+        arguments = (self.read_config, self.clean_config, self.calc_config, self.indices,
+            self.index_kwargs, self.columnar, self.dtype_policy)
+
+        if(self.workers == 1 or len(files) <= 1):
+            results = [process_file(file_name, *arguments) for file_name in files]
+        else:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=self.workers) as executor:
+                futures = [executor.submit(process_file, file_name, *arguments) for file_name in files]
+                results = [future.result() for future in futures]
+
+        index_names = self.indices if self.indices is not None else list(INDICES_TO_CALC.keys())
+        table = pd.DataFrame(results, columns=[FILE] + index_names + STAGE_TIMES + [ERROR])
+        self.logger.debug("Pipeline - run - return:\n{}".format(table))
+        return table
+
+    def __call__(self, files: typing.Union[str, typing.Iterable[str]]) -> pd.DataFrame:
+        return self.run(files)
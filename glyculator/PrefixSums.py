@@ -0,0 +1,187 @@
+import logging
+import typing
+
+import numpy as np
+import pandas as pd
+
+from .configs import CalcConfig
+from .utils import DT, GLUCOSE, UNIT_INDEX_KWARGS
+from . import Formulas
+
+
+def _cumulative(values: np.ndarray) -> np.ndarray:
+    """Cumulative sum with a leading 0, so sum of values[i:j] is result[j] - result[i]."""
+    result = np.zeros(len(values) + 1, dtype=np.float64 if values.dtype.kind == "f" else np.int64)
+    np.cumsum(values, out=result[1:])
+    return result
+
+
+class WindowIndex():
+    """Prefix sums of a tidied measurement for fast time window queries.
+
+    Cumulative sums of valid counts, glucose values, their squares,
+    in-range, below and above threshold counts and AUC trapezoids are
+    calculated once. Afterwards every window [start, end) is answered
+    with two binary searches and a few subtractions, independently of
+    the window length. Every query accepts arrays of window bounds and
+    answers all the windows at once.
+
+    Values equal the GVIndex classes calculated on the slice of the
+    measurement within the window.
+
+    Attributes:
+        calc_config (CalcConfig):
+            configuration for calculations
+        hypo_threshold (float):
+            glucose values below are hypoglycemias
+        hyper_threshold (float):
+            glucose values above are hyperglycemias
+        dates (numpy.ndarray):
+            datetime64 dates of the measurement
+
+    """
+    __attrs__ = [
+        "calc_config", "hypo_threshold", "hyper_threshold", "dates"
+    ]
+
+    def __init__(self, df: pd.DataFrame, calc_config: CalcConfig, hypo_threshold: float = None,
+        hyper_threshold: float = None) -> None:
+        if(type(df) != pd.DataFrame):
+            raise ValueError("df must be a pandas.DataFrame")
+        if(not isinstance(calc_config, CalcConfig)):
+            raise ValueError("calc_config needs to be a CalcConfig")
+
+        self.calc_config = calc_config
+        self.hypo_threshold = hypo_threshold if hypo_threshold is not None \
+            else UNIT_INDEX_KWARGS[calc_config.unit]["Time in hypoglycemia"]["threshold"]
+        self.hyper_threshold = hyper_threshold if hyper_threshold is not None \
+            else UNIT_INDEX_KWARGS[calc_config.unit]["Hyperglycemia fraction"]["threshold"]
+        self.logger = logging.getLogger(__name__)
+
+        self.dates = np.asarray(df[DT], dtype="datetime64[ns]")
+        if(np.any(np.diff(self.dates) < np.timedelta64(0))):
+            raise ValueError("df must be sorted by {}".format(DT))
+        glucose = np.asarray(df[GLUCOSE], dtype=np.float64)
+        valid = ~np.isnan(glucose)
+
+        # Values are shifted by their mean, so the variance does not lose precision
+        self._shift = np.nanmean(glucose) if valid.any() else 0.0
+        shifted = np.where(valid, glucose - self._shift, 0)
+
+        lower_bound, upper_bound = Formulas.time_in_range_bounds(calc_config)
+        in_range = Formulas.above(glucose, lower_bound) & Formulas.below(glucose, upper_bound)
+        self._valid = _cumulative(valid.astype(np.int64))
+        self._sum = _cumulative(shifted)
+        self._squares = _cumulative(np.power(shifted, 2))
+        self._in_range = _cumulative(in_range.astype(np.int64))
+        self._below = _cumulative(Formulas.below(glucose, self.hypo_threshold).astype(np.int64))
+        self._above = _cumulative(Formulas.above(glucose, self.hyper_threshold).astype(np.int64))
+
+        # Trapezoid between record i and i + 1; missing values make it undefined
+        trapezoids = (glucose[1:] + glucose[:-1]) / 2 * calc_config.interval
+        undefined = np.isnan(trapezoids)
+        self._area = _cumulative(np.where(undefined, 0, trapezoids))
+        self._undefined_area = _cumulative(undefined.astype(np.int64))
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def positions(self, start, end) -> typing.Tuple[np.ndarray, np.ndarray]:
+        """Positions of the first record in every window and right after its last record.
+
+        Arguments:
+            start:
+                datetime-like or list-like of datetime-likes. Inclusive.
+            end:
+                datetime-like or list-like of datetime-likes. Exclusive.
+
+        Returns:
+            tuple:
+                two numpy.ndarrays of positions
+
+        """
+        start = np.asarray(pd.to_datetime(start), dtype="datetime64[ns]")
+        end = np.asarray(pd.to_datetime(end), dtype="datetime64[ns]")
+        first = np.searchsorted(self.dates, start, side="left")
+        last = np.searchsorted(self.dates, end, side="left")
+        return first, np.maximum(first, last)
+
+    def _window_sum(self, cumulative: np.ndarray, start, end):
+        first, last = self.positions(start, end)
+        return cumulative[last] - cumulative[first]
+
+    def records(self, start, end):
+        first, last = self.positions(start, end)
+        return last - first
+
+    def valid_count(self, start, end):
+        return self._window_sum(self._valid, start, end)
+
+    def mean(self, start, end):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return self._window_sum(self._sum, start, end) / self.valid_count(start, end) + self._shift
+
+    def variance(self, start, end):
+        count = self.valid_count(start, end)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = self._window_sum(self._sum, start, end) / count
+            return np.maximum(self._window_sum(self._squares, start, end) / count - np.power(mean, 2), 0)
+
+    def std(self, start, end):
+        return np.sqrt(self.variance(start, end))
+
+    def time_in_range(self, start, end):
+        """Fraction of valid readings within calc_config.tir_range."""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return self._window_sum(self._in_range, start, end) / self.valid_count(start, end)
+
+    def hypoglycemia_fraction(self, start, end):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return self._window_sum(self._below, start, end) / self.valid_count(start, end)
+
+    def hyperglycemia_fraction(self, start, end):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return self._window_sum(self._above, start, end) / self.valid_count(start, end)
+
+    def time_in_hypoglycemia(self, start, end):
+        """Minutes spent below hypo_threshold."""
+        return self._window_sum(self._below, start, end) * self.calc_config.interval
+
+    def auc(self, start, end, standardize: bool = True):
+        """Trapezoid AUC of the records in the window. NaN if any of them is missing."""
+        first, last = self.positions(start, end)
+        # Trapezoids first .. last - 2 join the records of the window
+        inner_last = np.maximum(first, last - 1)
+        area = self._area[inner_last] - self._area[first]
+        undefined = self._undefined_area[inner_last] - self._undefined_area[first]
+        area = np.where(undefined > 0, np.nan, area)
+        return Formulas.auc(area, last - first, standardize)
+
+    def query(self, start, end) -> pd.DataFrame:
+        """Answers all the supported indices for many windows.
+
+        Arguments:
+            start:
+                list-like of window starts. Inclusive.
+            end:
+                list-like of window ends. Exclusive.
+
+        Returns:
+            pandas.DataFrame:
+                one row per window with INDICES_TO_CALC names as columns
+
+        """
+        start = np.atleast_1d(start)
+        end = np.atleast_1d(end)
+        result = pd.DataFrame({
+            "Total time points No" : self.records(start, end),
+            "Mean" : self.mean(start, end),
+            "Standard deviation" : self.std(start, end),
+            "Time in range" : self.time_in_range(start, end),
+            "Hypoglycemia fraction" : self.hypoglycemia_fraction(start, end),
+            "Hyperglycemia fraction" : self.hyperglycemia_fraction(start, end),
+            "Time in hypoglycemia" : self.time_in_hypoglycemia(start, end),
+            "AUC" : self.auc(start, end),
+        })
+        self.logger.debug("WindowIndex - query - return:\n{}".format(result))
+        return result
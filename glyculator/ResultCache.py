@@ -0,0 +1,190 @@
+import os
+import pickle
+import logging
+import hashlib
+import tempfile
+import threading
+import collections
+import typing
+
+import numpy as np
+import pandas as pd
+
+from .__version__ import __version__
+from .configs import CalcConfig
+from .utils import DT, GLUCOSE, UNIT_INDEX_KWARGS
+
+
+# CalcConfig attributes, which change values of indices
+CALC_CONFIG_FIELDS = [
+    "interval", "unit", "tir_range", "mage_excursion_threshold",
+    "mage_moving_average_window_size", "mage_peak_distance"
+]
+
+
+def result_key(df: pd.DataFrame, calc_config: CalcConfig, indices: typing.Iterable[str],
+    index_kwargs: dict = None, use_histogram: bool = False, version: str = None) -> str:
+    """Content hash of everything the values of indices depend on.
+
+    Hashes glucose values, dates (if df has a DT column), the
+    CALC_CONFIG_FIELDS of calc_config, the names of the indices and
+    their arguments (falling back to UNIT_INDEX_KWARGS), the evaluation
+    path and the version of custom indices together with the version
+    of glyculator.
+
+    Arguments:
+        df (pandas.DataFrame):
+            dataframe with a GLUCOSE column
+        calc_config (CalcConfig):
+            configuration for calculations
+        indices (list of str):
+            names of indices
+        index_kwargs (dict, optional):
+            index name - dict of arguments pairs
+        use_histogram (bool, optional):
+            whether the indices are evaluated on a GlucoseHistogram
+        version (str, optional):
+            version of custom indices (see IndexScheduler.version)
+
+    Returns:
+        str:
+            hexadecimal SHA-256 digest
+
+    """
+    index_kwargs = index_kwargs if index_kwargs is not None else {}
+    digest = hashlib.sha256()
+    digest.update(__version__.encode())
+    digest.update(np.ascontiguousarray(df[GLUCOSE], dtype=np.float64).tobytes())
+    if(DT in df.columns):
+        digest.update(np.ascontiguousarray(df[DT], dtype="datetime64[ns]").view(np.int64).tobytes())
+    # Lengths keep glucose values and dates from being mistaken for each other
+    digest.update(str(len(df)).encode())
+    digest.update(repr([(field, getattr(calc_config, field)) for field in CALC_CONFIG_FIELDS]).encode())
+    for name in indices:
+        kwargs = index_kwargs.get(name, UNIT_INDEX_KWARGS[calc_config.unit].get(name, {}))
+        digest.update(repr((name, sorted(kwargs.items()))).encode())
+    digest.update(repr((bool(use_histogram), version)).encode())
+    return digest.hexdigest()
+
+
+class ResultCache():
+    """Cache of index results keyed by the content of the measurement.
+
+    Results are kept in a bounded in-memory LRU and, if a directory is
+    given, also written to disk, so they survive the process. An entry
+    found only on disk is promoted to memory. Lookups are counted in
+    hits, disk_hits and misses.
+
+    The key (see result_key) covers the glucose values, the dates,
+    the relevant CalcConfig fields and the arguments of the indices,
+    but not the code of custom indices registered in an IndexScheduler.
+    BatchCalculator caches results of custom indices only, when the
+    scheduler has a version, which the key covers instead.
+
+    Attributes:
+        max_entries (int):
+            maximal number of results kept in memory
+        directory (str):
+            directory of the on-disk tier or None
+        hits (int):
+            lookups answered from memory
+        disk_hits (int):
+            lookups answered from disk
+        misses (int):
+            lookups not answered
+
+    """
+    __attrs__ = [
+        "max_entries", "directory", "hits", "disk_hits", "misses"
+    ]
+
+    def __init__(self, max_entries: int = 256, directory: str = None) -> None:
+        if(type(max_entries) != int or max_entries < 0):
+            raise ValueError("max_entries must be a non-negative int")
+        if(directory is not None):
+            os.makedirs(directory, exist_ok=True)
+
+        self.max_entries = max_entries
+        self.directory = directory
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, "{}.pkl".format(key))
+
+    def _remember(self, key: str, results: dict) -> None:
+        self._entries[key] = results
+        self._entries.move_to_end(key)
+        while(len(self._entries) > self.max_entries):
+            self._entries.popitem(last=False)
+
+    def _read(self, key: str) -> typing.Optional[dict]:
+        try:
+            with open(self._path(key), "rb") as f:
+                return pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError) as e:
+            if(os.path.exists(self._path(key))):
+                self.logger.warning("ResultCache - get - unreadable entry {}: {}".format(key, e))
+            return None
+
+    def _write(self, key: str, results: dict) -> None:
+        # Written to a temporary file first, so readers never see a partial entry
+        handle, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(handle, "wb") as f:
+                pickle.dump(results, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary, self._path(key))
+        except OSError:
+            if(os.path.exists(temporary)):
+                os.remove(temporary)
+            raise
+
+    def get(self, key: str) -> typing.Optional[dict]:
+        """Returns a copy of the cached results or None."""
+        with self._lock:
+            if(key in self._entries):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return dict(self._entries[key])
+
+            results = self._read(key) if self.directory is not None else None
+            if(results is None):
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, results)
+            return dict(results)
+
+    def put(self, key: str, results: dict) -> None:
+        """Stores results in memory and on disk."""
+        results = dict(results)
+        with self._lock:
+            self._remember(key, results)
+            if(self.directory is not None):
+                self._write(key, results)
+
+    def clear(self, disk: bool = False) -> None:
+        """Forgets all results in memory and, if disk, also on disk."""
+        with self._lock:
+            self._entries.clear()
+            if(disk and self.directory is not None):
+                for file_name in os.listdir(self.directory):
+                    if(file_name.endswith(".pkl")):
+                        os.remove(os.path.join(self.directory, file_name))
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "hits" : self.hits,
+            "disk_hits" : self.disk_hits,
+            "misses" : self.misses,
+            "hit_rate" : (self.hits + self.disk_hits) / lookups if lookups else np.nan,
+            "entries" : len(self._entries),
+        }
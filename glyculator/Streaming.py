@@ -0,0 +1,214 @@
+import math
+import logging
+import typing
+
+from .configs import CalcConfig
+from .utils import UNIT_INDEX_KWARGS
+from . import Formulas
+
+
+class StreamingAccumulator():
+    """Glycemic variability indices of a live measurement updated reading by reading.
+
+    Readings must arrive in order on a regular grid - every interval
+    minutes with missing readings passed as NaN or None - like the
+    output of FileCleaner. Every update costs O(1) time and memory:
+    mean and variance use Welford's method, the other indices keep
+    running counts and sums, and the hypoglycemic event in progress
+    is kept as the length of the current run.
+
+    Values returned by the accessors equal the values of the matching
+    GVIndex classes calculated on all the readings received so far.
+
+    Attributes:
+        calc_config (CalcConfig):
+            configuration for calculations
+        hypo_threshold (float):
+            glucose values below are hypoglycemias
+        hyper_threshold (float):
+            glucose values above are hyperglycemias
+        event_duration (int):
+            minimal duration of a hypoglycemic event in minutes
+        length (int):
+            number of readings including the missing ones
+        valid_count (int):
+            number of non-missing readings
+
+    """
+    __attrs__ = [
+        "calc_config", "hypo_threshold", "hyper_threshold", "event_duration", "length", "valid_count"
+    ]
+
+    def __init__(self, calc_config: CalcConfig, hypo_threshold: float = None, hyper_threshold: float = None,
+        event_duration: int = 15) -> None:
+        if(not isinstance(calc_config, CalcConfig)):
+            raise ValueError("calc_config needs to be a CalcConfig")
+        self.calc_config = calc_config
+        self.hypo_threshold = hypo_threshold if hypo_threshold is not None \
+            else UNIT_INDEX_KWARGS[calc_config.unit]["Hypoglycemia fraction"]["threshold"]
+        self.hyper_threshold = hyper_threshold if hyper_threshold is not None \
+            else UNIT_INDEX_KWARGS[calc_config.unit]["Hyperglycemia fraction"]["threshold"]
+        self.event_duration = event_duration
+        self.logger = logging.getLogger(__name__)
+        self.reset()
+
+    def reset(self) -> None:
+        """Forgets all the readings."""
+        self.length = 0
+        self.valid_count = 0
+
+        # Welford's method
+        self._mean = 0.0
+        self._m2 = 0.0
+
+        self._in_range = 0
+        self._hypo = 0
+        self._hyper = 0
+
+        self._lbgi_sum = 0.0
+        self._hbgi_sum = 0.0
+        self._risk_count = 0
+
+        self._auc_sum = 0.0
+        self._previous = None
+
+        # Hypoglycemic events finished so far and the run in progress
+        self._events = 0
+        self._events_records = 0
+        self._run = 0
+
+    def update(self, glucose: typing.Optional[float]) -> None:
+        """Adds the next reading.
+
+        Arguments:
+            glucose (float or None):
+                glucose value. None or NaN marks a missing reading.
+
+        """
+        glucose = float("nan") if glucose is None else float(glucose)
+        self.length = self.length + 1
+
+        if(self._previous is not None):
+            self._auc_sum = self._auc_sum + (self._previous + glucose) / 2 * self.calc_config.interval
+        self._previous = glucose
+
+        if(math.isnan(glucose)):
+            self._close_run()
+            return
+
+        self.valid_count = self.valid_count + 1
+        delta = glucose - self._mean
+        self._mean = self._mean + delta / self.valid_count
+        self._m2 = self._m2 + delta * (glucose - self._mean)
+
+        lower_bound, upper_bound = self.calc_config.tir_range
+        self._in_range = self._in_range + (lower_bound < glucose < upper_bound)
+        self._hyper = self._hyper + (glucose > self.hyper_threshold)
+
+        if(glucose < self.hypo_threshold):
+            self._hypo = self._hypo + 1
+            self._run = self._run + 1
+        else:
+            self._close_run()
+
+        # The risk function is undefined below 1, like in GVlbgi and GVhbgi
+        if(glucose >= 1):
+            risk = Formulas.risk(math.log10(glucose))
+            self._risk_count = self._risk_count + 1
+            self._lbgi_sum = self._lbgi_sum + float(Formulas.bgi(risk, low=True))
+            self._hbgi_sum = self._hbgi_sum + float(Formulas.bgi(risk, low=False))
+
+    def extend(self, glucose: typing.Iterable[float]) -> None:
+        """Adds many readings in order."""
+        for value in glucose:
+            self.update(value)
+
+    def _close_run(self) -> None:
+        if(self._run and self._run >= self.event_duration / self.calc_config.interval):
+            self._events = self._events + 1
+            self._events_records = self._events_records + self._run
+        self._run = 0
+
+    def _ratio(self, numerator: float, denominator: float) -> float:
+        return numerator / denominator if denominator else float("nan")
+
+    def mean(self) -> float:
+        return self._mean if self.valid_count else float("nan")
+
+    def variance(self) -> float:
+        return self._ratio(self._m2, self.valid_count)
+
+    def std(self) -> float:
+        return math.sqrt(self.variance())
+
+    def cv(self) -> float:
+        return self._ratio(self.std(), self.mean())
+
+    def missing_values(self) -> float:
+        return self._ratio(self.length - self.valid_count, self.length)
+
+    def time_in_range(self) -> float:
+        return self._ratio(self._in_range, self.valid_count)
+
+    def hypoglycemia_fraction(self) -> float:
+        return self._ratio(self._hypo, self.valid_count)
+
+    def hyperglycemia_fraction(self) -> float:
+        return self._ratio(self._hyper, self.valid_count)
+
+    def time_in_hypoglycemia(self) -> float:
+        return self._hypo * self.calc_config.interval
+
+    def lbgi(self) -> float:
+        return self._ratio(self._lbgi_sum, self._risk_count)
+
+    def hbgi(self) -> float:
+        return self._ratio(self._hbgi_sum, self._risk_count)
+
+    def ea1c(self) -> float:
+        return Formulas.ea1c(self.mean(), self.calc_config.unit)
+
+    def auc(self, standardize: bool = True) -> float:
+        return float(Formulas.auc(self._auc_sum, self.length, standardize))
+
+    def _open_event(self) -> int:
+        """Records of the run in progress, if it is already long enough to be an event."""
+        if(self._run and self._run >= self.event_duration / self.calc_config.interval):
+            return self._run
+        return 0
+
+    def hypo_events_count(self) -> int:
+        return self._events + (self._open_event() > 0)
+
+    def mean_hypo_event_duration(self) -> float:
+        events = self.hypo_events_count()
+        if(events == 0):
+            return 0
+        return (self._events_records + self._open_event()) * self.calc_config.interval / events
+
+    def indices(self) -> dict:
+        """Current values of all the tracked indices.
+
+        Returns:
+            dict:
+                index name from INDICES_TO_CALC - value pairs
+
+        """
+        return {
+            "Mean" : self.mean(),
+            "Variance" : self.variance(),
+            "Standard deviation" : self.std(),
+            "CV" : self.cv(),
+            "Missing values" : self.missing_values(),
+            "Total time points No" : self.length,
+            "Hypoglycemia fraction" : self.hypoglycemia_fraction(),
+            "Hyperglycemia fraction" : self.hyperglycemia_fraction(),
+            "Low Blood Glucose Index" : self.lbgi(),
+            "High Blood Glucose Index" : self.hbgi(),
+            "eA1c" : self.ea1c(),
+            "AUC" : self.auc(),
+            "Hypoglycemic events No" : self.hypo_events_count(),
+            "Time in hypoglycemia" : self.time_in_hypoglycemia(),
+            "Mean duration of hypoglycemic event" : self.mean_hypo_event_duration(),
+            "Time in range" : self.time_in_range(),
+        }
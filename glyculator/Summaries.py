@@ -0,0 +1,456 @@
+import functools
+import collections
+import typing
+
+import numpy as np
+import pandas as pd
+
+from .configs import CalcConfig
+from .utils import UNIT_INDEX_KWARGS
+from .Episodes import find_runs
+from .Lags import lag_to_records
+from . import Formulas
+
+
+# Lags (in minutes) tracked by default - MODD and the default CONGA
+DEFAULT_LAGS = (24 * 60, UNIT_INDEX_KWARGS["mg"]["CONGA"]["hours"] * 60)
+
+# Hypoglycemia thresholds of tracked runs by default for every unit
+DEFAULT_RUN_THRESHOLDS = {unit : (kwargs["Hypoglycemic events No"]["threshold"], )
+    for unit, kwargs in UNIT_INDEX_KWARGS.items()}
+
+
+def _moments(values: np.ndarray) -> typing.Tuple[int, float, float]:
+    """Count, mean and sum of squared deviations of non-missing values."""
+    values = values[~np.isnan(values)]
+    if(len(values) == 0):
+        return 0, 0.0, 0.0
+    mean = np.mean(values)
+    return len(values), mean, float(np.sum(np.power(values - mean, 2)))
+
+
+def _merge_moments(first: tuple, second: tuple) -> typing.Tuple[int, float, float]:
+    """Combines the moments of two disjoint sets of values (Chan et al.)."""
+    count_a, mean_a, m2_a = first
+    count_b, mean_b, m2_b = second
+    count = count_a + count_b
+    if(count == 0):
+        return 0, 0.0, 0.0
+    delta = mean_b - mean_a
+    mean = mean_a + delta * count_b / count
+    return count, mean, m2_a + m2_b + delta * delta * count_a * count_b / count
+
+
+class _Runs():
+    """Runs of glucose values below a threshold in one chunk.
+
+    Runs touching the start or the end of the chunk are kept apart
+    as prefix and suffix, because they may continue in the neighbouring
+    chunks. Lengths of the other runs are counted in lengths.
+
+    """
+    def __init__(self, prefix: int = 0, suffix: int = 0, full: bool = False, lengths: collections.Counter = None):
+        self.prefix = prefix
+        self.suffix = suffix
+        self.full = full
+        self.lengths = collections.Counter() if lengths is None else lengths
+
+    @classmethod
+    def from_mask(cls, mask: np.ndarray) -> "_Runs":
+        if(len(mask) and mask.all()):
+            return cls(prefix=len(mask), suffix=len(mask), full=True)
+        starts, ends = find_runs(mask)
+        prefix = suffix = 0
+        if(len(starts) and starts[0] == 0):
+            prefix = int(ends[0])
+            starts, ends = starts[1:], ends[1:]
+        if(len(ends) and ends[-1] == len(mask)):
+            suffix = int(ends[-1] - starts[-1])
+            starts, ends = starts[:-1], ends[:-1]
+        return cls(prefix, suffix, lengths=collections.Counter((ends - starts).tolist()))
+
+    def merge(self, other: "_Runs") -> "_Runs":
+        """Runs of this chunk followed directly by the other chunk."""
+        lengths = self.lengths + other.lengths
+        if(self.full and other.full):
+            return _Runs(self.prefix + other.prefix, self.suffix + other.suffix, True)
+        if(self.full):
+            return _Runs(self.prefix + other.prefix, other.suffix, False, lengths)
+        if(other.full):
+            return _Runs(self.prefix, self.suffix + other.suffix, False, lengths)
+        if(self.suffix + other.prefix):
+            lengths[self.suffix + other.prefix] += 1
+        return _Runs(self.prefix, other.suffix, False, lengths)
+
+    def sealed(self) -> "_Runs":
+        """Runs, which can not continue in any other chunk."""
+        return _Runs(lengths=self.all_lengths())
+
+    def all_lengths(self) -> collections.Counter:
+        """Lengths of all the runs including the prefix and the suffix."""
+        lengths = collections.Counter(self.lengths)
+        if(self.full):
+            lengths[self.prefix] += 1
+            return lengths
+        for length in [self.prefix, self.suffix]:
+            if(length):
+                lengths[length] += 1
+        return lengths
+
+
+class GlucoseSummary():
+    """Mergeable summary of glucose values of a chunk of a measurement.
+
+    Summaries of consecutive chunks of one measurement merge into the
+    summary of the whole measurement, so indices of a long recording
+    can be calculated chunk by chunk, e.g. on many cores, and give
+    exactly the values of the whole series. Summaries of separate
+    measurements can be pooled with contiguous=False.
+
+    A summary keeps:
+        moments of the glucose values (count, mean, sum of squared deviations),
+        counts of every distinct glucose value,
+        moments of differences for every tracked lag,
+        lengths of runs below every tracked hypoglycemia threshold,
+        the sum of AUC trapezoids,
+        up to the longest lag of the first and the last glucose values,
+        which are needed to join the differences, runs and trapezoids
+        across the boundary with the next chunk.
+
+    MAGE depends on extrema of the whole measurement and has no summary.
+
+    Attributes:
+        calc_config (CalcConfig):
+            configuration for calculations
+        lags (tuple of int):
+            lags of tracked differences in minutes
+        run_thresholds (tuple):
+            hypoglycemia thresholds of tracked runs
+        length (int):
+            number of readings including the missing ones
+        sealed (bool):
+            True for pooled summaries of separate measurements,
+            which can not be merged with the next chunk
+
+    """
+    __attrs__ = [
+        "calc_config", "lags", "run_thresholds", "length", "sealed"
+    ]
+
+    def __init__(self, calc_config: CalcConfig, lags: typing.Iterable[int] = DEFAULT_LAGS,
+        run_thresholds: typing.Iterable[float] = None) -> None:
+        if(not isinstance(calc_config, CalcConfig)):
+            raise ValueError("calc_config needs to be a CalcConfig")
+        run_thresholds = run_thresholds if run_thresholds is not None else DEFAULT_RUN_THRESHOLDS[calc_config.unit]
+        self.calc_config = calc_config
+        self.lags = tuple(sorted(set(lags)))
+        self.run_thresholds = tuple(sorted(set(run_thresholds)))
+        self._records = {lag : lag_to_records(lag, calc_config.interval) for lag in self.lags}
+        self._boundary = max(self._records.values()) if self._records else 1
+
+        self.length = 0
+        self.sealed = False
+        self.moments = (0, 0.0, 0.0)
+        self.values = np.array([], dtype=np.float64)
+        self.counts = np.array([], dtype=np.int64)
+        self.lagged = {lag : (0, 0.0, 0.0) for lag in self.lags}
+        self.runs = {threshold : _Runs() for threshold in self.run_thresholds}
+        self.auc_sum = 0.0
+        self.head = np.array([], dtype=np.float64)
+        self.tail = np.array([], dtype=np.float64)
+
+    @classmethod
+    def from_glucose(cls, glucose: typing.Union[np.ndarray, pd.Series], calc_config: CalcConfig,
+        lags: typing.Iterable[int] = DEFAULT_LAGS,
+        run_thresholds: typing.Iterable[float] = None) -> "GlucoseSummary":
+        """Summarizes glucose values measured every calc_config.interval minutes.
+
+        Arguments:
+            glucose:
+                list-like of glucose values with missing values as NaN
+            calc_config (CalcConfig):
+                configuration for calculations
+            lags (list-like of int):
+                lags of tracked differences in minutes
+            run_thresholds (list-like, optional):
+                hypoglycemia thresholds of tracked runs.
+                DEFAULT_RUN_THRESHOLDS of calc_config.unit if None.
+
+        Returns:
+            GlucoseSummary
+
+        """
+        summary = cls(calc_config, lags, run_thresholds)
+        glucose = np.asarray(glucose, dtype=np.float64)
+        valid = glucose[~np.isnan(glucose)]
+
+        summary.length = len(glucose)
+        summary.moments = _moments(glucose)
+        summary.values, summary.counts = np.unique(valid, return_counts=True)
+        for lag, records in summary._records.items():
+            summary.lagged[lag] = _moments(glucose[records:] - glucose[:-records])
+        with np.errstate(invalid="ignore"):
+            for threshold in summary.run_thresholds:
+                summary.runs[threshold] = _Runs.from_mask(glucose < threshold)
+        summary.auc_sum = float(np.trapz(glucose, dx=calc_config.interval))
+        summary.head = glucose[:summary._boundary].copy()
+        summary.tail = glucose[-summary._boundary:].copy()
+        return summary
+
+    def _check_compatible(self, other: "GlucoseSummary", contiguous: bool) -> None:
+        if(not isinstance(other, GlucoseSummary)):
+            raise ValueError("other must be a GlucoseSummary")
+        if(self.calc_config.interval != other.calc_config.interval or self.calc_config.unit != other.calc_config.unit):
+            raise ValueError("Summaries with different intervals or units can not be merged")
+        if(self.lags != other.lags or self.run_thresholds != other.run_thresholds):
+            raise ValueError("Summaries tracking different lags or thresholds can not be merged")
+        if(contiguous and (self.sealed or other.sealed)):
+            raise ValueError("Pooled summaries can not be merged as consecutive chunks")
+
+    def merge(self, other: "GlucoseSummary", contiguous: bool = True) -> "GlucoseSummary":
+        """Merges with the summary of another chunk.
+
+        Neither summary is modified.
+
+        Arguments:
+            other (GlucoseSummary):
+                summary to merge with
+            contiguous (bool):
+                True if other is the chunk directly following this one.
+                False if other summarizes a separate measurement - values
+                of both are pooled, but no differences, runs or trapezoids
+                are joined across them.
+
+        Returns:
+            GlucoseSummary
+
+        Raises:
+            ValueError:
+                if the summaries track different lags or thresholds,
+                or contiguous is True and any of them is pooled
+
+        """
+        self._check_compatible(other, contiguous)
+        # Summaries are never modified after they are created, so they can be shared
+        if(contiguous and other.length == 0):
+            return self
+        if(contiguous and self.length == 0):
+            return other
+
+        merged = GlucoseSummary(self.calc_config, self.lags, self.run_thresholds)
+        merged.length = self.length + other.length
+        merged.moments = _merge_moments(self.moments, other.moments)
+
+        values = np.concatenate((self.values, other.values))
+        counts = np.concatenate((self.counts, other.counts))
+        merged.values, positions = np.unique(values, return_inverse=True)
+        merged.counts = np.bincount(positions, weights=counts, minlength=len(merged.values)).astype(np.int64)
+
+        merged.auc_sum = self.auc_sum + other.auc_sum
+        for lag in self.lags:
+            merged.lagged[lag] = _merge_moments(self.lagged[lag], other.lagged[lag])
+
+        if(not contiguous):
+            merged.sealed = True
+            for threshold in self.run_thresholds:
+                merged.runs[threshold] = _Runs(lengths=self.runs[threshold].sealed().lengths + other.runs[threshold].sealed().lengths)
+            return merged
+
+        # Joining the chunks across their boundary
+        joined = np.concatenate((self.tail, other.head))
+        for lag, records in self._records.items():
+            positions = np.arange(max(len(self.tail) - records, 0), min(len(self.tail), len(joined) - records))
+            crossing = joined[positions + records] - joined[positions]
+            merged.lagged[lag] = _merge_moments(merged.lagged[lag], _moments(crossing))
+        for threshold in self.run_thresholds:
+            merged.runs[threshold] = self.runs[threshold].merge(other.runs[threshold])
+        merged.auc_sum = merged.auc_sum + (self.tail[-1] + other.head[0]) / 2 * self.calc_config.interval
+        merged.head = np.concatenate((self.head, other.head))[:self._boundary]
+        merged.tail = np.concatenate((self.tail, other.tail))[-self._boundary:]
+        return merged
+
+    def __add__(self, other: "GlucoseSummary") -> "GlucoseSummary":
+        return self.merge(other)
+
+    @staticmethod
+    def merge_all(summaries: typing.Iterable["GlucoseSummary"], contiguous: bool = True) -> "GlucoseSummary":
+        """Merges summaries of consecutive chunks, or of separate measurements with contiguous=False."""
+        return functools.reduce(lambda first, second: first.merge(second, contiguous), summaries)
+
+    @property
+    def valid_count(self) -> int:
+        return self.moments[0]
+
+    def mean(self) -> float:
+        return self.moments[1] if self.valid_count else np.nan
+
+    def variance(self) -> float:
+        return self.moments[2] / self.valid_count if self.valid_count else np.nan
+
+    def std(self) -> float:
+        return np.sqrt(self.variance())
+
+    def median(self) -> float:
+        if(self.valid_count == 0):
+            return np.nan
+        cumulative = np.cumsum(self.counts)
+        lower = self.values[np.searchsorted(cumulative, (self.valid_count - 1) // 2, side="right")]
+        upper = self.values[np.searchsorted(cumulative, self.valid_count // 2, side="right")]
+        return (lower + upper) / 2
+
+    def mmol(self) -> np.ndarray:
+        return Formulas.to_mmol(self.values, self.calc_config.unit)
+
+    def expectation(self, table: np.ndarray) -> float:
+        """Mean of per-value table over the readings, skipping undefined values."""
+        defined = np.isfinite(table)
+        if(np.sum(self.counts[defined]) == 0):
+            return np.nan
+        return np.dot(self.counts[defined], table[defined]) / np.sum(self.counts[defined])
+
+    def count(self, mask: np.ndarray) -> int:
+        """Number of readings, which values satisfy mask."""
+        return int(np.sum(self.counts[mask]))
+
+    def grade(self) -> np.ndarray:
+        return Formulas.grade(self.mmol())
+
+    def risk(self) -> np.ndarray:
+        return Formulas.risk(Formulas.log10(self.values))
+
+    def lagged_moments(self, lag: int) -> tuple:
+        if(lag not in self.lagged):
+            raise ValueError("Lag {} is not tracked. Tracked lags: {}".format(lag, self.lags))
+        return self.lagged[lag]
+
+    def run_lengths(self, threshold: float) -> collections.Counter:
+        if(threshold not in self.runs):
+            raise ValueError("Threshold {} is not tracked. Tracked thresholds: {}".format(threshold, self.run_thresholds))
+        return self.runs[threshold].all_lengths()
+
+    def calculate(self, indices: typing.Iterable[str] = None, index_kwargs: dict = None) -> dict:
+        """Calculates indices of the summarized measurement.
+
+        Arguments:
+            indices (list of str, optional):
+                names of indices from SUMMARY_INDICES.
+                Calculates all of them if None.
+            index_kwargs (dict, optional):
+                index name - dict of arguments pairs used for indices,
+                which take arguments. Falls back to UNIT_INDEX_KWARGS of calc_config.unit.
+
+        Returns:
+            dict:
+                index name - index value pairs in the order of `indices`
+
+        Raises:
+            ValueError:
+                if any of the indices has no summary form
+            ValueError:
+                if an index needs a lag or a threshold, which is not tracked
+
+        """
+        indices = list(SUMMARY_INDICES.keys()) if indices is None else list(indices)
+        unknown = [name for name in indices if name not in SUMMARY_INDICES]
+        if(unknown):
+            raise ValueError("Indices without a summary form: {}. Available indices: {}".format(
+                unknown, list(SUMMARY_INDICES.keys())))
+
+        index_kwargs = {} if index_kwargs is None else index_kwargs
+        results = {}
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for name in indices:
+                kwargs = index_kwargs.get(name, UNIT_INDEX_KWARGS[self.calc_config.unit].get(name, {}))
+                results[name] = SUMMARY_INDICES[name](self, **kwargs)
+        return results
+
+
+def _m100(summary: GlucoseSummary) -> float:
+    return summary.expectation(Formulas.m100(Formulas.log10(summary.values), summary.calc_config.unit))
+
+
+def _modd(summary: GlucoseSummary) -> float:
+    count, mean, _ = summary.lagged_moments(24 * 60)
+    return mean if count else np.nan
+
+
+def _conga(summary: GlucoseSummary, hours: int) -> float:
+    count, _, m2 = summary.lagged_moments(Formulas.check_hours(hours) * 60)
+    return m2 / count if count else np.nan
+
+
+def _grade_fraction(summary: GlucoseSummary, mask: np.ndarray) -> float:
+    grade = summary.grade()
+    defined = np.isfinite(grade)
+    return np.dot(summary.counts[defined & mask], grade[defined & mask]) / np.dot(summary.counts[defined], grade[defined])
+
+
+def _bgi(summary: GlucoseSummary, low: bool) -> float:
+    return summary.expectation(Formulas.bgi(summary.risk(), low))
+
+
+def _auc(summary: GlucoseSummary, standardize: bool = True) -> float:
+    return Formulas.auc(summary.auc_sum, summary.length, standardize)
+
+
+def _hypo_events(summary: GlucoseSummary, threshold: float, duration: int) -> typing.Tuple[int, int]:
+    """Number of hypoglycemic events and their total number of records."""
+    Formulas.check_threshold(threshold)
+    if(type(duration) != int):
+        raise ValueError("duration must be int")
+    events = records = 0
+    for length, count in summary.run_lengths(threshold).items():
+        if(length >= duration / summary.calc_config.interval):
+            events = events + count
+            records = records + length * count
+    return events, records
+
+
+def _mean_hypo_event_duration(summary: GlucoseSummary, threshold: float, records_duration: int = 15) -> float:
+    events, records = _hypo_events(summary, threshold, records_duration)
+    return records / events * summary.calc_config.interval if events else 0
+
+
+def _below(summary: GlucoseSummary, threshold: float) -> int:
+    Formulas.check_threshold(threshold)
+    return summary.count(Formulas.below(summary.values, threshold))
+
+
+def _above(summary: GlucoseSummary, threshold: float) -> int:
+    Formulas.check_threshold(threshold)
+    return summary.count(Formulas.above(summary.values, threshold))
+
+
+def _time_in_range(summary: GlucoseSummary, lower_bound: float = None, upper_bound: float = None) -> float:
+    lower_bound, upper_bound = Formulas.time_in_range_bounds(summary.calc_config, lower_bound, upper_bound)
+    in_range = Formulas.above(summary.values, lower_bound) & Formulas.below(summary.values, upper_bound)
+    return summary.count(in_range) / summary.valid_count
+
+
+# Evaluators of INDICES_TO_CALC entries working on a GlucoseSummary
+SUMMARY_INDICES = {
+    "Mean" : lambda summary: summary.mean(),
+    "Median" : lambda summary: summary.median(),
+    "Variance" : lambda summary: summary.variance(),
+    "CV" : lambda summary: summary.std() / summary.mean(),
+    "Missing values" : lambda summary: (summary.length - summary.valid_count) / summary.length,
+    "Total time points No" : lambda summary: summary.length,
+    "Standard deviation" : lambda summary: summary.std(),
+    "M100" : _m100,
+    "J-index" : lambda summary: Formulas.j_index(summary.mean(), summary.std()),
+    "MODD" : _modd,
+    "CONGA" : _conga,
+    "Hypoglycemia fraction" : lambda summary, threshold: _below(summary, threshold) / summary.valid_count,
+    "Hyperglycemia fraction" : lambda summary, threshold: _above(summary, threshold) / summary.valid_count,
+    "GRADE" : lambda summary: summary.expectation(summary.grade()),
+    "GRADE hypoglycemia" : lambda summary: _grade_fraction(summary, Formulas.below(summary.mmol(), Formulas.GRADE_HYPO_MMOL)),
+    "GRADE hyperglycemia" : lambda summary: _grade_fraction(summary, Formulas.above(summary.mmol(), Formulas.GRADE_HYPER_MMOL)),
+    "Low Blood Glucose Index" : lambda summary: _bgi(summary, low=True),
+    "High Blood Glucose Index" : lambda summary: _bgi(summary, low=False),
+    "eA1c" : lambda summary: Formulas.ea1c(summary.mean(), summary.calc_config.unit),
+    "AUC" : _auc,
+    "Hypoglycemic events No" : lambda summary, threshold, threshold_duration=15: _hypo_events(summary, threshold, threshold_duration)[0],
+    "Time in hypoglycemia" : lambda summary, threshold: _below(summary, threshold) * summary.calc_config.interval,
+    "Mean duration of hypoglycemic event" : _mean_hypo_event_duration,
+    "Time in range" : _time_in_range,
+}
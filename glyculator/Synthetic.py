@@ -0,0 +1,264 @@
+import logging
+import typing
+
+import numpy as np
+import pandas as pd
+
+from .configs import ReadConfig
+from .utils import DT, GLUCOSE
+
+
+# Ground truth column - True for readings of the regular measurement grid
+ON_GRID = "on-grid"
+
+# Column layouts of written files - ReadConfig arguments for reading them
+LAYOUTS = {
+    "date_time" : {"header_skip" : 2, "date_time_column" : 0, "glucose_values_column" : 1},
+    "date_and_time" : {"header_skip" : 2, "date_column" : 2, "time_column" : 3, "glucose_values_column" : 1},
+}
+
+_FILE_COLUMNS = ["dt", "glucose", "date", "time"]
+
+
+class SyntheticCGM():
+    """Seeded generator of CGM recordings with controlled artifacts.
+
+    A recording is a regular grid of readings every interval minutes
+    with glucose values following a daily rhythm and autocorrelated
+    noise. On top of the grid the generator adds:
+        sensor gaps - runs of grid readings removed from the recording,
+        empty glucose cells - grid readings without a glucose value,
+        clock drift - the grid slowly shifts against the wall clock,
+        extra readings - off-grid readings between two grid readings,
+        duplicates - copies of grid readings with the same date.
+
+    Every row is labelled in the ON_GRID column, so a flagger like
+    DateFixer can be scored against the ground truth. The same seed
+    always gives the same recording.
+
+    Attributes:
+        interval (int):
+            minutes between grid readings
+        seed (int):
+            seed of the random generator
+        extra_fraction (float):
+            number of extra readings as a fraction of grid readings
+        duplicate_fraction (float):
+            number of duplicated readings as a fraction of grid readings
+        gaps (int):
+            number of sensor gaps
+        gap_length (tuple of int):
+            minimal and maximal number of readings in a gap
+        empty_fraction (float):
+            fraction of grid readings with an empty glucose cell
+        drift (float):
+            seconds the sensor clock gains per day
+        start (str):
+            date of the first reading
+
+    """
+    __attrs__ = [
+        "interval", "seed", "extra_fraction", "duplicate_fraction", "gaps", "gap_length",
+        "empty_fraction", "drift", "start"
+    ]
+
+    def __init__(self, interval: int = 5, seed: int = 0, extra_fraction: float = 0.02,
+        duplicate_fraction: float = 0.01, gaps: int = 2, gap_length: typing.Tuple[int, int] = (6, 36),
+        empty_fraction: float = 0.01, drift: float = 0.0, start: str = "2020-01-01 00:00:00") -> None:
+        if(type(interval) != int or interval <= 0):
+            raise ValueError("interval must be a positive int")
+        for name, fraction in [("extra_fraction", extra_fraction), ("duplicate_fraction", duplicate_fraction),
+            ("empty_fraction", empty_fraction)]:
+            if(fraction < 0 or fraction > 1):
+                raise ValueError("{} must be between 0 and 1".format(name))
+        if(type(gaps) != int or gaps < 0):
+            raise ValueError("gaps must be a non-negative int")
+        if(gap_length[0] < 1 or gap_length[0] > gap_length[1]):
+            raise ValueError("gap_length must be a (minimum, maximum) pair of positive ints")
+
+        self.interval = interval
+        self.seed = seed
+        self.extra_fraction = extra_fraction
+        self.duplicate_fraction = duplicate_fraction
+        self.gaps = gaps
+        self.gap_length = gap_length
+        self.empty_fraction = empty_fraction
+        self.drift = drift
+        self.start = pd.Timestamp(start)
+        self.logger = logging.getLogger(__name__)
+
+    def _glucose(self, random_state: np.random.RandomState, records: int) -> np.ndarray:
+        minutes = np.arange(records) * self.interval
+        # AR(1) noise keeps neighbouring readings close like a real sensor
+        noise = random_state.normal(0, 8, records)
+        noise = pd.Series(noise).ewm(alpha=0.3, adjust=False).mean().values * 3
+        glucose = 140 + 45 * np.sin(minutes * 2 * np.pi / (24 * 60)) + noise
+        return np.round(np.clip(glucose, 40, 400))
+
+    def generate(self, days: float = None, records: int = None) -> pd.DataFrame:
+        """Generates a recording.
+
+        Arguments:
+            days (float, optional):
+                length of the recording in days
+            records (int, optional):
+                number of grid readings. Used if days is None.
+
+        Returns:
+            pandas.DataFrame:
+                DT, GLUCOSE and ON_GRID columns sorted by DT.
+                Empty glucose cells are NaN.
+
+        Raises:
+            ValueError:
+                if neither days nor records is supplied
+
+        """
+        if(days is None and records is None):
+            raise ValueError("days or records must be supplied")
+        if(days is not None):
+            records = int(days * 24 * 60 // self.interval)
+
+        random_state = np.random.RandomState(self.seed)
+        glucose = self._glucose(random_state, records)
+
+        seconds_per_record = self.interval * 60 + self.drift * self.interval / (24 * 60)
+        offsets = np.arange(records) * seconds_per_record
+
+        keep = np.ones(records, dtype=bool)
+        for _ in range(self.gaps if records else 0):
+            length = random_state.randint(self.gap_length[0], self.gap_length[1] + 1)
+            gap_start = random_state.randint(0, max(records - length, 1))
+            keep[gap_start : gap_start + length] = False
+        positions = np.flatnonzero(keep)
+
+        grid_glucose = glucose[positions]
+        empty = random_state.choice(len(positions), int(self.empty_fraction * len(positions)), replace=False)
+        grid_glucose[empty] = np.nan
+
+        # Extra readings lie strictly between two grid readings
+        extras = random_state.choice(positions, int(self.extra_fraction * len(positions)), replace=True)
+        extra_offsets = offsets[extras] + random_state.uniform(0.2, 0.8, len(extras)) * seconds_per_record
+        extra_glucose = glucose[extras] + random_state.randint(-5, 6, len(extras))
+
+        duplicates = random_state.choice(len(positions), int(self.duplicate_fraction * len(positions)), replace=False)
+
+        df = pd.DataFrame({
+            "offset" : np.concatenate((offsets[positions], extra_offsets, offsets[positions][duplicates])),
+            GLUCOSE : np.concatenate((grid_glucose, extra_glucose, grid_glucose[duplicates])),
+            ON_GRID : np.concatenate((np.ones(len(positions), dtype=bool), np.zeros(len(extras) + len(duplicates), dtype=bool))),
+        })
+        # Grid readings come before their duplicates
+        df = df.sort_values(by=["offset", ON_GRID], ascending=[True, False], kind="mergesort")
+        df.insert(0, DT, self.start + pd.to_timedelta(np.round(df["offset"].values), unit="s"))
+        df = df.drop(columns="offset").reset_index(drop=True)
+
+        self.logger.debug("SyntheticCGM - generate - return:\n{}".format(df))
+        return df
+
+    def __call__(self, days: float = None, records: int = None) -> pd.DataFrame:
+        return self.generate(days, records)
+
+
+def score_flags(flags: typing.Union[np.ndarray, pd.Series, list], df: pd.DataFrame) -> dict:
+    """Compares flags of a flagger, e.g. DateFixer, with the ground truth.
+
+    Arguments:
+        flags:
+            list-like of booleans - True for readings kept by the flagger
+        df (pandas.DataFrame):
+            recording returned by SyntheticCGM.generate
+
+    Returns:
+        dict:
+            "Accuracy" - fraction of correctly flagged readings,
+            "Dropped grid readings" - grid readings flagged False,
+            "Kept extra readings" - extra readings and duplicates flagged True
+
+    """
+    flags = np.asarray(flags, dtype=bool)
+    truth = df[ON_GRID].values
+    if(len(flags) != len(truth)):
+        raise ValueError("flags must have one element per reading of df")
+    return {
+        "Accuracy" : float(np.mean(flags == truth)) if len(truth) else np.nan,
+        "Dropped grid readings" : int(np.sum(truth & ~flags)),
+        "Kept extra readings" : int(np.sum(~truth & flags)),
+    }
+
+
+def _file_frame(df: pd.DataFrame, layout: str, as_text: bool) -> pd.DataFrame:
+    """Arranges a recording in the columns of the example files in tests/test_files."""
+    if(layout not in LAYOUTS):
+        raise ValueError("layout must be one of {}".format(list(LAYOUTS.keys())))
+
+    dates = pd.DatetimeIndex(df[DT])
+    frame = pd.DataFrame("", index=df.index, columns=_FILE_COLUMNS, dtype=object)
+    frame["glucose"] = [value if not np.isnan(value) else "" for value in df[GLUCOSE]]
+
+    if(layout == "date_time"):
+        frame["dt"] = dates.strftime("%d/%m/%Y %H:%M:%S") if as_text else list(dates.to_pydatetime())
+    else:
+        frame["date"] = dates.strftime("%d/%m/%Y") if as_text else list(dates.normalize().to_pydatetime())
+        frame["time"] = dates.strftime("%H:%M:%S") if as_text else list(dates.time)
+    return frame
+
+
+def _header(columns: list) -> pd.DataFrame:
+    return pd.DataFrame([["ID"] + [""] * (len(columns) - 1), columns], columns=columns)
+
+
+def to_csv(df: pd.DataFrame, path: str, layout: str = "date_time", delimiter: str = ",") -> ReadConfig:
+    """Writes a recording as a delimited file.
+
+    Arguments:
+        df (pandas.DataFrame):
+            recording with DT and GLUCOSE columns
+        path (str):
+            path of the file
+        layout (str):
+            one of LAYOUTS
+        delimiter (str):
+            delimiter of the file
+
+    Returns:
+        ReadConfig:
+            configuration for reading the file with FileReader.
+            Empty glucose cells need FileReader(columnar=True).
+
+    """
+    frame = pd.concat([_header(_FILE_COLUMNS), _file_frame(df, layout, as_text=True)])
+    frame.to_csv(path, sep=delimiter, header=False, index=False)
+    return ReadConfig(**LAYOUTS[layout])
+
+
+def to_excel(df: pd.DataFrame, path: str, layout: str = "date_time") -> ReadConfig:
+    """Writes a recording as an xlsx file with dates stored as Excel dates.
+
+    Requires openpyxl.
+
+    Arguments:
+        df (pandas.DataFrame):
+            recording with DT and GLUCOSE columns
+        path (str):
+            path of the file
+        layout (str):
+            one of LAYOUTS
+
+    Returns:
+        ReadConfig:
+            configuration for reading the file with FileReader
+
+    Raises:
+        ImportError:
+            if openpyxl is not installed
+
+    """
+    try:
+        import openpyxl
+    except ImportError:
+        raise ImportError("Writing xlsx files requires openpyxl. Install it with: pip install openpyxl")
+
+    frame = pd.concat([_header(_FILE_COLUMNS), _file_frame(df, layout, as_text=False)])
+    frame.to_excel(path, header=False, index=False, engine="openpyxl")
+    return ReadConfig(**LAYOUTS[layout])
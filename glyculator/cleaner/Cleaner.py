@@ -1,8 +1,16 @@
-import numpy as np
-import tensorflow as tf
+import os
+import sys
+import argparse
 import functools
 
+import numpy as np
+
 import glyculator.cleaner.config as config
+from glyculator.utils import MODEL_BACKENDS
+
+# tensorflow is imported only by the tensorflow backend of Cleaner5,
+# so the numpy backend works without tensorflow installed.
+
 
 class Cleaner(object):
     def predict_proba(self):
@@ -15,16 +23,147 @@ class Cleaner(object):
         raise NotImplementedError
 
 
+class NumpyDenseModel(object):
+    """Forward pass of a stack of dense layers written in numpy.
+
+    Mirrors the keras model of Cleaner5: min-max scaling of the input,
+    dense layers with relu activations and a linear output layer.
+
+    Attributes:
+        kernels (list):
+            list of numpy.ndarray weight matrices
+        biases (list):
+            list of numpy.ndarray bias vectors
+        scaler_min (float):
+        scaler_max (float):
+
+    """
+    def __init__(self, kernels: list, biases: list, scaler_min: float = config.SCALER_MIN,
+        scaler_max: float = config.SCALER_MAX):
+        if(len(kernels) != len(biases) or len(kernels) == 0):
+            raise ValueError("kernels and biases must be non-empty lists of the same length")
+        self.kernels = kernels
+        self.biases = biases
+        self.scaler_min = scaler_min
+        self.scaler_max = scaler_max
+
+    @classmethod
+    def load(cls, path: str = config.NUMPY_MODEL_PATH):
+        """Loads the model from an archive written by export_numpy_weights.
+
+        Arguments:
+            path (str):
+                path to the .npz archive
+
+        Returns:
+            NumpyDenseModel
+
+        Raises:
+            FileNotFoundError:
+                if the archive does not exist
+
+        """
+        if(not os.path.isfile(path)):
+            raise FileNotFoundError(
+                "{} not found. Export the weights of the keras model with "
+                "python -m glyculator.cleaner.Cleaner".format(path))
+        with np.load(path) as archive:
+            layers_no = int(archive["layers_no"])
+            kernels = [archive["kernel_{}".format(i)] for i in range(layers_no)]
+            biases = [archive["bias_{}".format(i)] for i in range(layers_no)]
+            return cls(kernels, biases, float(archive["scaler_min"]), float(archive["scaler_max"]))
+
+    def predict(self, matrix: np.ndarray) -> np.ndarray:
+        """Returns logits for every row of matrix.
+
+        Arguments:
+            matrix (numpy.ndarray):
+                array of shape (<cases number>, 14)
+
+        Returns:
+            numpy.ndarray:
+                array of shape (<cases number>, 1)
+
+        """
+        # Same scaling as the normalizer_fn of the keras model
+        activations = (np.asarray(matrix, dtype=np.float32) - self.scaler_min) / self.scaler_max - self.scaler_min
+        for kernel, bias in zip(self.kernels[:-1], self.biases[:-1]):
+            activations = np.maximum(activations @ kernel + bias, 0)
+        return activations @ self.kernels[-1] + self.biases[-1]
+
+
+def export_numpy_weights(model, path: str = config.NUMPY_MODEL_PATH) -> None:
+    """Saves weights of a keras model of Cleaner5 to a numpy archive.
+
+    The archive is read by NumpyDenseModel.load. Needs to be done only once
+    after the weights of the keras model change.
+
+    Arguments:
+        model (tensorflow.keras.Model):
+            set up model of Cleaner5
+        path (str):
+            path to the .npz archive
+
+    """
+    import tensorflow as tf
+
+    dense_layers = [layer for layer in model.layers if isinstance(layer, tf.keras.layers.Dense)]
+    arrays = {
+        "layers_no" : np.array(len(dense_layers)),
+        "scaler_min" : np.array(config.SCALER_MIN),
+        "scaler_max" : np.array(config.SCALER_MAX),
+    }
+    for i, layer in enumerate(dense_layers):
+        kernel, bias = layer.get_weights()
+        arrays["kernel_{}".format(i)] = kernel
+        arrays["bias_{}".format(i)] = bias
+
+    np.savez(path, **arrays)
+
+
+def main(argv: list = None) -> int:
+    """Exports the shipped weights of the keras model for the numpy backend.
+
+    Run from the root of the repository after the weights change:
+
+        python -m glyculator.cleaner.Cleaner
+
+    """
+    parser = argparse.ArgumentParser(description="Exports weights of Cleaner5 for its numpy backend.")
+    parser.add_argument("--weights", default=config.TENSORFLOW_MODEL_PATH, help="weights of the keras model")
+    parser.add_argument("--output", default=config.NUMPY_MODEL_PATH, help="path to the .npz archive")
+    args = parser.parse_args(argv)
+
+    export_numpy_weights(Cleaner5(backend="tensorflow", model_path=args.weights).model, args.output)
+    print("Exported {} to {}".format(args.weights, args.output))
+    return 0
+
+
 class Cleaner5(Cleaner):
     """Wrapper around keras model.
-    
+
     Makes predictions about CGM time points
     being a part of regular 5 minutes interspersed
     measurement.
 
+    Attributes:
+        backend (str):
+            "tensorflow" runs the keras model,
+            "numpy" runs the same network exported with export_numpy_weights
+            without importing tensorflow.
+        model_path (str):
+            path to the weights. Defaults to the weights
+            shipped with glyculator for the backend.
+
     """
-    def __init__(self):
-        self.model = self.set_up_model()
+    def __init__(self, backend: str = "tensorflow", model_path: str = None):
+        if(backend not in MODEL_BACKENDS):
+            raise ValueError("backend must be one of {}".format(MODEL_BACKENDS))
+        self.backend = backend
+        if(model_path is None):
+            model_path = config.NUMPY_MODEL_PATH if backend == "numpy" else config.TENSORFLOW_MODEL_PATH
+        self.model_path = model_path
+        self.model = self.set_up_model(model_path)
         self._probabilities = None
 
     def predict_proba(self, data: dict, interval: int) -> np.ndarray:
@@ -33,9 +172,9 @@ class Cleaner5(Cleaner):
         As a side-effects sets _probabilities output.
 
         Arguments:
-            data (dict):
-                Dict with one key - "numeric" and 
-                tensor as its value.
+            data (dict or numpy.ndarray):
+                Dictionary of variable - values pairs
+                or matrix of shape (<cases number>, 14).
             interval (int):
                 Number of minutes designating the temporal pattern.
 
@@ -44,19 +183,24 @@ class Cleaner5(Cleaner):
                 Array of model probability predictions
 
         """
-        data = self._prepare_data(data, interval)
-        probabilities = np.array(tf.sigmoid(self.model.predict(data))).flatten()
+        if(self.backend == "numpy"):
+            logits = self.model.predict(self._prepare_matrix(data, interval)).flatten()
+            probabilities = 1 / (1 + np.exp(-logits))
+        else:
+            import tensorflow as tf
+            data = self._prepare_data(data, interval)
+            probabilities = np.array(tf.sigmoid(self.model.predict(data))).flatten()
         self._probabilities = probabilities
 
         return probabilities
-        
+
     def predict(self, data: dict, interval: int) -> np.ndarray:
         """Returns model class predictions.
 
         Arguments:
-            data (dict):
-                Dict with one key - "numeric" and 
-                tensor as its value.
+            data (dict or numpy.ndarray):
+                Dictionary of variable - values pairs
+                or matrix of shape (<cases number>, 14).
             interval (int):
                 Number of minutes designating the temporal pattern.
 
@@ -70,11 +214,42 @@ class Cleaner5(Cleaner):
 
         return predictions
 
+    def _prepare_matrix(self, data: dict, interval: int) -> np.ndarray:
+        """Stacks the variables into the input matrix of the model.
+
+        Arguments:
+            data (dict or numpy.ndarray):
+                Dictionary of variable - values pairs or an
+                already stacked matrix, which is used as it is.
+            interval (int):
+                Number of minutes designating the temporal pattern.
+
+        Returns:
+            numpy.ndarray:
+                array of shape (<cases number>, 14)
+
+        """
+        if(isinstance(data, np.ndarray)):
+            matrix = data
+        else:
+            all_values = []
+            for var_name in config.NUMERIC_FEATURES:
+                all_values.append(data[var_name])
+
+            matrix = np.array(all_values).reshape((config.WINDOW_SIZE - 1, -1)).transpose()
+
+        # Normalizing the input to 5 minutes, so model will work on
+        # other interval
+        coefficient = 5 / interval
+        if(coefficient == 1):
+            return matrix
+        return matrix * coefficient
+
     def _prepare_data(self, data: dict, interval: int) -> dict:
         """Prepares data to input into the model
 
         Arguments:
-            data (dict): 
+            data (dict):
                 Dictionary of variable - values pairs.
             interval (int):
                 Number of minutes designating the temporal pattern.
@@ -86,38 +261,61 @@ class Cleaner5(Cleaner):
                 This is the shape accepted by the keras model as input.
 
         """
-        all_values = []
-        for var_name in config.NUMERIC_FEATURES:
-            all_values.append(data[var_name])
-
-        matrix = np.array(all_values).reshape((config.WINDOW_SIZE - 1, -1)).transpose()
+        import tensorflow as tf
 
-        # Normalizing the input to 5 minutes, so model will work on
-        # other interval
-        coefficient = 5 / interval 
-        matrix = matrix * coefficient
-
-        tensor = tf.convert_to_tensor(matrix)
+        # Window matrices are strided views, tensorflow needs contiguous memory
+        tensor = tf.convert_to_tensor(np.ascontiguousarray(self._prepare_matrix(data, interval)))
         return_dict = {"numeric" : tensor}
 
         return return_dict
 
-    def set_up_model(self):
+    def set_up_model(self, model_path: str = None):
         """Sets up model.
 
         Sets up the architecture and loads weights.
 
+        Arguments:
+            model_path (str, optional):
+                path to the weights. Defaults to the weights
+                shipped with glyculator for the backend.
+
         Returns:
-            tensorflow.keras.Model
+            tensorflow.keras.Model or NumpyDenseModel
                 Set up model.
 
         """
-        MIN = 0
-        MAX = 350
+        if(self.backend == "numpy"):
+            return NumpyDenseModel.load(model_path if model_path is not None else config.NUMPY_MODEL_PATH)
+
+        model_dense = self._build_model()
+
+        # For some reason loading weights in this class produces warnings
+        # about weights and biases in some places not being loaded for different
+        # versions of Tensorflow.
+        # I have checked whether the results of this class's model
+        # are similar to the one I trained (also made one test for it)
+        # and it seems they are the same, so I don't exactly know
+        # what is going on. For now I leave it with expect_partial()
+        # to suppress the warnings.
+        # Konrad
+        model_dense.load_weights(model_path if model_path is not None else config.TENSORFLOW_MODEL_PATH).expect_partial()
+        return model_dense
+
+    @staticmethod
+    def _build_model():
+        """Builds the architecture of the keras model.
+
+        Returns:
+            tensorflow.keras.Model
+                Model with not loaded weights.
+
+        """
+        import tensorflow as tf
+
         def min_max_scale_numeric_data(data, min_, max_):
             return (data - min_) / max_ - min_
 
-        SCALER = functools.partial(min_max_scale_numeric_data, min_ = MIN, max_ = MAX)
+        SCALER = functools.partial(min_max_scale_numeric_data, min_ = config.SCALER_MIN, max_ = config.SCALER_MAX)
 
         numeric_column = tf.feature_column.numeric_column("numeric", normalizer_fn=SCALER, shape=[len(config.NUMERIC_FEATURES)])
         numeric_columns = [numeric_column]
@@ -138,16 +336,8 @@ class Cleaner5(Cleaner):
             tf.keras.layers.Dense(1)
         ])
 
-        model_dense = model_densev2
+        return model_densev2
 
-        # For some reason loading weights in this class produces warnings
-        # about weights and biases in some places not being loaded for different
-        # versions of Tensorflow.
-        # I have checked whether the results of this class's model
-        # are similar to the one I trained (also made one test for it)
-        # and it seems they are the same, so I don't exactly know
-        # what is going on. For now I leave it with expect_partial() 
-        # to suppress the warnings.
-        # Konrad
-        model_dense.load_weights("glyculator/cleaner/model/DenseComplicatedv2").expect_partial()
-        return model_dense
+
+if __name__ == "__main__":
+    sys.exit(main())
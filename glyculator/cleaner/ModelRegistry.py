@@ -0,0 +1,165 @@
+import time
+import logging
+import threading
+
+
+def _cleaner5_factory():
+    # Imported here, so tensorflow is not imported until a model is needed
+    from glyculator.cleaner.Cleaner import Cleaner5
+    return Cleaner5()
+
+
+def _cleaner5_numpy_factory():
+    from glyculator.cleaner.Cleaner import Cleaner5
+    return Cleaner5(backend="numpy")
+
+
+DEFAULT_MODEL = "Cleaner5"
+
+# Seconds a failed set up of a model is remembered before it is retried
+FAILURE_RETRY_SECONDS = 60
+
+MODEL_FACTORIES = {
+    DEFAULT_MODEL : _cleaner5_factory,
+    "Cleaner5-numpy" : _cleaner5_numpy_factory,
+}
+
+# Name of the model in the registry for every Cleaner5 backend
+BACKEND_MODELS = {
+    "tensorflow" : DEFAULT_MODEL,
+    "numpy" : "Cleaner5-numpy",
+}
+
+
+class ModelRegistry(object):
+    """Process-wide store of set up date fixing models.
+
+    Setting up a Cleaner builds the network and loads its weights,
+    which is much slower than making predictions. ModelRegistry
+    sets up every model at most once per process and hands out
+    the same object to all callers. Loading is guarded by a lock,
+    so concurrent threads never set up the same model twice.
+    A model, which failed to set up, is not retried for retry_seconds -
+    until then every get raises the same exception, so a batch of files
+    does not pay for a failing set up once per file. Later gets
+    (or gets after clear) set the model up again, e.g. after missing
+    weights were restored.
+
+    Attributes:
+        factories (dict):
+            model name - callable returning a set up model pairs
+        retry_seconds (float):
+            seconds a failure is remembered
+        load_times (dict):
+            model name - seconds it took to set up the model
+
+    """
+    def __init__(self, factories: dict = None, retry_seconds: float = FAILURE_RETRY_SECONDS):
+        self.factories = dict(MODEL_FACTORIES if factories is None else factories)
+        self.retry_seconds = retry_seconds
+        self.load_times = {}
+        self._models = {}
+        self._failures = {}
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def get(self, name: str = DEFAULT_MODEL):
+        """Returns a set up model, setting it up if needed.
+
+        Arguments:
+            name (str):
+                name of the model
+
+        Returns:
+            Cleaner:
+                set up model
+
+        Raises:
+            ValueError:
+                if there is no factory for the model name
+            Exception:
+                raised by the factory while setting up the model now
+                or less than retry_seconds ago
+
+        """
+        model = self._models.get(name)
+        if(model is not None):
+            return model
+        self._raise_failure(name)
+
+        if(name not in self.factories):
+            raise ValueError("Unknown model: {}. Available models: {}".format(name, list(self.factories.keys())))
+
+        with self._lock:
+            # Another thread might have set up the model while this one waited
+            self._raise_failure(name)
+            if(name not in self._models):
+                start = time.perf_counter()
+                try:
+                    self._models[name] = self.factories[name]()
+                except Exception as e:
+                    self._failures[name] = (e, time.monotonic())
+                    self.logger.warning("ModelRegistry - get - could not set up {}: {}".format(name, e))
+                    raise
+                self.load_times[name] = time.perf_counter() - start
+                self.logger.info("ModelRegistry - get - set up {} in {:.3f}s".format(name, self.load_times[name]))
+            return self._models[name]
+
+    def _raise_failure(self, name: str) -> None:
+        """Raises the exception of a recent failed set up of the model."""
+        failure = self._failures.get(name)
+        if(failure is None):
+            return
+        exception, failed_at = failure
+        if(time.monotonic() - failed_at < self.retry_seconds):
+            raise exception
+        self._failures.pop(name, None)
+
+    def warm_up(self, names: list = None) -> dict:
+        """Sets up models ahead of the first prediction.
+
+        Meant to be called once at the start of a worker.
+
+        Arguments:
+            names (list, optional):
+                names of models to set up. Defaults to [DEFAULT_MODEL]
+
+        Returns:
+            dict:
+                model name - seconds it took to set up the model.
+                0 for models set up before the call.
+
+        """
+        names = [DEFAULT_MODEL] if names is None else names
+        times = {}
+        for name in names:
+            already_loaded = name in self._models
+            self.get(name)
+            times[name] = 0.0 if already_loaded else self.load_times[name]
+        return times
+
+    def is_loaded(self, name: str = DEFAULT_MODEL) -> bool:
+        return name in self._models
+
+    def clear(self) -> None:
+        """Drops all set up models and remembered failures."""
+        with self._lock:
+            self._models.clear()
+            self._failures.clear()
+            self.load_times.clear()
+
+
+_registry = ModelRegistry()
+
+
+def get_registry() -> ModelRegistry:
+    """Returns the registry shared by the whole process."""
+    return _registry
+
+
+def get_model(name: str = DEFAULT_MODEL):
+    return _registry.get(name)
+
+
+def warm_up(names: list = None) -> dict:
+    return _registry.warm_up(names)
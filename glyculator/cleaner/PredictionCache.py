@@ -0,0 +1,134 @@
+import typing
+import logging
+import threading
+import collections
+
+import numpy as np
+
+
+DEFAULT_MAX_ENTRIES = 65536
+
+
+class PredictionCache(object):
+    """Process-wide cache of model probabilities of single windows.
+
+    A window is the vector of 14 differences between consecutive dates
+    fed to the date fixing model. Windows are looked up together with
+    the model and the interval. Only distinct windows, which are not
+    cached, are predicted - in one call of the model - so a regular
+    recording costs a handful of rows of the network no matter its length.
+
+    By default windows must be equal to share an entry, so probabilities
+    are exactly the ones of the model. With quantum, windows are rounded
+    to quantum seconds for the lookup only: the model still predicts the
+    first window of every rounded group, and the other windows of the
+    group get its probability.
+
+    The least recently used windows are dropped above max_entries.
+    hits and misses count windows (rows of the window matrices).
+
+    Attributes:
+        max_entries (int):
+            maximal number of cached windows
+        quantum (float):
+            seconds windows are rounded to for the lookup or None
+        hits (int):
+            windows answered from the cache
+        misses (int):
+            windows, which needed the model
+
+    """
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, quantum: float = None):
+        if(type(max_entries) != int or max_entries < 1):
+            raise ValueError("max_entries must be a positive int")
+        if(quantum is not None and quantum <= 0):
+            raise ValueError("quantum must be positive or None")
+        self.max_entries = max_entries
+        self.quantum = quantum
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def predict(self, windows: np.ndarray, interval: int, predict, model: typing.Hashable = "") -> np.ndarray:
+        """Returns probabilities of windows predicting only the ones not cached.
+
+        Arguments:
+            windows (numpy.ndarray):
+                window matrix of shape (<cases number>, 14)
+            interval (int):
+                number of minutes designating the temporal pattern
+            predict (callable):
+                predict(windows, interval=interval) returning probabilities,
+                e.g. Cleaner5.predict_proba
+            model (hashable):
+                identifies the model and its weights, e.g. (name, weights path) -
+                windows of different models are cached separately
+
+        Returns:
+            numpy.ndarray:
+                probabilities of every window
+
+        """
+        if(len(windows) == 0):
+            return np.zeros(0)
+
+        windows = np.asarray(windows, dtype=np.float64)
+        lookup = windows if self.quantum is None else np.round(windows / self.quantum).astype(np.int64)
+        distinct, first, inverse = np.unique(lookup, axis=0, return_index=True, return_inverse=True)
+        counts = np.bincount(inverse, minlength=len(distinct))
+        keys = [(model, interval, row.tobytes()) for row in distinct]
+
+        probabilities = np.empty(len(distinct))
+        with self._lock:
+            missing = []
+            for i, key in enumerate(keys):
+                if(key in self._entries):
+                    self._entries.move_to_end(key)
+                    probabilities[i] = self._entries[key]
+                else:
+                    missing.append(i)
+            self.hits += int(counts.sum() - counts[missing].sum())
+            self.misses += int(counts[missing].sum())
+
+        if(missing):
+            predicted = np.asarray(predict(windows[first[missing]], interval=interval), dtype=np.float64)
+            probabilities[missing] = predicted
+            with self._lock:
+                for i, probability in zip(missing, predicted):
+                    self._entries[keys[i]] = probability
+                    self._entries.move_to_end(keys[i])
+                while(len(self._entries) > self.max_entries):
+                    self._entries.popitem(last=False)
+
+        self.logger.debug("PredictionCache - predict - {} windows, {} distinct, {} predicted".format(
+            len(windows), len(distinct), len(missing)))
+        return probabilities[inverse]
+
+    def stats(self) -> dict:
+        windows = self.hits + self.misses
+        return {
+            "hits" : self.hits,
+            "misses" : self.misses,
+            "hit_rate" : self.hits / windows if windows else np.nan,
+            "entries" : len(self._entries),
+        }
+
+    def clear(self) -> None:
+        """Drops all cached windows and resets the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+_cache = PredictionCache()
+
+
+def get_cache() -> PredictionCache:
+    """Returns the cache shared by the whole process."""
+    return _cache
@@ -16,4 +16,11 @@ Konrad
 NUMERIC_FEATURES = ["var" + str(i) for i in range(WINDOW_SIZE - 1)]
 BATCH_SIZE = 32
 PREDICTIONS_THRESHOLD = 0.5
-MODEL_PATH = "src/cleaner/model/DenseComplicatedv2"
\ No newline at end of file
+MODEL_PATH = "src/cleaner/model/DenseComplicatedv2"
+# Weights of the model exported for the numpy backend of Cleaner5
+NUMPY_MODEL_PATH = "glyculator/cleaner/model/DenseComplicatedv2.npz"
+TENSORFLOW_MODEL_PATH = "glyculator/cleaner/model/DenseComplicatedv2"
+
+# Min-max scaling of the differences applied before the first dense layer
+SCALER_MIN = 0
+SCALER_MAX = 350
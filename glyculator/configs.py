@@ -1,5 +1,6 @@
 from typing import Union, Tuple
 from .utils import MAGE_EXCURSION_THRESHOLDS, METRONOME_ADDRESS, METRONOME_ENDPOINT, METRONOME_PORT
+from .utils import MODEL_BACKENDS, REGULARITY_TOLERANCE, FLAGGERS
 
 
 class ReadConfig:
@@ -95,6 +96,10 @@ class CleanConfig:
         api_address
         api_endpoint
         _full_api_address
+        fill_glucose_tolerance
+        model_backend
+        regularity_tolerance
+        flagger
 
     """
     def __init__(self,
@@ -103,17 +108,22 @@ class CleanConfig:
         api_port: Union[int, None] = None,
         api_address: Union[str, None] = None,
         api_endpoint: Union[str, None] = None,
-        fill_glucose_tolerance: int = None):
+        fill_glucose_tolerance: int = None,
+        model_backend: str = "tensorflow",
+        regularity_tolerance: Union[int, None] = REGULARITY_TOLERANCE,
+        flagger: str = "model"):
         self.set_interval(interval)
         self.set_use_api(use_api)
+        self.set_model_backend(model_backend)
+        self.set_regularity_tolerance(regularity_tolerance)
+        self.set_flagger(flagger)
         if(api_port is not None):
             self.set_api_port(api_port)
         if(api_address is not None):
             self.set_api_address(api_address)
         if(api_endpoint is not None):
             self.set_api_endpoint(api_endpoint)
-        if(fill_glucose_tolerance is not None):
-            self.set_fill_glucose_tolerance(fill_glucose_tolerance)
+        self.set_fill_glucose_tolerance(fill_glucose_tolerance)
 
     def set_interval(self, interval: int):
         """Interval setter.
@@ -212,6 +222,62 @@ class CleanConfig:
         else:
             self.fill_glucose_tolerance = fill_glucose_tolerance
 
+    def set_model_backend(self, model_backend: str) -> None:
+        """model_backend setter.
+
+        Args:
+            model_backend:
+                backend running the local date fixing model.
+                "tensorflow" or "numpy"; "numpy" does not need tensorflow
+                installed
+
+        Raises:
+            ValueError: if model_backend is not one of MODEL_BACKENDS
+
+        """
+        if(model_backend not in MODEL_BACKENDS):
+            raise ValueError("model_backend must be one of {}".format(MODEL_BACKENDS))
+        else:
+            self.model_backend = model_backend
+
+    def set_regularity_tolerance(self, regularity_tolerance: Union[int, None]) -> None:
+        """regularity_tolerance setter.
+
+        Args:
+            regularity_tolerance:
+                number of seconds a difference between consecutive dates
+                may deviate from the interval for FileCleaner to treat
+                the dates as regular and skip the date fixing model.
+                None always uses the model.
+
+        Raises:
+            ValueError: if regularity_tolerance is not a non-negative int or None
+
+        """
+        if(regularity_tolerance is not None and
+           (type(regularity_tolerance) != int or regularity_tolerance < 0)):
+            raise ValueError("regularity_tolerance must be a non-negative integer or None")
+        else:
+            self.regularity_tolerance = regularity_tolerance
+
+    def set_flagger(self, flagger: str) -> None:
+        """flagger setter.
+
+        Args:
+            flagger:
+                "model" flags dates with the date fixing model (local or API),
+                "grid" with the deterministic GridFlagger.align_to_grid,
+                which needs neither tensorflow nor the API
+
+        Raises:
+            ValueError: if flagger is not one of FLAGGERS
+
+        """
+        if(flagger not in FLAGGERS):
+            raise ValueError("flagger must be one of {}".format(FLAGGERS))
+        else:
+            self.flagger = flagger
+
     def _construct_full_api_address(self):
         elements_to_join = []
         elements_to_join.append(self.api_address)
@@ -28,6 +28,17 @@ ACCEPTED_API = [
     "metronome"
 ]
 
+MODEL_BACKENDS = [
+    "tensorflow",
+    "numpy",
+]
+
+# Flaggers of DateFixer: the date fixing model or GridFlagger.align_to_grid
+FLAGGERS = [
+    "model",
+    "grid",
+]
+
 METRONOME_ADDRESS = "http://localhost"
 METRONOME_PORT = 5000
 METRONOME_ENDPOINT = "v1/models/metronome"
@@ -40,4 +51,33 @@ PANDAS_FILL_FREQUENCIES = {
 PANDAS_TOLERANCES = {
     5 : "2.5min",
     15 : "7.5min",
-}
\ No newline at end of file
+}
+
+# Seconds a difference between consecutive dates may deviate
+# from the interval in a regular recording, which needs no date fixing
+REGULARITY_TOLERANCE = 30
+
+# Arguments used for indices, which require them,
+# when no other arguments are supplied.
+# Thresholds are expressed in mg/dl.
+DEFAULT_INDEX_KWARGS = {
+    "CONGA" : {"hours" : 1},
+    "Hypoglycemia fraction" : {"threshold" : 70},
+    "Hyperglycemia fraction" : {"threshold" : 180},
+    "Hypoglycemic events No" : {"threshold" : 70},
+    "Time in hypoglycemia" : {"threshold" : 70},
+    "Mean duration of hypoglycemic event" : {"threshold" : 70},
+}
+
+# DEFAULT_INDEX_KWARGS for every unit of CalcConfig
+UNIT_INDEX_KWARGS = {
+    "mg" : DEFAULT_INDEX_KWARGS,
+    "mmol" : {
+        "CONGA" : {"hours" : 1},
+        "Hypoglycemia fraction" : {"threshold" : 3.9},
+        "Hyperglycemia fraction" : {"threshold" : 10.0},
+        "Hypoglycemic events No" : {"threshold" : 3.9},
+        "Time in hypoglycemia" : {"threshold" : 3.9},
+        "Mean duration of hypoglycemic event" : {"threshold" : 3.9},
+    },
+}
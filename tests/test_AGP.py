@@ -0,0 +1,67 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from glyculator.AGP import AGP, day_slot_matrix
+from glyculator.utils import DT, GLUCOSE
+
+
+class TestAGP(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(0)
+        # Starts in the middle of a day, so the first and the last day are partial
+        periods = 3 * 288
+        self.df = pd.DataFrame({
+            DT : pd.date_range("2020/11/19 12:00", freq="5min", periods=periods),
+            GLUCOSE : np.round(np.random.uniform(40, 300, periods)),
+        })
+        self.df.loc[np.random.choice(periods, 50, replace=False), GLUCOSE] = np.nan
+
+    def test_day_slot_matrix(self):
+        matrix, days = day_slot_matrix(self.df, 5)
+        self.assertEqual(matrix.shape, (4, 288))
+        self.assertEqual(days[0], pd.Timestamp("2020/11/19"))
+        self.assertTrue(np.all(np.isnan(matrix[0, :144])))
+        self.assertEqual(matrix[0, 144], self.df.loc[0, GLUCOSE])
+        self.assertEqual(np.sum(~np.isnan(matrix)), np.sum(~np.isnan(self.df[GLUCOSE])))
+
+    def test_percentiles_equal_per_slot_percentiles(self):
+        agp = AGP(interval=5)
+        profile = agp(self.df)
+        self.assertEqual(profile.shape, (5, 288))
+        self.assertEqual(profile.dtype, np.float32)
+
+        slots = self.df[DT].dt.hour * 12 + self.df[DT].dt.minute // 5
+        for slot in [0, 143, 144, 287]:
+            values = self.df.loc[slots == slot, GLUCOSE]
+            np.testing.assert_allclose(profile[:, slot], np.nanpercentile(values, agp.percentiles), rtol=1e-6)
+
+    def test_one_minute_slots(self):
+        df = pd.DataFrame({
+            DT : pd.date_range("2020/11/19", freq="1min", periods=2 * 1440),
+            GLUCOSE : np.arange(2 * 1440, dtype=np.float64),
+        })
+        profile = AGP(interval=1, percentiles=[50])(df)
+        self.assertEqual(profile.shape, (1, 1440))
+        np.testing.assert_allclose(profile[0], np.arange(1440) + 720)
+
+    def test_empty_slots_are_nan(self):
+        profile = AGP(interval=5)(self.df.iloc[:10])
+        self.assertTrue(np.all(np.isnan(profile[:, :144])))
+        self.assertFalse(np.any(np.isnan(profile[:, 144:154])))
+
+    def test_to_frame(self):
+        agp = AGP(interval=15, percentiles=[10, 90])
+        frame = agp.to_frame(agp(self.df))
+        self.assertListEqual(list(frame.columns), [10, 90])
+        self.assertEqual(frame.index[1], pd.Timedelta(minutes=15))
+        self.assertEqual(len(frame), 96)
+
+    def test_wrong_arguments(self):
+        with self.assertRaises(ValueError):
+            AGP(interval=7)
+        with self.assertRaises(ValueError):
+            AGP(percentiles=[101])
+        with self.assertRaises(ValueError):
+            AGP()("test")
@@ -0,0 +1,178 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import glyculator.Index as indices
+from glyculator.BatchCalculator import BatchCalculator, Intermediates, IndexScheduler
+from glyculator.utils import DT, GLUCOSE, DEFAULT_INDEX_KWARGS, UNIT_INDEX_KWARGS
+from glyculator.configs import CalcConfig
+
+
+class TestBatchCalculator(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(0)
+        periods = 3 * 288
+        glucose = np.round(np.random.uniform(40, 300, periods))
+        glucose[np.random.choice(periods, 40, replace=False)] = np.nan
+        glucose[100:110] = 50
+        self.df = pd.DataFrame({
+            DT : pd.date_range("2020/11/19", freq="5min", periods=periods),
+            GLUCOSE : glucose,
+        })
+        self.config = CalcConfig(interval=5)
+        self.calculator = BatchCalculator(self.config)
+
+    def test_all_indices_equal_single_indices(self):
+        res = self.calculator(self.df.copy())
+
+        self.assertListEqual(list(res.keys()), list(indices.INDICES_TO_CALC.keys()))
+        for name, index_class in indices.INDICES_TO_CALC.items():
+            index = index_class(calc_config=self.config)
+            expected = index(self.df.copy(), **DEFAULT_INDEX_KWARGS.get(name, {}))
+            np.testing.assert_allclose(res[name], expected, rtol=1e-10,
+                                       err_msg="Index {} differs".format(name))
+
+    def test_subset_of_indices_with_kwargs(self):
+        calculator = BatchCalculator(self.config, index_kwargs={"CONGA" : {"hours" : 2}})
+        res = calculator(self.df, indices=["CONGA", "Mean"])
+
+        self.assertListEqual(list(res.keys()), ["CONGA", "Mean"])
+        expected = indices.GVcongaX(calc_config=self.config)(self.df, hours=2)
+        self.assertAlmostEqual(res["CONGA"], expected)
+
+    def test_mmol_unit(self):
+        config = CalcConfig(interval=5, unit="mmol", tir_range=(3.9, 10.0))
+        df = self.df.copy()
+        df[GLUCOSE] = df[GLUCOSE] / 18
+        res = BatchCalculator(config)(df, indices=["M100", "GRADE", "eA1c", "Time in range"])
+
+        for name in res:
+            expected = indices.INDICES_TO_CALC[name](calc_config=config)(df.copy())
+            self.assertAlmostEqual(res[name], expected)
+
+    def test_mmol_unit_default_thresholds(self):
+        config = CalcConfig(interval=5, unit="mmol", tir_range=(3.9, 10.0))
+        df = self.df.copy()
+        df[GLUCOSE] = df[GLUCOSE] / 18
+        names = list(UNIT_INDEX_KWARGS["mmol"].keys())
+        res = BatchCalculator(config)(df, indices=names)
+
+        for name in names:
+            expected = indices.INDICES_TO_CALC[name](calc_config=config)(df.copy(), **UNIT_INDEX_KWARGS["mmol"][name])
+            self.assertAlmostEqual(res[name], expected, msg=name)
+        # 3.9 mmol/l and 10 mmol/l are about 70 mg/dl and 180 mg/dl
+        mg = self.calculator(self.df, indices=["Hypoglycemia fraction", "Hyperglycemia fraction"])
+        self.assertAlmostEqual(res["Hypoglycemia fraction"], mg["Hypoglycemia fraction"], delta=0.01)
+        self.assertAlmostEqual(res["Hyperglycemia fraction"], mg["Hyperglycemia fraction"], delta=0.01)
+        self.assertGreater(res["Hypoglycemia fraction"], 0)
+        self.assertLess(res["Hyperglycemia fraction"], 1)
+
+    def test_does_not_modify_df(self):
+        df = self.df.copy()
+        self.calculator(df)
+        pd.testing.assert_frame_equal(df, self.df)
+
+    def test_unknown_index(self):
+        with self.assertRaises(ValueError):
+            self.calculator(self.df, indices=["Mean", "Not an index"])
+
+    def test_df_not_pandas(self):
+        with self.assertRaises(ValueError):
+            self.calculator("test")
+
+    def test_calc_config_wrong_type(self):
+        with self.assertRaises(ValueError):
+            BatchCalculator("test")
+
+    def test_intermediates_computed_once(self):
+        shared = Intermediates(self.df[GLUCOSE], self.config)
+        self.assertIs(shared.valid, shared.valid)
+        self.assertIs(shared.grade, shared.grade)
+
+    def test_intermediates_episodes_below(self):
+        shared = Intermediates(np.array([1, 1, 5, 1, np.nan, 1, 1, 1]), self.config)
+        episodes = shared.episodes_below(3)
+        np.testing.assert_array_equal(episodes["records"], [2, 1, 3])
+        self.assertIs(episodes, shared.episodes_below(3))
+
+
+class TestIndexScheduler(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(0)
+        self.df = pd.DataFrame({
+            DT : pd.date_range("2020/11/19", freq="5min", periods=600),
+            GLUCOSE : np.round(np.random.uniform(40, 300, 600)),
+        })
+        self.df.loc[np.random.choice(600, 20, replace=False), GLUCOSE] = np.nan
+        self.config = CalcConfig(interval=5)
+        self.scheduler = IndexScheduler()
+
+    def test_plan_orders_dependencies(self):
+        plan = self.scheduler.plan(self.config, ["CV", "Variance", "MAGE"])
+        self.assertEqual(len(plan), len(set(plan)))
+        self.assertSetEqual(set(plan), {"mean", "valid", "valid_values", "var", "std", "smoothed", "extrema"})
+        self.assertLess(plan.index("valid_values"), plan.index("var"))
+        self.assertLess(plan.index("smoothed"), plan.index("extrema"))
+
+    def test_plan_with_arguments(self):
+        plan = self.scheduler.plan(self.config, ["Hypoglycemia fraction", "Time in hypoglycemia", "CONGA"],
+                                   index_kwargs={"CONGA" : {"hours" : 2}})
+        threshold = DEFAULT_INDEX_KWARGS["Hypoglycemia fraction"]["threshold"]
+        self.assertListEqual(plan, [("below", threshold), "valid", "valid_count", ("lagged", 120)])
+
+    def test_intermediates_computed_once_and_only_when_needed(self):
+        names = ["Mean", "CV", "J-index", "Low Blood Glucose Index", "High Blood Glucose Index"]
+        shared = self.scheduler.intermediates_of(self.df[GLUCOSE], self.config)
+        self.scheduler.evaluate(shared, names)
+        self.assertEqual(len(shared.computed), len(set(shared.computed)))
+        self.assertSetEqual(set(shared.computed), set(self.scheduler.plan(self.config, names)))
+        self.assertNotIn("grade", shared.computed)
+        self.assertNotIn("extrema", shared.computed)
+
+    def test_every_index_declares_its_intermediates(self):
+        names = list(indices.INDICES_TO_CALC.keys())
+        shared = self.scheduler.intermediates_of(self.df[GLUCOSE], self.config)
+        for name in names:
+            before = set(shared.computed)
+            self.scheduler.evaluate(shared, [name])
+            declared = set(self.scheduler.plan(self.config, [name]))
+            self.assertTrue((set(shared.computed) - before) <= declared, name)
+
+    def test_custom_index_reuses_intermediates(self):
+        calls = []
+
+        def squared_deviations(shared):
+            calls.append(1)
+            return np.power(shared.valid_values - shared.mean, 2)
+
+        self.scheduler.register_intermediate("squared_deviations", squared_deviations, requires=["valid_values", "mean"])
+        self.scheduler.register_index("Mean squared deviation",
+                                      lambda shared: np.mean(shared.get("squared_deviations")),
+                                      requires=["squared_deviations"])
+        self.scheduler.register_index("Max deviation",
+                                      lambda shared: np.sqrt(np.max(shared.get("squared_deviations"))),
+                                      requires=["squared_deviations"])
+
+        res = BatchCalculator(self.config, scheduler=self.scheduler)(
+            self.df, indices=["Mean", "Mean squared deviation", "Max deviation"])
+        self.assertEqual(len(calls), 1)
+        self.assertAlmostEqual(res["Mean squared deviation"], np.nanvar(self.df[GLUCOSE]))
+        self.assertAlmostEqual(res["Max deviation"], np.nanmax(np.abs(self.df[GLUCOSE] - res["Mean"])))
+
+    def test_wrong_registrations(self):
+        with self.assertRaises(ValueError):
+            self.scheduler.register_intermediate("mean", lambda shared: 0)
+        with self.assertRaises(ValueError):
+            self.scheduler.register_index("Test", "test")
+        with self.assertRaises(ValueError):
+            self.scheduler.register_index("Test", lambda shared: 0, requires=["not an intermediate"])
+        with self.assertRaises(ValueError):
+            self.scheduler.plan(self.config, ["Not an index"])
+
+    def test_cyclic_intermediates(self):
+        self.scheduler.register_intermediate("a", lambda shared: 0, requires=["b"])
+        self.scheduler.register_intermediate("b", lambda shared: 0, requires=["a"])
+        self.scheduler.register_index("Test", lambda shared: shared.get("a"), requires=["a"])
+        with self.assertRaises(ValueError):
+            self.scheduler.plan(self.config, ["Test"])
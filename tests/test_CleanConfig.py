@@ -24,6 +24,13 @@ class TestCleanConfig(unittest.TestCase):
         with self.assertRaises(ValueError):
             CleanConfig(5, use_api=8)
 
+    def test_model_backend_default(self):
+        self.assertEqual(CleanConfig(5, False).model_backend, "tensorflow")
+
+    def test_model_backend_wrong(self):
+        with self.assertRaises(ValueError):
+            CleanConfig(5, False, model_backend="wrong_backend")
+
     def test_api_address_not_str(self):
         with self.assertRaises(ValueError):
             CleanConfig(5, False, api_address=4)
@@ -53,4 +60,16 @@ class TestCleanConfig(unittest.TestCase):
 
     def test_wrong_fill_glucose_tolerance(self):
         with self.assertRaises(ValueError):
-            CleanConfig(interval=5, use_api=False, fill_glucose_tolerance="wrong_value")
\ No newline at end of file
+            CleanConfig(interval=5, use_api=False, fill_glucose_tolerance="wrong_value")
+
+    def test_wrong_regularity_tolerance(self):
+        with self.assertRaises(ValueError):
+            CleanConfig(interval=5, use_api=False, regularity_tolerance=-1)
+        with self.assertRaises(ValueError):
+            CleanConfig(interval=5, use_api=False, regularity_tolerance="wrong_value")
+
+    def test_flagger(self):
+        self.assertEqual(CleanConfig(interval=5, use_api=False).flagger, "model")
+        self.assertEqual(CleanConfig(interval=5, use_api=False, flagger="grid").flagger, "grid")
+        with self.assertRaises(ValueError):
+            CleanConfig(interval=5, use_api=False, flagger="wrong_value")
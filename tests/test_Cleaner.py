@@ -1,10 +1,18 @@
+import os
+import tempfile
 import unittest
-import tensorflow as tf 
 import numpy as np 
 import glyculator.cleaner.config as config
 
-from glyculator.cleaner.Cleaner import Cleaner5, Cleaner
+from glyculator.cleaner.Cleaner import Cleaner5, Cleaner, NumpyDenseModel, export_numpy_weights
 
+try:
+    import tensorflow as tf
+except ImportError:
+    tf = None
+
+
+@unittest.skipIf(tf is None, "tensorflow is not installed")
 class TestCleaner(unittest.TestCase):
     def setUp(self):
         self.cleaner = Cleaner5()
@@ -81,4 +89,81 @@ class testCleanerBase(unittest.TestCase):
 
     def test_set_up_model(self):
         with self.assertRaises(NotImplementedError):
-            Cleaner().set_up_model()
\ No newline at end of file
+            Cleaner().set_up_model()
+
+
+@unittest.skipIf(tf is None, "tensorflow is not installed")
+class TestCleanerNumpyBackend(unittest.TestCase):
+    def setUp(self):
+        # Randomly initialized keras model - exported weights only need
+        # to reproduce its outputs
+        self.keras_model = Cleaner5._build_model()
+        self.keras_model({"numeric" : tf.zeros((1, config.WINDOW_SIZE - 1))})
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "weights.npz")
+        export_numpy_weights(self.keras_model, self.path)
+        self.cleaner = Cleaner5(backend="numpy", model_path=self.path)
+
+        np.random.seed(0)
+        self.many_cases_dict = {
+            "var" + str(i) : np.random.uniform(low=0, high=700, size=50) for i in range(config.WINDOW_SIZE - 1)
+        }
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_numpy_backend_loads_numpy_model(self):
+        self.assertIsInstance(self.cleaner.model, NumpyDenseModel)
+        self.assertEqual(len(self.cleaner.model.kernels), 12)
+
+    def test_predict_proba_same_as_keras(self):
+        matrix = self.cleaner._prepare_matrix(self.many_cases_dict, interval=5)
+        expected = np.array(tf.sigmoid(self.keras_model.predict({"numeric" : tf.convert_to_tensor(matrix)}))).flatten()
+        res = self.cleaner.predict_proba(self.many_cases_dict, interval=5)
+
+        np.testing.assert_allclose(res, expected, rtol=1e-4, atol=1e-6)
+
+    def test_predict_proba_shape_many_cases(self):
+        res = self.cleaner.predict_proba(self.many_cases_dict, interval=15)
+        self.assertTupleEqual(res.shape, (50, ))
+
+    def test_wrong_backend(self):
+        with self.assertRaises(ValueError):
+            Cleaner5(backend="wrong_backend")
+
+    def test_numpy_model_wrong_weights(self):
+        with self.assertRaises(ValueError):
+            NumpyDenseModel([], [])
+
+    def test_missing_archive(self):
+        with self.assertRaises(FileNotFoundError):
+            NumpyDenseModel.load(os.path.join(self.tmp_dir.name, "missing.npz"))
+
+
+@unittest.skipIf(tf is None, "tensorflow is not installed")
+class TestCleanerShippedWeights(unittest.TestCase):
+    def setUp(self):
+        try:
+            self.keras_cleaner = Cleaner5(backend="tensorflow")
+        except Exception as e:
+            self.skipTest("shipped weights could not be loaded: {}".format(e))
+
+        np.random.seed(0)
+        self.matrix = np.random.uniform(low=0, high=700, size=(200, config.WINDOW_SIZE - 1))
+        self.expected = self.keras_cleaner.predict_proba(self.matrix, interval=5)
+
+    def test_exported_weights_same_as_keras(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "weights.npz")
+            export_numpy_weights(self.keras_cleaner.model, path)
+            res = Cleaner5(backend="numpy", model_path=path).predict_proba(self.matrix, interval=5)
+
+        np.testing.assert_allclose(res, self.expected, rtol=1e-4, atol=1e-6)
+
+    def test_shipped_archive_same_as_keras(self):
+        if(not os.path.isfile(config.NUMPY_MODEL_PATH)):
+            self.skipTest("{} not exported".format(config.NUMPY_MODEL_PATH))
+        res = Cleaner5(backend="numpy").predict_proba(self.matrix, interval=5)
+
+        np.testing.assert_allclose(res, self.expected, rtol=1e-4, atol=1e-6)
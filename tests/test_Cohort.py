@@ -0,0 +1,108 @@
+import unittest
+import warnings
+
+import numpy as np
+import pandas as pd
+
+import glyculator.Index as indices
+from glyculator.Cohort import Cohort
+from glyculator.BatchCalculator import BatchCalculator
+from glyculator.utils import DT, GLUCOSE, DEFAULT_INDEX_KWARGS
+from glyculator.configs import CalcConfig
+
+
+def _patient(seed, periods):
+    random = np.random.RandomState(seed)
+    glucose = np.round(random.uniform(40, 300, periods))
+    glucose[random.choice(periods, periods // 20, replace=False)] = np.nan
+    return pd.DataFrame({
+        DT : pd.date_range("2020/11/19", freq="5min", periods=periods),
+        GLUCOSE : glucose,
+    })
+
+
+class TestCohort(unittest.TestCase):
+    def setUp(self):
+        self.config = CalcConfig(interval=5)
+        self.frames = {
+            "a" : _patient(0, 3 * 288),
+            "b" : _patient(1, 2 * 288 + 17),
+            "c" : _patient(2, 4 * 288),
+        }
+        # Hypoglycemia at the end of one patient and the beginning of the next one
+        self.frames["a"].loc[len(self.frames["a"]) - 2:, GLUCOSE] = 50
+        self.frames["b"].loc[:1, GLUCOSE] = 50
+        self.frames["c"].loc[100:110, GLUCOSE] = 50
+        self.cohort = Cohort.from_frames(self.frames)
+
+    def test_from_frames(self):
+        self.assertEqual(len(self.cohort), 3)
+        np.testing.assert_array_equal(self.cohort.offsets, [0, 864, 864 + 593, 864 + 593 + 1152])
+        pd.testing.assert_frame_equal(self.cohort.frame(1), self.frames["b"])
+
+    def test_all_indices_equal_single_indices(self):
+        res = self.cohort.calculate(self.config)
+
+        self.assertListEqual(list(res.index), ["a", "b", "c"])
+        self.assertListEqual(list(res.columns), list(indices.INDICES_TO_CALC.keys()))
+        for patient, df in self.frames.items():
+            for name, index_class in indices.INDICES_TO_CALC.items():
+                index = index_class(calc_config=self.config)
+                expected = index(df.copy(), **DEFAULT_INDEX_KWARGS.get(name, {}))
+                np.testing.assert_allclose(res.loc[patient, name], expected, rtol=1e-10,
+                                           err_msg="Index {} of {} differs".format(name, patient))
+
+    def test_events_do_not_cross_patients(self):
+        res = self.cohort.calculate(self.config, indices=["Hypoglycemic events No"],
+                                    index_kwargs={"Hypoglycemic events No" : {"threshold" : 60, "threshold_duration" : 15}})
+        expected = [indices.GVhypo_events_count(calc_config=self.config)(df.copy(), threshold=60)
+                    for df in self.frames.values()]
+        np.testing.assert_array_equal(res["Hypoglycemic events No"], expected)
+
+    def test_list_of_frames(self):
+        cohort = Cohort.from_frames(list(self.frames.values()))
+        res = cohort.calculate(self.config, indices=["Mean", "CONGA"], index_kwargs={"CONGA" : {"hours" : 2}})
+        self.assertListEqual(list(res.index), [0, 1, 2])
+        expected = indices.GVcongaX(calc_config=self.config)(self.frames["c"], hours=2)
+        self.assertAlmostEqual(res.loc[2, "CONGA"], expected)
+
+    def test_mmol_unit(self):
+        config = CalcConfig(interval=5, unit="mmol", tir_range=(3.9, 10.0))
+        frames = [df.assign(**{GLUCOSE : df[GLUCOSE] / 18}) for df in self.frames.values()]
+        names = ["M100", "GRADE", "eA1c", "Time in range"]
+        res = Cohort.from_frames(frames).calculate(config, indices=names)
+
+        for i, df in enumerate(frames):
+            for name in names:
+                expected = indices.INDICES_TO_CALC[name](calc_config=config)(df.copy())
+                self.assertAlmostEqual(res.loc[i, name], expected)
+
+    def test_threshold_arguments_match_batch_calculator(self):
+        names = ["Hypoglycemia fraction", "Hyperglycemia fraction", "Hypoglycemic events No",
+            "Time in hypoglycemia", "Mean duration of hypoglycemic event"]
+        df = self.frames["c"]
+        for name in names:
+            res = self.cohort.calculate(self.config, indices=[name], index_kwargs={name : {"threshold" : 70.5}})
+            expected = BatchCalculator(self.config, index_kwargs={name : {"threshold" : 70.5}})(df, [name])
+            self.assertAlmostEqual(res.loc["c", name], expected[name], msg=name)
+
+            for threshold in ["70", None]:
+                with self.assertRaises(ValueError, msg=name):
+                    BatchCalculator(self.config, index_kwargs={name : {"threshold" : threshold}})(df, [name])
+                with self.assertRaises(ValueError, msg=name):
+                    self.cohort.calculate(self.config, indices=[name], index_kwargs={name : {"threshold" : threshold}})
+
+    def test_missing_values_do_not_warn(self):
+        names = ["M100", "GRADE", "GRADE hypoglycemia", "GRADE hyperglycemia",
+            "Low Blood Glucose Index", "High Blood Glucose Index", "Hypoglycemia fraction", "Time in range"]
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            self.cohort.calculate(self.config, indices=names)
+
+    def test_unknown_index(self):
+        with self.assertRaises(ValueError):
+            self.cohort.calculate(self.config, indices=["Mean", "Not an index"])
+
+    def test_empty_patient(self):
+        with self.assertRaises(ValueError):
+            Cohort.from_frames([self.frames["a"], self.frames["a"].iloc[:0]])
@@ -0,0 +1,124 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from glyculator.Compact import DtypePolicy, CompactRecording, MISSING_GLUCOSE, MISSING_DATE
+from glyculator.BatchCalculator import BatchCalculator
+from glyculator.Cohort import Cohort
+from glyculator.FileReader import FileReader
+from glyculator.Synthetic import to_csv
+from glyculator.utils import DT, GLUCOSE
+from glyculator.configs import ReadConfig, CalcConfig
+
+
+class TestCompact(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(0)
+        periods = 3 * 288
+        glucose = np.round(np.random.uniform(40, 300, periods))
+        glucose[np.random.choice(periods, 30, replace=False)] = np.nan
+        self.df = pd.DataFrame({
+            DT : pd.date_range("2020/11/19", freq="5min", periods=periods),
+            GLUCOSE : glucose,
+        })
+        self.config = CalcConfig(interval=5)
+
+    def test_round_trip(self):
+        for dates in ["datetime64[s]", "int32"]:
+            for glucose in ["float32", "uint16"]:
+                recording = CompactRecording.from_frame(self.df, DtypePolicy(dates=dates, glucose=glucose))
+                self.assertEqual(recording.dates.dtype, np.dtype(dates))
+                self.assertEqual(recording.glucose.dtype, np.dtype(glucose))
+                pd.testing.assert_frame_equal(recording.to_frame(), self.df)
+
+    def test_missing_values_use_sentinels(self):
+        df = self.df.copy()
+        df.loc[3, DT] = pd.NaT
+        recording = CompactRecording.from_frame(df, DtypePolicy(dates="int32", glucose="uint16"))
+        self.assertEqual(recording.dates[3], MISSING_DATE)
+        self.assertEqual(np.sum(recording.glucose == MISSING_GLUCOSE), df[GLUCOSE].isnull().sum())
+        pd.testing.assert_frame_equal(recording.to_frame(), df)
+
+    def test_memory(self):
+        recording = CompactRecording.from_frame(self.df, DtypePolicy(dates="int32", glucose="uint16"))
+        self.assertEqual(recording.nbytes * 8 // 3, len(self.df) * 16)
+
+    def test_index_results_do_not_change(self):
+        expected = BatchCalculator(self.config)(self.df)
+        for glucose in ["float32", "uint16"]:
+            recording = CompactRecording.from_frame(self.df, DtypePolicy(glucose=glucose))
+            res = BatchCalculator(self.config)(recording)
+            for name in expected:
+                np.testing.assert_array_equal(res[name], expected[name], err_msg=name)
+
+        cohort = Cohort.from_frames([CompactRecording.from_frame(self.df), self.df])
+        res = cohort.calculate(self.config, indices=["Mean", "MODD"])
+        self.assertEqual(res.loc[0, "Mean"], res.loc[1, "Mean"])
+        self.assertEqual(res.loc[0, "MODD"], res.loc[1, "MODD"])
+
+    def test_mmol_values_with_decimals(self):
+        config = CalcConfig(interval=5, unit="mmol", tir_range=(3.9, 10.0))
+        df = self.df.copy()
+        df[GLUCOSE] = np.round(df[GLUCOSE] / 18, 1)
+        recording = CompactRecording.from_frame(df, DtypePolicy(glucose="float32", decimals=1))
+        np.testing.assert_array_equal(recording.decoded_glucose(), df[GLUCOSE].values)
+        expected = BatchCalculator(config)(df)
+        res = BatchCalculator(config)(recording)
+        for name in expected:
+            np.testing.assert_array_equal(res[name], expected[name], err_msg=name)
+
+    def test_default_policy_frame_is_lossless(self):
+        df = pd.DataFrame({
+            DT : pd.date_range("2020/11/19", freq="5min", periods=4),
+            GLUCOSE : ["3.9", "10.1", "", "5.55"],
+        })
+        res = DtypePolicy().frame(df)
+        self.assertEqual(res[GLUCOSE].dtype, np.float64)
+        np.testing.assert_array_equal(res[GLUCOSE].values, [3.9, 10.1, np.nan, 5.55])
+
+    def test_file_reader_policy(self):
+        read_config = ReadConfig(header_skip=2, date_time_column=0, glucose_values_column=1)
+        for columnar in [False, True]:
+            expected = FileReader("tests/test_files/csv-example1.csv", read_config=read_config, columnar=True).read_file()
+            df = FileReader("tests/test_files/csv-example1.csv", read_config=read_config, columnar=columnar,
+                            dtype_policy=DtypePolicy(glucose="uint16")).read_file()
+            self.assertEqual(df[DT].dtype, np.dtype("datetime64[ns]"))
+            self.assertEqual(df[GLUCOSE].dtype, np.float64)
+            np.testing.assert_array_equal(df[DT].values, expected[DT].values)
+            np.testing.assert_array_equal(df[GLUCOSE].values, expected[GLUCOSE].values)
+
+    def test_file_reader_policy_index_results_do_not_change(self):
+        config = CalcConfig(interval=5, unit="mmol", tir_range=(3.9, 10.0))
+        df = self.df.dropna().reset_index(drop=True)
+        df[GLUCOSE] = np.round(df[GLUCOSE] / 18, 1)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "mmol.csv")
+            read_config = to_csv(df, path)
+            for columnar in [False, True]:
+                expected = BatchCalculator(config)(
+                    FileReader(path, read_config=read_config, columnar=columnar).read_file())
+                res = BatchCalculator(config)(FileReader(path, read_config=read_config, columnar=columnar,
+                    dtype_policy=DtypePolicy(decimals=1)).read_file())
+                for name in expected:
+                    np.testing.assert_array_equal(res[name], expected[name], err_msg=name)
+
+    def test_wrong_arguments(self):
+        with self.assertRaises(ValueError):
+            DtypePolicy(dates="datetime64[ns]")
+        with self.assertRaises(ValueError):
+            DtypePolicy(glucose="int8")
+        with self.assertRaises(ValueError):
+            DtypePolicy(decimals=-1)
+        df = self.df.copy()
+        df.loc[0, GLUCOSE] = 100.5
+        with self.assertRaises(ValueError):
+            CompactRecording.from_frame(df, DtypePolicy(glucose="uint16"))
+        df = self.df.copy()
+        df.loc[0, DT] = df.loc[0, DT] + pd.Timedelta(milliseconds=1)
+        with self.assertRaises(ValueError):
+            CompactRecording.from_frame(df)
+        with self.assertRaises(ValueError):
+            FileReader(dtype_policy="test")
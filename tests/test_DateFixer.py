@@ -9,6 +9,7 @@ import requests
 import glyculator.DateFixer as DateFixer
 import glyculator.configs as configs
 from glyculator.cleaner.config import WINDOW_SIZE
+import glyculator.cleaner.PredictionCache as PredictionCache
 import glyculator.utils as utils
 
 class TestDateFixer(unittest.TestCase):
@@ -158,4 +159,73 @@ class TestDateFixer(unittest.TestCase):
 
         self.fixer_5(data=array, alternative_flagger=mocked_flagger)
 
-        mocked_flagger.assert_called_once_with(array)
\ No newline at end of file
+        mocked_flagger.assert_called_once_with(array)
+
+    def test_prepare_windows_are_views_of_the_records(self):
+        timepoints = pd.date_range("2020/08/11 12:00", "2020/08/11 13:00", freq="5min")
+        timepoints = timepoints.union(pd.date_range("2020/08/11 13:03", "2020/08/11 13:30", freq="3min"))
+        forward, reverse = self.fixer_5._prepare_windows(timepoints)
+        res_forward, res_reverse = self.fixer_5._prepare_timepoints_to_metronome(timepoints)
+
+        self.assertTupleEqual(forward.shape, (len(timepoints) - self.variables_no, self.variables_no))
+        self.assertFalse(forward.flags.writeable)
+        self.assertTrue(np.shares_memory(forward, reverse))
+        for i in range(self.variables_no):
+            np.testing.assert_array_equal(forward[:, i], res_forward["var" + str(i)])
+            np.testing.assert_array_equal(reverse[:, i], res_reverse["var" + str(i)])
+
+    def test_prepare_windows_short_measurement(self):
+        forward, reverse = self.fixer_5._prepare_windows(pd.date_range("2020/08/11", periods=5, freq="5min"))
+        self.assertTupleEqual(forward.shape, (0, self.variables_no))
+        self.assertTupleEqual(reverse.shape, (0, self.variables_no))
+
+    def test_predict_local_with_windows(self):
+        fixer = DateFixer.DateFixer(self.config_5)
+        fixer.prediction_cache = None
+        fixer._cleaner = mock.Mock()
+        forward, _ = fixer._prepare_windows(pd.date_range("2020/08/11", periods=30, freq="5min"))
+        fixer._predict_local(forward)
+        fixer._cleaner.predict_proba.assert_called_once_with(forward, interval=5)
+
+    def test_metronome_predict_local_one_batch(self):
+        np.random.seed(0)
+        steps = np.random.choice([300, 120, 180], size=200, p=[0.9, 0.05, 0.05])
+        dates = pd.Timestamp("2020/08/11") + pd.to_timedelta(np.cumsum(steps), unit="s")
+        weights = np.linspace(-1, 1, self.variables_no)
+
+        def fake_model(windows, interval):
+            return 1 / (1 + np.exp(-(np.asarray(windows) - 250) @ weights / 100))
+
+        fixer = DateFixer.DateFixer(self.config_5)
+        fixer.prediction_cache = PredictionCache.PredictionCache()
+        fixer._cleaner = mock.Mock()
+        fixer._cleaner.predict_proba.side_effect = fake_model
+        res = fixer._metronome_predict_local(dates)
+
+        self.assertEqual(fixer._cleaner.predict_proba.call_count, 1)
+        batch = fixer._cleaner.predict_proba.call_args[0][0]
+        forward, reverse = fixer._prepare_windows(dates)
+        self.assertLess(len(batch), len(forward) + len(reverse))
+        self.assertEqual(len(np.unique(batch, axis=0)), len(batch))
+
+        expected = fixer._merge_metronome_probabilities(fake_model(forward, 5), fake_model(reverse, 5))
+        np.testing.assert_array_equal(res, fixer._probas_to_predictions(expected))
+
+    def test_regular_measurement_needs_one_window(self):
+        fixer = DateFixer.DateFixer(self.config_5)
+        forward, reverse = fixer._prepare_windows(pd.date_range("2020/08/11", periods=300, freq="5min"))
+        windows, inverse = fixer._unique_windows(forward, reverse)
+        self.assertEqual(len(windows), 1)
+        self.assertEqual(len(inverse), 2 * len(forward))
+
+    def test_merge_metronome_probabilities_combined(self):
+        l1 = 19 * [10]
+        l2 = 19 * [20]
+        np.testing.assert_allclose(self.fixer_5._merge_metronome_probabilities(l1 + l2),
+                                   self.fixer_5._merge_metronome_probabilities(l1, l2))
+
+    def test_call_local(self):
+        fixer = DateFixer.DateFixer(self.config_5)
+        fixer._metronome_predict_local = mock.Mock(return_value=np.array([True]))
+        fixer(pd.date_range("2020/08/11", periods=30, freq="5min"))
+        fixer._metronome_predict_local.assert_called_once()
@@ -0,0 +1,43 @@
+import unittest
+
+import numpy as np
+
+from glyculator.Episodes import find_runs, find_episodes, EPISODE_COLUMNS
+
+
+class TestEpisodes(unittest.TestCase):
+    def test_find_runs(self):
+        starts, ends = find_runs([True, True, False, True, False, False, True])
+        np.testing.assert_array_equal(starts, [0, 3, 6])
+        np.testing.assert_array_equal(ends, [2, 4, 7])
+
+    def test_find_runs_no_runs(self):
+        starts, ends = find_runs([False, False])
+        self.assertEqual(len(starts), 0)
+        self.assertEqual(len(ends), 0)
+
+    def test_find_episodes_hypo(self):
+        glucose = [100, 60, 50, 100, 40, np.nan, 65]
+        res = find_episodes(glucose, interval=5, hypo_thresholds=[70])
+
+        self.assertListEqual(list(res.columns), EPISODE_COLUMNS)
+        np.testing.assert_array_equal(res["start"], [1, 4, 6])
+        np.testing.assert_array_equal(res["end"], [3, 5, 7])
+        np.testing.assert_array_equal(res["duration"], [10, 5, 5])
+        np.testing.assert_array_equal(res["nadir"], [50, 40, 65])
+        np.testing.assert_array_equal(res["peak"], [60, 40, 65])
+        np.testing.assert_allclose(res["auc"], [(10 + 20) * 5, 30 * 5, 5 * 5])
+
+    def test_find_episodes_many_thresholds(self):
+        glucose = [100, 60, 50, 100, 200, 260, 100]
+        res = find_episodes(glucose, interval=5, hypo_thresholds=[54, 70], hyper_thresholds=[180, 250])
+
+        self.assertListEqual(list(res["kind"]), ["hypo", "hypo", "hyper", "hyper"])
+        self.assertListEqual(list(res["threshold"]), [54, 70, 180, 250])
+        np.testing.assert_array_equal(res["records"], [1, 2, 2, 1])
+        np.testing.assert_array_equal(res["peak"], [50, 60, 260, 260])
+
+    def test_find_episodes_no_thresholds(self):
+        res = find_episodes([1, 2, 3], interval=5)
+        self.assertListEqual(list(res.columns), EPISODE_COLUMNS)
+        self.assertEqual(len(res), 0)
@@ -1,5 +1,5 @@
 import unittest
-from mock import Mock
+from mock import Mock, patch
 
 import pandas as pd 
 import numpy as np
@@ -7,7 +7,7 @@ import logging
 import logging.config
 import yaml
 
-from glyculator.FileCleaner import FileCleaner
+from glyculator.FileCleaner import FileCleaner, REGULAR_PATH, PARTIAL_PATH, MODEL_PATH
 from glyculator.utils import DT, GLUCOSE
 import glyculator.configs as configs
 
@@ -282,3 +282,89 @@ class TestFileCleaner(unittest.TestCase):
         })
 
         self.assertTrue(res.equals(expect))
+
+    def test_fill_glucose_values_with_nearest_precedence_and_report(self):
+        dates = pd.to_datetime(pd.Series([
+            "2020/08/18 12:00",
+            "2020/08/18 12:04",
+            "2020/08/18 12:05",
+            "2020/08/18 12:06",
+            "2020/08/18 12:10",
+            "2020/08/18 12:15",
+            "2020/08/18 12:20",
+        ]))
+        glucose = pd.Series([1, 2, np.nan, 3, np.nan, np.nan, 4], dtype=np.float64)
+        not_fixed = pd.DataFrame({DT : dates, GLUCOSE : glucose})
+        date_fixed = not_fixed.iloc[[0, 2, 4, 5, 6], :].copy()
+
+        fill_config = configs.CleanConfig(interval=5, use_api=False, fill_glucose_tolerance=2)
+        cleaner = FileCleaner(clean_config=fill_config)
+        filled = cleaner._fill_glucose_values_with_nearest(date_fixed, not_fixed)
+
+        # 12:05 takes the value after, 12:10 and 12:15 have no neighbours in tolerance
+        np.testing.assert_array_equal(filled[GLUCOSE].values, [1, 3, np.nan, np.nan, 4])
+        self.assertEqual(cleaner.tidy_report["Glucose values filled"], 1)
+
+    def test_fill_glucose_values_with_nearest_first_record(self):
+        dates = pd.to_datetime(pd.Series(["2020/08/18 12:00", "2020/08/18 12:05", "2020/08/18 12:06"]))
+        not_fixed = pd.DataFrame({DT : dates, GLUCOSE : [np.nan, 2.0, 3.0]})
+        date_fixed = not_fixed.iloc[[0, 1], :].copy()
+
+        fill_config = configs.CleanConfig(interval=5, use_api=False, fill_glucose_tolerance=2)
+        cleaner = FileCleaner(clean_config=fill_config)
+        filled = cleaner._fill_glucose_values_with_nearest(date_fixed, not_fixed)
+
+        # The first record has no record before it
+        self.assertTrue(np.isnan(filled[GLUCOSE].iloc[0]))
+
+
+class TestFileCleanerFixDatesPaths(unittest.TestCase):
+    def setUp(self):
+        self.config = configs.CleanConfig(interval=5, use_api=False)
+        # 2 seconds of jitter every reading
+        self.dates = pd.Series(pd.date_range("2020/08/18", periods=300, freq="5min")
+                               + pd.to_timedelta(np.tile([0, 2], 150), unit="s"))
+
+    def flagger(self, dates):
+        # Keeps readings at least 4 minutes after the previous one
+        differences = np.diff(np.asarray(dates, dtype="datetime64[ns]")) / np.timedelta64(1, "s")
+        return np.concatenate(([True], differences >= 240))
+
+    def test_regular_dates_skip_date_fixer(self):
+        cleaner = FileCleaner(clean_config=self.config)
+        with patch("glyculator.DateFixer.DateFixer") as date_fixer:
+            flags = cleaner.fix_dates(pd.DataFrame({DT : self.dates, GLUCOSE : 100.0}))
+            date_fixer.assert_not_called()
+        self.assertTrue(np.all(flags))
+        self.assertEqual(len(flags), len(self.dates))
+        self.assertEqual(cleaner.tidy_report["Date fixing path"], REGULAR_PATH)
+        self.assertEqual(cleaner.tidy_report["Records sent to date fixing model"], 0)
+
+    def test_only_irregular_stretches_go_to_date_fixer(self):
+        extra = [pd.Timestamp("2020/08/18 02:00:40"), pd.Timestamp("2020/08/18 20:00:40")]
+        dates = pd.Series(np.sort(np.concatenate((self.dates.values, np.array(extra, dtype="datetime64[ns]")))))
+        calls = []
+
+        def call(fixer, data):
+            calls.append(len(data))
+            return self.flagger(data)
+
+        cleaner = FileCleaner(clean_config=self.config)
+        with patch("glyculator.DateFixer.DateFixer.__call__", autospec=True, side_effect=call):
+            flags = cleaner.fix_dates(pd.DataFrame({DT : dates, GLUCOSE : 100.0}))
+
+        self.assertListEqual(calls, [31, 31])
+        self.assertEqual(cleaner.tidy_report["Date fixing path"], PARTIAL_PATH)
+        self.assertEqual(cleaner.tidy_report["Records sent to date fixing model"], 62)
+        np.testing.assert_array_equal(flags, ~dates.isin(extra).values)
+
+    def test_short_or_disabled_check_uses_date_fixer(self):
+        dates = pd.Series(pd.to_datetime(["2020/08/18 12:00", "2020/08/18 12:02", "2020/08/18 12:05"]))
+        for config in [self.config, configs.CleanConfig(interval=5, use_api=False, regularity_tolerance=None)]:
+            cleaner = FileCleaner(clean_config=config)
+            with patch("glyculator.DateFixer.DateFixer.__call__", autospec=True,
+                       side_effect=lambda fixer, data: self.flagger(data)) as call:
+                cleaner.fix_dates(pd.DataFrame({DT : dates, GLUCOSE : 100.0}))
+                call.assert_called_once()
+            self.assertEqual(cleaner.tidy_report["Date fixing path"], MODEL_PATH)
+            self.assertEqual(cleaner.tidy_report["Records sent to date fixing model"], 3)
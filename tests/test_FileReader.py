@@ -1,8 +1,11 @@
+import os
+import tempfile
 from datetime import datetime
 
 import unittest
 from unittest.mock import patch, Mock
 
+import numpy as np
 import pandas as pd
 
 from glyculator import FileReader
@@ -454,3 +457,64 @@ class TestFileReader(unittest.TestCase):
         self.assertTrue(res.equals(expected),
                         msg="Expected data frames to be equal: RES\n{}\nEXPECTED\n{}".format(res, expected))
 
+
+
+    def test_read_file_columnar_same_as_row_wise(self):
+        examples = [
+            ("tests/test_files/csv-example1.csv", ReadConfig(header_skip=2, date_time_column=0, glucose_values_column=1)),
+            ("tests/test_files/csv-example2.csv", ReadConfig(header_skip=2, date_column=2, time_column=3, glucose_values_column=1)),
+            ("tests/test_files/csv-example3.csv", ReadConfig(header_skip=2, date_column=2, time_column=3, glucose_values_column=1)),
+        ]
+        for file_name, read_config in examples:
+            expected = FileReader(file_name, read_config=read_config).read_file()
+            res = FileReader(file_name, read_config=read_config, columnar=True).read_file()
+            pd.testing.assert_frame_equal(res, expected)
+
+    def test_read_delimited_columnar_bad_cells(self):
+        lines = [
+            "dt,glucose",
+            "09/08/2019 08:00,78",
+            "not a date,80",
+            "09/08/2019 08:10,error",
+            "09/08/2019 08:15,",
+        ]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_name = os.path.join(tmp_dir, "bad_cells.csv")
+            with open(file_name, "w") as f:
+                f.write("\n".join(lines))
+            reader = FileReader(file_name, read_config=ReadConfig(header_skip=1, date_time_column=0, glucose_values_column=1),
+                                columnar=True)
+            res = reader.read_file()
+
+        expected = pd.DataFrame({
+            DT : pd.to_datetime(["2019-08-09 08:00", None, "2019-08-09 08:10", "2019-08-09 08:15"]),
+            GLUCOSE : [78.0, 80.0, np.nan, np.nan],
+        })
+        pd.testing.assert_frame_equal(res, expected)
+        self.assertEqual(reader.read_report["Unparsed dates"], 1)
+        self.assertEqual(reader.read_report["Unparsed glucose values"], 1)
+
+    def test_read_delimited_columnar_header_only(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_name = os.path.join(tmp_dir, "header_only.csv")
+            with open(file_name, "w") as f:
+                f.write("dt,glucose\n")
+            reader = FileReader(file_name, read_config=ReadConfig(header_skip=1, date_time_column=0, glucose_values_column=1),
+                                columnar=True)
+            with self.assertRaises(RuntimeError):
+                reader.read_file()
+
+    def test_read_delimited_columnar_empty_column(self):
+        examples = [
+            (["dt,glucose", ",78", ",80"], ReadConfig(header_skip=1, date_time_column=0, glucose_values_column=1)),
+            (["glucose,date,time", "78,09/08/2019,", "80,09/08/2019,"],
+                ReadConfig(header_skip=1, date_column=1, time_column=2, glucose_values_column=0)),
+        ]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for lines, read_config in examples:
+                file_name = os.path.join(tmp_dir, "empty_column.csv")
+                with open(file_name, "w") as f:
+                    f.write("\n".join(lines))
+                reader = FileReader(file_name, read_config=read_config, columnar=True)
+                with self.assertRaises(ValueError):
+                    reader.read_file()
@@ -0,0 +1,58 @@
+import unittest
+import warnings
+
+import numpy as np
+import pandas as pd
+
+import glyculator.Index as indices
+import glyculator.Formulas as formulas
+from glyculator.BatchCalculator import BatchCalculator
+from glyculator.Cohort import Cohort
+from glyculator.Histogram import GlucoseHistogram, HISTOGRAM_INDICES
+from glyculator.Summaries import GlucoseSummary
+from glyculator.utils import DT, GLUCOSE
+from glyculator.configs import CalcConfig
+
+
+class TestFormulas(unittest.TestCase):
+    def setUp(self):
+        self.config = CalcConfig(interval=5)
+        glucose = np.array([0, 45, 60, 100, np.nan, 180, 250, 400], dtype=np.float64)
+        self.df = pd.DataFrame({
+            DT : pd.date_range("2020/11/19", freq="5min", periods=len(glucose)),
+            GLUCOSE : glucose,
+        })
+
+    def test_undefined_values_are_nan(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            log10 = formulas.log10(np.array([-1, 0, np.nan, 100]))
+            risk = formulas.risk(formulas.log10(np.array([0.5, np.nan, 100])))
+            lbgi = formulas.bgi(risk, low=True)
+            grade = formulas.grade(np.array([0.1, np.nan, 5]))
+
+        np.testing.assert_array_equal(np.isnan(log10), [True, True, True, False])
+        np.testing.assert_array_equal(np.isnan(lbgi), [True, True, False])
+        np.testing.assert_array_equal(np.isnan(grade), [True, True, False])
+
+    def test_engines_agree_on_zero_glucose(self):
+        names = ["M100", "GRADE", "Low Blood Glucose Index", "High Blood Glucose Index"]
+        expected = {name : indices.INDICES_TO_CALC[name](calc_config=self.config)(self.df.copy()) for name in names}
+
+        batch = BatchCalculator(self.config).calculate(self.df.copy(), indices=names)
+        cohort = Cohort.from_frames([self.df.copy()]).calculate(self.config, indices=names)
+        histogram = GlucoseHistogram(self.df[GLUCOSE], self.config)
+        summary = GlucoseSummary.from_glucose(self.df[GLUCOSE], self.config).calculate(indices=names)
+
+        for name in names:
+            self.assertTrue(np.isfinite(expected[name]), name)
+            np.testing.assert_allclose(batch[name], expected[name], err_msg=name)
+            np.testing.assert_allclose(cohort[name][0], expected[name], err_msg=name)
+            np.testing.assert_allclose(HISTOGRAM_INDICES[name](histogram), expected[name], err_msg=name)
+            np.testing.assert_allclose(summary[name], expected[name], err_msg=name)
+
+    def test_time_in_range_bounds(self):
+        self.assertEqual(formulas.time_in_range_bounds(self.config), (70, 140))
+        self.assertEqual(formulas.time_in_range_bounds(self.config, upper_bound=180), (70, 180))
+        with self.assertRaises(ValueError):
+            formulas.time_in_range_bounds(self.config, lower_bound="70")
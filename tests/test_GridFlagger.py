@@ -0,0 +1,91 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+from mock import patch
+
+from glyculator.GridFlagger import align_to_grid
+from glyculator.Synthetic import SyntheticCGM, score_flags
+from glyculator.FileCleaner import FileCleaner
+import glyculator.DateFixer as DateFixer
+import glyculator.configs as configs
+from glyculator.utils import DT, GLUCOSE
+
+
+class TestGridFlagger(unittest.TestCase):
+    def setUp(self):
+        self.dates = pd.Series(pd.date_range("2020/08/11", periods=100, freq="5min"))
+
+    def test_regular_dates_are_kept(self):
+        self.assertTrue(np.all(align_to_grid(self.dates, 5)))
+        self.assertEqual(len(align_to_grid(self.dates[:1], 5)), 1)
+        self.assertEqual(len(align_to_grid([], 5)), 0)
+
+    def test_extra_readings_and_duplicates_are_dropped(self):
+        extras = pd.Series([self.dates[10] + pd.Timedelta(minutes=2), self.dates[40], self.dates[41]])
+        dates = pd.concat([self.dates, extras]).sort_values(kind="mergesort").reset_index(drop=True)
+        flags = align_to_grid(dates, 5)
+        self.assertEqual(flags.sum(), len(self.dates))
+        self.assertFalse(flags[11])
+        np.testing.assert_array_equal(dates[flags].values, self.dates.values)
+
+    def test_drift_and_gaps_are_followed(self):
+        drift = pd.to_timedelta(np.arange(100) * 3, unit="s")
+        dates = pd.Series(self.dates + drift).drop(range(20, 40)).reset_index(drop=True)
+        dates = pd.concat([dates, pd.Series([dates[60] + pd.Timedelta(seconds=90)])])
+        dates = dates.sort_values().reset_index(drop=True)
+        flags = align_to_grid(dates, 5)
+        self.assertEqual(flags.sum(), 80)
+        self.assertFalse(flags[61])
+
+    def test_readings_after_long_blocks_of_extra_dates_are_kept(self):
+        dates = pd.date_range("2020/08/11", periods=300, freq="5min")
+        last = dates[199]
+        blocks = [
+            [last] * 30,
+            [last + pd.Timedelta(seconds=second) for second in range(1, 31)],
+        ]
+        for block in blocks:
+            all_dates = pd.Series(list(dates[:200]) + block + list(dates[200:]))
+            flags = align_to_grid(all_dates, 5)
+            self.assertEqual(flags.sum(), 300)
+            np.testing.assert_array_equal(all_dates[flags].values, dates.values)
+
+    def test_readings_after_clock_reset_are_kept(self):
+        before = pd.date_range("2020/08/11 08:00", periods=100, freq="5min")
+        after = pd.date_range("2020/08/11 07:02", periods=100, freq="5min")
+        dates = pd.Series(list(before) + list(after))
+        flags = align_to_grid(dates, 5)
+        self.assertTrue(np.all(flags))
+
+        extra = pd.Series(list(before) + [before[-1] + pd.Timedelta(minutes=1)] + list(after))
+        flags = align_to_grid(extra, 5)
+        self.assertEqual(flags.sum(), 200)
+        self.assertFalse(flags[100])
+
+    def test_synthetic_recordings(self):
+        for interval in [5, 15]:
+            df = SyntheticCGM(interval=interval, seed=1, drift=30).generate(days=7)
+            score = score_flags(align_to_grid(df[DT], interval), df)
+            self.assertGreater(score["Accuracy"], 0.99)
+
+    def test_date_fixer_does_not_use_the_model(self):
+        config = configs.CleanConfig(interval=5, use_api=False, flagger="grid")
+        df = SyntheticCGM(interval=5, seed=0).generate(days=2)
+        fixer = DateFixer.DateFixer(config)
+        with patch.object(DateFixer.DateFixer, "_metronome_predict_local") as local, \
+            patch.object(DateFixer.DateFixer, "_metronome_predict") as api:
+            flags = fixer(df[DT])
+            tidy = FileCleaner(df[[DT, GLUCOSE]].copy(), config).tidy()
+        local.assert_not_called()
+        api.assert_not_called()
+        np.testing.assert_array_equal(flags, align_to_grid(df[DT], 5))
+        self.assertEqual(len(tidy), 2 * 288)
+
+    def test_wrong_arguments(self):
+        with self.assertRaises(ValueError):
+            align_to_grid(self.dates, 0)
+        with self.assertRaises(ValueError):
+            align_to_grid(self.dates, 5.0)
+        with self.assertRaises(ValueError):
+            align_to_grid(self.dates, 5, lookback=0)
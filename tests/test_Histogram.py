@@ -0,0 +1,70 @@
+import unittest
+import warnings
+
+import numpy as np
+import pandas as pd
+
+import glyculator.Index as indices
+from glyculator.Histogram import GlucoseHistogram, HISTOGRAM_INDICES, is_histogrammable, _lookup_table
+from glyculator.BatchCalculator import BatchCalculator
+from glyculator.utils import DT, GLUCOSE, DEFAULT_INDEX_KWARGS
+from glyculator.configs import CalcConfig
+
+
+class TestGlucoseHistogram(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(0)
+        periods = 2 * 288
+        glucose = np.random.randint(40, 401, periods).astype(np.float64)
+        glucose[np.random.choice(periods, 30, replace=False)] = np.nan
+        self.df = pd.DataFrame({
+            DT : pd.date_range("2020/11/19", freq="5min", periods=periods),
+            GLUCOSE : glucose,
+        })
+        self.config = CalcConfig(interval=5)
+        self.histogram = GlucoseHistogram(self.df[GLUCOSE], self.config)
+
+    def test_indices_equal_single_indices(self):
+        for name, evaluator in HISTOGRAM_INDICES.items():
+            kwargs = DEFAULT_INDEX_KWARGS.get(name, {})
+            expected = indices.INDICES_TO_CALC[name](calc_config=self.config)(self.df.copy(), **kwargs)
+            self.assertAlmostEqual(evaluator(self.histogram, **kwargs), expected,
+                                   msg="Index {} differs".format(name))
+
+    def test_undefined_table_values_do_not_warn(self):
+        _lookup_table.cache_clear()
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            for name in ["Low Blood Glucose Index", "High Blood Glucose Index", "GRADE", "M100"]:
+                HISTOGRAM_INDICES[name](self.histogram)
+
+    def test_median_even_and_odd(self):
+        self.assertEqual(GlucoseHistogram(np.array([1, 5, 3]), self.config).median(), 3)
+        self.assertEqual(GlucoseHistogram(np.array([1, 5, 3, 8]), self.config).median(), 4)
+
+    def test_values_above_table_size(self):
+        histogram = GlucoseHistogram(np.array([100, 1000]), self.config)
+        self.assertEqual(histogram.mean(), 550)
+
+    def test_not_integer_values(self):
+        self.assertFalse(is_histogrammable(np.array([100.5, 120])))
+        with self.assertRaises(ValueError):
+            GlucoseHistogram(np.array([100.5, 120]), self.config)
+
+    def test_mmol_not_histogrammable(self):
+        self.assertFalse(is_histogrammable(np.array([5.0, 6.0]), unit="mmol"))
+
+    def test_batch_calculator_with_histogram_checks_arguments(self):
+        for name, kwargs in [("Hypoglycemia fraction", {"threshold" : "70"}),
+            ("Hyperglycemia fraction", {"threshold" : "180"}), ("Time in hypoglycemia", {"threshold" : None}),
+            ("Time in range", {"lower_bound" : "70"})]:
+            for use_histogram in [False, True]:
+                calculator = BatchCalculator(self.config, index_kwargs={name : kwargs}, use_histogram=use_histogram)
+                with self.assertRaises(ValueError, msg="{} with use_histogram={}".format(name, use_histogram)):
+                    calculator(self.df, [name])
+
+    def test_batch_calculator_with_histogram(self):
+        expected = BatchCalculator(self.config)(self.df)
+        res = BatchCalculator(self.config, use_histogram=True)(self.df)
+        for name in expected:
+            np.testing.assert_allclose(res[name], expected[name], rtol=1e-10, err_msg="Index {} differs".format(name))
@@ -17,6 +17,29 @@ from glyculator.configs import CalcConfig
 # logging.basicConfig(level=logging.DEBUG, handlers=[logging.StreamHandler()])
 logger = logging.getLogger()
 
+
+def join_extremas_reference(minimas: list, maximas: list) -> list:
+    """Alternating join of extremas done one by one - reference for GVmage._join_extremas."""
+    minimas_turn = maximas[0] < minimas[0]
+    joined = [maximas[0] if minimas_turn else minimas[0]]
+    minimas_ind, maximas_ind = int(not minimas_turn), int(minimas_turn)
+    while(True):
+        if(minimas_turn):
+            if(minimas_ind >= len(minimas)):
+                return joined
+            if(minimas[minimas_ind] > joined[-1]):
+                joined.append(minimas[minimas_ind])
+                minimas_turn = False
+            minimas_ind = minimas_ind + 1
+        else:
+            if(maximas_ind >= len(maximas)):
+                return joined
+            if(maximas[maximas_ind] > joined[-1]):
+                joined.append(maximas[maximas_ind])
+                minimas_turn = True
+            maximas_ind = maximas_ind + 1
+
+
 class TestGVIndices(unittest.TestCase):
     def setUp(self):
         dates = pd.date_range(start="27-07-2020 12:00", end="29-07-2020 12:00", freq="5min"),
@@ -198,40 +221,13 @@ class TestGVIndices(unittest.TestCase):
         self.assertTrue(np.array_equal(index._moving_average(arr, window_size),
             np.array([2, 3.5, 5, 6.5])))
 
-    def test_mage_join_extremas_util(self):
-        index = indices.GVmage(df=self.simple_df, calc_config=self.mock_5_mg_config)
-        minimas = [1, 3, 5]
-        maximas = [2, 4, 6]
-        joined = [1]
-        minimas_turn = False
-        index._join_extremas_util(joined, minimas, maximas, 1, 0, minimas_turn)
-        self.assertListEqual(
-            list1=[1, 2, 3, 4, 5, 6],
-            list2=joined
-        )
-
-    def test_mage_join_extremas_util_different_lengths_arrays(self):
+    def test_mage_join_extremas_different_lengths_arrays(self):
         index = indices.GVmage(df=self.simple_df, calc_config=self.mock_5_mg_config)
         minimas = [1, 3, 5]
         maximas = [2, 4, 6, 7]
-        joined = [1]
-        minimas_turn = False
-        index._join_extremas_util(joined, minimas, maximas, 1, 0, minimas_turn)
-        self.assertListEqual(
-            list1=[1, 2, 3, 4, 5, 6],
-            list2=joined
-        )
-
-    def test_mage_join_extremas_util_maximas_first(self):
-        index = indices.GVmage(df=self.simple_df, calc_config=self.mock_5_mg_config)
-        minimas = [2, 4, 6]
-        maximas = [1, 3, 5]
-        joined = [1]
-        minimas_turn = True
-        index._join_extremas_util(joined, minimas, maximas, 0, 1, minimas_turn)
         self.assertListEqual(
             list1=[1, 2, 3, 4, 5, 6],
-            list2=joined
+            list2=index._join_extremas(minimas, maximas)
         )
 
     def test_mage_join_extremas_maximas_first(self):
@@ -265,6 +261,27 @@ class TestGVIndices(unittest.TestCase):
             )
         )
 
+    def test_mage_join_extremas_same_as_reference_random(self):
+        index = indices.GVmage(df=self.simple_df, calc_config=self.mock_5_mg_config)
+        random_state = np.random.RandomState(0)
+        for _ in range(50):
+            positions = random_state.permutation(200)[:60]
+            minimas = sorted(positions[:random_state.randint(1, 59)])
+            maximas = sorted(set(positions) - set(minimas))
+            expected = join_extremas_reference(minimas, maximas)
+            self.assertListEqual(index._join_extremas(minimas, maximas), expected)
+
+    def test_mage_long_measurement(self):
+        # Used to exceed the recursion limit
+        periods = 60 * 288
+        glucose = 150 + 50 * np.sin(np.arange(periods) * 2 * np.pi / 25)
+        long_df = pd.DataFrame({
+            DT : pd.date_range(start="27-07-2020 12:00", periods=periods, freq="5min"),
+            GLUCOSE : glucose,
+        })
+        index = indices.GVmage(df=long_df, calc_config=self.mock_5_mg_config)
+        self.assertGreater(index.calculate(), 0)
+
     def test_modd_all_values_are_the_same(self):
         # Mean of daily differences should obviously return 0 for a measurement
         # made up of all the same values
@@ -524,6 +541,17 @@ class TestGVIndices(unittest.TestCase):
             second=0
         )
 
+    def test_mean_hypo_event_duration_event_at_the_end(self):
+        simple_df = pd.DataFrame({
+            DT : pd.date_range(start="27-07-2020 12:00", periods=8, freq="5min"),
+            GLUCOSE : [10, 0, 0, 0, 10, 0, 0, 0]
+        })
+        index = indices.GVmean_hypo_event_duration(df=simple_df, calc_config=self.mock_5_mg_config)
+        self.assertEqual(
+            first=index.calculate(threshold=9, records_duration=15),
+            second=15
+        )
+
     def test_lbgi(self):
         index = indices.GVlbgi(df=self.simple_df, calc_config=self.mock_5_mg_config)
         self.assertAlmostEqual(
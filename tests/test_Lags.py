@@ -0,0 +1,44 @@
+import unittest
+
+import numpy as np
+
+from glyculator.Lags import lagged_differences, lag_to_records
+
+
+class TestLags(unittest.TestCase):
+    def test_lag_to_records(self):
+        self.assertEqual(lag_to_records(60, 5), 12)
+
+    def test_lag_to_records_not_multiple(self):
+        with self.assertRaises(ValueError):
+            lag_to_records(7, 5)
+
+    def test_lag_to_records_not_positive(self):
+        with self.assertRaises(ValueError):
+            lag_to_records(0, 5)
+
+    def test_lagged_differences_single_lag(self):
+        glucose = np.array([1, 2, 4, 8, np.nan, 32])
+        res = lagged_differences(glucose, 5, [10])
+        np.testing.assert_array_equal(res[10], [3, 6, np.nan, 24])
+
+    def test_lagged_differences_many_lags_share_buffer(self):
+        glucose = np.arange(100, dtype=np.float64) ** 2
+        res = lagged_differences(glucose, 15, [15, 30, 60])
+
+        for lag in [15, 30, 60]:
+            records = lag // 15
+            np.testing.assert_array_equal(res[lag], glucose[records:] - glucose[:-records])
+        self.assertTrue(np.shares_memory(res[15], res[60]) or res[15].base is res[60].base)
+        self.assertFalse(res[30].flags.writeable)
+
+    def test_lagged_differences_lag_longer_than_measurement(self):
+        res = lagged_differences(np.ones(5), 5, [60])
+        self.assertEqual(len(res[60]), 0)
+
+    def test_lagged_differences_daily_lag(self):
+        # One day of rising values repeated - daily differences are all equal
+        day = np.arange(288, dtype=np.float64)
+        glucose = np.concatenate((day, day + 10, day + 20))
+        res = lagged_differences(glucose, 5, [24 * 60])
+        np.testing.assert_array_equal(res[24 * 60], np.repeat(10, 2 * 288))
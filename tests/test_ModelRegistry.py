@@ -0,0 +1,95 @@
+import unittest
+import threading
+from mock import Mock, patch
+
+import glyculator.cleaner.ModelRegistry as ModelRegistry
+import glyculator.DateFixer as DateFixer
+import glyculator.configs as configs
+
+
+class TestModelRegistry(unittest.TestCase):
+    def setUp(self):
+        self.factory = Mock(side_effect=lambda: object())
+        self.registry = ModelRegistry.ModelRegistry(factories={"test" : self.factory})
+
+    def test_get_sets_up_model_once(self):
+        first = self.registry.get("test")
+        second = self.registry.get("test")
+
+        self.assertIs(first, second)
+        self.factory.assert_called_once_with()
+        self.assertIn("test", self.registry.load_times)
+
+    def test_get_unknown_model(self):
+        with self.assertRaises(ValueError):
+            self.registry.get("unknown")
+
+    def test_get_from_many_threads(self):
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.registry.get("test"))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.factory.assert_called_once_with()
+        self.assertEqual(len(set(id(model) for model in results)), 1)
+
+    def test_warm_up_reports_load_time(self):
+        times = self.registry.warm_up(["test"])
+        self.assertTrue(self.registry.is_loaded("test"))
+        self.assertGreaterEqual(times["test"], 0)
+
+        times = self.registry.warm_up(["test"])
+        self.assertEqual(times["test"], 0)
+        self.factory.assert_called_once_with()
+
+    def test_clear(self):
+        self.registry.get("test")
+        self.registry.clear()
+        self.assertFalse(self.registry.is_loaded("test"))
+        self.registry.get("test")
+        self.assertEqual(self.factory.call_count, 2)
+
+    def test_failed_set_up_is_not_retried(self):
+        factory = Mock(side_effect=OSError("missing weights"))
+        registry = ModelRegistry.ModelRegistry(factories={"test" : factory})
+        for _ in range(3):
+            with self.assertRaises(OSError):
+                registry.get("test")
+        factory.assert_called_once_with()
+        self.assertFalse(registry.is_loaded("test"))
+
+        registry.clear()
+        with self.assertRaises(OSError):
+            registry.get("test")
+        self.assertEqual(factory.call_count, 2)
+
+    def test_failed_set_up_is_retried_later(self):
+        model = object()
+        factory = Mock(side_effect=[OSError("missing weights"), model])
+        registry = ModelRegistry.ModelRegistry(factories={"test" : factory}, retry_seconds=60)
+        with patch.object(ModelRegistry.time, "monotonic", return_value=1000.0):
+            with self.assertRaises(OSError):
+                registry.get("test")
+        with patch.object(ModelRegistry.time, "monotonic", return_value=1030.0):
+            with self.assertRaises(OSError):
+                registry.get("test")
+        self.assertEqual(factory.call_count, 1)
+
+        # The weights were restored in the meantime
+        with patch.object(ModelRegistry.time, "monotonic", return_value=1061.0):
+            self.assertIs(registry.get("test"), model)
+        self.assertEqual(factory.call_count, 2)
+        self.assertTrue(registry.is_loaded("test"))
+
+    def test_date_fixers_share_model(self):
+        cleaner = Mock()
+        cleaner.predict_proba.return_value = [1]
+        with patch("glyculator.cleaner.ModelRegistry.get_model", return_value=cleaner) as mocked_get:
+            config = configs.CleanConfig(interval=5, use_api=False)
+            for _ in range(2):
+                DateFixer.DateFixer(config)._predict_local({"var0" : [300], "interval" : 5})
+
+        self.assertEqual(mocked_get.call_count, 2)
+        self.assertEqual(cleaner.predict_proba.call_count, 2)
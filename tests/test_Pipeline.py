@@ -0,0 +1,67 @@
+import unittest
+from mock import patch
+
+import numpy as np
+
+from glyculator.Pipeline import Pipeline, process_file, FILE, ERROR, STAGE_TIMES
+from glyculator.configs import ReadConfig, CleanConfig, CalcConfig
+
+
+def _all_true_flags(self, data_df):
+    return np.ones(len(data_df), dtype=bool)
+
+
+class TestPipeline(unittest.TestCase):
+    def setUp(self):
+        self.read_config = ReadConfig(header_skip=2, date_time_column=0, glucose_values_column=1)
+        self.clean_config = CleanConfig(interval=5, use_api=False)
+        self.calc_config = CalcConfig(interval=5)
+        self.indices = ["Mean", "Total time points No"]
+
+    @patch("glyculator.FileCleaner.FileCleaner.fix_dates", _all_true_flags)
+    def test_serial_run(self):
+        pipeline = Pipeline(self.read_config, self.clean_config, self.calc_config, indices=self.indices, workers=1)
+        res = pipeline(["tests/test_files/csv-example1.csv", "tests/test_files/missing.csv"])
+
+        self.assertListEqual(list(res.columns), [FILE] + self.indices + STAGE_TIMES + [ERROR])
+        self.assertListEqual(list(res[FILE]), ["tests/test_files/csv-example1.csv", "tests/test_files/missing.csv"])
+        self.assertIsNone(res.loc[0, ERROR])
+        self.assertAlmostEqual(res.loc[0, "Mean"], np.mean([78, 80, 83, 79]))
+        self.assertTrue(np.all(res.loc[0, STAGE_TIMES] >= 0))
+        self.assertTrue(res.loc[1, ERROR].startswith("FileNotFoundError"))
+        self.assertTrue(np.isnan(res.loc[1, "Mean"]))
+
+    def test_process_pool_isolates_failures_in_order(self):
+        files = ["tests/test_files/missing{}.csv".format(i) for i in range(4)] + ["tests/test_files/example.pdf"]
+        pipeline = Pipeline(self.read_config, self.clean_config, self.calc_config, indices=self.indices, workers=2)
+        res = pipeline(files)
+
+        self.assertListEqual(list(res[FILE]), files)
+        self.assertTrue(all(error.startswith("FileNotFoundError") for error in res[ERROR][:4]))
+        self.assertTrue(res[ERROR][4].startswith("ValueError"))
+
+    @patch("glyculator.cleaner.ModelRegistry.ModelRegistry.get", side_effect=OSError("missing weights"))
+    def test_model_is_not_set_up_when_not_needed(self, mocked_get):
+        files = ["tests/test_files/csv-example1.csv"] * 2
+        for clean_config in [self.clean_config, CleanConfig(interval=5, use_api=False, flagger="grid")]:
+            pipeline = Pipeline(self.read_config, clean_config, self.calc_config, indices=self.indices, workers=1)
+            res = pipeline(files)
+            self.assertTrue(res[ERROR].isnull().all())
+        mocked_get.assert_not_called()
+
+    def test_glob(self):
+        self.assertListEqual(
+            Pipeline.expand_files("tests/test_files/csv-example*.csv"),
+            ["tests/test_files/csv-example{}.csv".format(i) for i in range(1, 4)]
+        )
+
+    def test_process_file_never_raises(self):
+        res = process_file("tests/test_files/missing.csv", self.read_config, self.clean_config, self.calc_config)
+        self.assertIn("Read time", res)
+        self.assertIsNotNone(res[ERROR])
+
+    def test_wrong_configs(self):
+        with self.assertRaises(ValueError):
+            Pipeline("test", self.clean_config, self.calc_config)
+        with self.assertRaises(ValueError):
+            Pipeline(self.read_config, self.clean_config, self.calc_config, workers=0)
@@ -0,0 +1,95 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+from mock import Mock
+
+import glyculator.cleaner.PredictionCache as PredictionCache
+import glyculator.DateFixer as DateFixer
+import glyculator.configs as configs
+
+
+def fake_model(windows, interval):
+    return 1 / (1 + np.exp(-(np.sum(windows, axis=1) - 14 * 300) / (100 * interval)))
+
+
+class TestPredictionCache(unittest.TestCase):
+    def setUp(self):
+        self.predict = Mock(side_effect=fake_model)
+        self.cache = PredictionCache.PredictionCache()
+        self.windows = np.array([[300.0] * 14, [300.0] * 13 + [120.0], [300.0] * 14])
+
+    def test_only_distinct_windows_are_predicted(self):
+        res = self.cache.predict(self.windows, 5, self.predict)
+        np.testing.assert_allclose(res, fake_model(self.windows, 5))
+        self.predict.assert_called_once()
+        self.assertEqual(len(self.predict.call_args[0][0]), 2)
+        self.assertDictEqual(self.cache.stats(), {"hits" : 0, "misses" : 3, "hit_rate" : 0.0, "entries" : 2})
+
+    def test_cached_windows_skip_the_model(self):
+        self.cache.predict(self.windows, 5, self.predict)
+        res = self.cache.predict(self.windows[::-1], 5, self.predict)
+        np.testing.assert_allclose(res, fake_model(self.windows[::-1], 5))
+        self.assertEqual(self.predict.call_count, 1)
+        self.assertEqual(self.cache.hits, 3)
+
+    def test_key_contains_interval_and_model(self):
+        self.cache.predict(self.windows, 5, self.predict)
+        self.cache.predict(self.windows, 15, self.predict)
+        self.cache.predict(self.windows, 5, self.predict, model="other")
+        self.assertEqual(self.predict.call_count, 3)
+        self.assertEqual(len(self.cache), 6)
+
+    def test_windows_are_exact_by_default(self):
+        self.cache.predict(self.windows, 5, self.predict)
+        res = self.cache.predict(self.windows + 0.2, 5, self.predict)
+        self.assertEqual(self.predict.call_count, 2)
+        np.testing.assert_array_equal(res, fake_model(self.windows + 0.2, 5))
+
+    def test_windows_are_quantized_for_the_lookup(self):
+        cache = PredictionCache.PredictionCache(quantum=1.0)
+        windows = np.vstack([self.windows + 0.2, self.windows])
+        res = cache.predict(windows, 5, self.predict)
+        # The model gets the original windows
+        self.assertListEqual(sorted(map(tuple, self.predict.call_args[0][0])), sorted(map(tuple, windows[:2])))
+        np.testing.assert_array_equal(res, fake_model(self.windows + 0.2, 5)[[0, 1, 0, 0, 1, 0]])
+        cache.predict(self.windows - 0.2, 5, self.predict)
+        self.assertEqual(self.predict.call_count, 1)
+
+    def test_bounded_size(self):
+        cache = PredictionCache.PredictionCache(max_entries=2)
+        cache.predict(np.arange(14 * 3, dtype=np.float64).reshape(3, 14), 5, self.predict)
+        self.assertEqual(len(cache), 2)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.misses, 0)
+
+    def test_regular_recordings_need_one_window(self):
+        fixer = DateFixer.DateFixer(configs.CleanConfig(interval=5, use_api=False))
+        fixer.prediction_cache = self.cache
+        fixer._cleaner = Mock()
+        fixer._cleaner.predict_proba.side_effect = fake_model
+        for days in [1, 7]:
+            dates = pd.date_range("2020/08/11", periods=days * 288, freq="5min")
+            self.assertTrue(np.all(fixer._metronome_predict_local(dates)))
+        self.assertEqual(fixer._cleaner.predict_proba.call_count, 1)
+        self.assertEqual(len(fixer._cleaner.predict_proba.call_args[0][0]), 1)
+
+    def test_models_with_different_weights_are_cached_separately(self):
+        fixers = []
+        for model_path in ["first", "second"]:
+            fixer = DateFixer.DateFixer(configs.CleanConfig(interval=5, use_api=False))
+            fixer.prediction_cache = self.cache
+            fixer._cleaner = Mock(model_path=model_path)
+            fixer._cleaner.predict_proba.side_effect = fake_model
+            fixer._predict_local(self.windows)
+            fixers.append(fixer)
+        for fixer in fixers:
+            fixer._cleaner.predict_proba.assert_called_once()
+        self.assertEqual(len(self.cache), 4)
+
+    def test_wrong_arguments(self):
+        with self.assertRaises(ValueError):
+            PredictionCache.PredictionCache(max_entries=0)
+        with self.assertRaises(ValueError):
+            PredictionCache.PredictionCache(quantum=0)
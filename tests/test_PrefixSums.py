@@ -0,0 +1,75 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import glyculator.Index as indices
+from glyculator.PrefixSums import WindowIndex
+from glyculator.utils import DT, GLUCOSE
+from glyculator.configs import CalcConfig
+
+
+class TestWindowIndex(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(0)
+        periods = 7 * 288
+        glucose = np.round(np.random.uniform(40, 300, periods))
+        glucose[np.random.choice(periods, 60, replace=False)] = np.nan
+        self.df = pd.DataFrame({
+            DT : pd.date_range("2020/11/19", freq="5min", periods=periods),
+            GLUCOSE : glucose,
+        })
+        self.config = CalcConfig(interval=5)
+        self.index = WindowIndex(self.df, self.config)
+
+    def expected(self, start, end):
+        window = self.df[(self.df[DT] >= start) & (self.df[DT] < end)].reset_index(drop=True)
+        res = {}
+        for name in ["Total time points No", "Mean", "Standard deviation", "Time in range", "AUC"]:
+            res[name] = indices.INDICES_TO_CALC[name](calc_config=self.config)(window.copy())
+        for name in ["Hypoglycemia fraction", "Time in hypoglycemia"]:
+            res[name] = indices.INDICES_TO_CALC[name](calc_config=self.config)(window.copy(), threshold=70)
+        res["Hyperglycemia fraction"] = indices.GVhyperglycemia(calc_config=self.config)(window.copy(), threshold=180)
+        return res
+
+    def test_scalar_window(self):
+        start, end = pd.Timestamp("2020/11/20 22:00"), pd.Timestamp("2020/11/21 06:00")
+        expected = self.expected(start, end)
+        self.assertAlmostEqual(self.index.mean(start, end), expected["Mean"])
+        self.assertAlmostEqual(self.index.std(start, end), expected["Standard deviation"])
+        self.assertAlmostEqual(self.index.time_in_range(start, end), expected["Time in range"])
+        self.assertEqual(self.index.records(start, end), 96)
+
+    def test_batch_query_equals_single_indices(self):
+        starts = pd.date_range("2020/11/19 03:17", freq="7h", periods=20)
+        ends = starts + pd.Timedelta(hours=2)
+        res = self.index.query(starts, ends)
+
+        self.assertEqual(len(res), 20)
+        for i, (start, end) in enumerate(zip(starts, ends)):
+            for name, value in self.expected(start, end).items():
+                np.testing.assert_allclose(res.loc[i, name], value, rtol=1e-9,
+                                           err_msg="{} of window {} differs".format(name, i))
+
+    def test_auc_without_missing_values(self):
+        df = self.df.copy()
+        df[GLUCOSE] = df[GLUCOSE].fillna(100)
+        index = WindowIndex(df, self.config)
+        start, end = pd.Timestamp("2020/11/19 10:00"), pd.Timestamp("2020/11/22 10:00")
+        window = df[(df[DT] >= start) & (df[DT] < end)].reset_index(drop=True)
+        self.assertAlmostEqual(index.auc(start, end), indices.GVauc(calc_config=self.config)(window))
+        self.assertAlmostEqual(index.auc(start, end, standardize=False),
+                               indices.GVauc(calc_config=self.config)(window, standardize=False))
+
+    def test_empty_and_reversed_windows(self):
+        self.assertEqual(self.index.records("2021/01/01", "2021/01/02"), 0)
+        self.assertEqual(self.index.records("2020/11/20", "2020/11/19"), 0)
+        self.assertTrue(np.isnan(self.index.mean("2021/01/01", "2021/01/02")))
+
+    def test_wrong_arguments(self):
+        with self.assertRaises(ValueError):
+            WindowIndex("test", self.config)
+        with self.assertRaises(ValueError):
+            WindowIndex(self.df, "test")
+        with self.assertRaises(ValueError):
+            WindowIndex(self.df.iloc[::-1], self.config)
@@ -0,0 +1,112 @@
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+import mock
+
+from glyculator.BatchCalculator import BatchCalculator, IndexScheduler
+from glyculator.ResultCache import ResultCache, result_key
+from glyculator.utils import DT, GLUCOSE
+from glyculator.configs import CalcConfig
+
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(0)
+        self.df = pd.DataFrame({
+            DT : pd.date_range("2020/11/19", freq="5min", periods=600),
+            GLUCOSE : np.round(np.random.uniform(40, 300, 600)),
+        })
+        self.config = CalcConfig(interval=5)
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_key_depends_on_content(self):
+        key = result_key(self.df, self.config, ["Mean"])
+        self.assertEqual(key, result_key(self.df.copy(), CalcConfig(interval=5), ["Mean"]))
+
+        df = self.df.copy()
+        df.loc[10, GLUCOSE] += 1
+        self.assertNotEqual(key, result_key(df, self.config, ["Mean"]))
+        df = self.df.copy()
+        df[DT] = df[DT] + pd.Timedelta(minutes=1)
+        self.assertNotEqual(key, result_key(df, self.config, ["Mean"]))
+        self.assertNotEqual(key, result_key(self.df, CalcConfig(interval=5, tir_range=(70, 180)), ["Mean"]))
+        self.assertNotEqual(key, result_key(self.df, CalcConfig(interval=5, mage_window=5), ["Mean"]))
+        self.assertNotEqual(key, result_key(self.df, self.config, ["Mean", "CV"]))
+        self.assertNotEqual(result_key(self.df, self.config, ["CONGA"], {"CONGA" : {"hours" : 1}}),
+                            result_key(self.df, self.config, ["CONGA"], {"CONGA" : {"hours" : 2}}))
+
+    def test_key_depends_on_evaluation(self):
+        key = result_key(self.df, self.config, ["Mean"])
+        self.assertNotEqual(key, result_key(self.df, self.config, ["Mean"], use_histogram=True))
+        self.assertNotEqual(key, result_key(self.df, self.config, ["Mean"], version="1"))
+
+        cache = ResultCache()
+        BatchCalculator(self.config, cache=cache)(self.df, ["Mean"])
+        BatchCalculator(self.config, use_histogram=True, cache=cache)(self.df, ["Mean"])
+        self.assertEqual(cache.misses, 2)
+
+    def test_custom_indices_need_a_version(self):
+        cache = ResultCache()
+        scheduler = IndexScheduler()
+        scheduler.register_index("Mean", lambda shared: 0.0, requires=["mean"])
+        self.assertEqual(BatchCalculator(self.config, scheduler=scheduler, cache=cache)(self.df, ["Mean"]), {"Mean" : 0.0})
+        self.assertEqual(len(cache), 0)
+        self.assertNotEqual(BatchCalculator(self.config, cache=cache)(self.df, ["Mean"])["Mean"], 0.0)
+
+        scheduler = IndexScheduler(version="custom-1")
+        scheduler.register_index("Test", lambda shared: 1.0, requires=["mean"])
+        calculator = BatchCalculator(self.config, scheduler=scheduler, cache=cache)
+        calculator(self.df, ["Test"])
+        calculator(self.df, ["Test"])
+        self.assertEqual(cache.hits, 1)
+
+    def test_repeated_calculation_is_skipped(self):
+        cache = ResultCache()
+        calculator = BatchCalculator(self.config, cache=cache)
+        first = calculator(self.df)
+        with mock.patch("glyculator.BatchCalculator.IndexScheduler.evaluate") as evaluate:
+            second = calculator(self.df.copy())
+            self.assertFalse(evaluate.called)
+        self.assertDictEqual(first, second)
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(cache.misses, 1)
+
+    def test_lru_evicts_least_recently_used(self):
+        cache = ResultCache(max_entries=2)
+        cache.put("a", {"Mean" : 1})
+        cache.put("b", {"Mean" : 2})
+        cache.get("a")
+        cache.put("c", {"Mean" : 3})
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get("b"))
+        self.assertDictEqual(cache.get("a"), {"Mean" : 1})
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_disk_tier_survives_the_cache(self):
+        results = BatchCalculator(self.config, cache=ResultCache(directory=self.directory))(self.df, ["Mean", "MAGE"])
+
+        cache = ResultCache(directory=self.directory)
+        self.assertDictEqual(BatchCalculator(self.config, cache=cache)(self.df, ["Mean", "MAGE"]), results)
+        self.assertEqual(cache.disk_hits, 1)
+        self.assertEqual(len(cache), 1)
+
+        cache.clear(disk=True)
+        self.assertIsNone(cache.get(result_key(self.df, self.config, ["Mean", "MAGE"])))
+
+    def test_returned_results_are_copies(self):
+        cache = ResultCache()
+        cache.put("a", {"Mean" : 1})
+        cache.get("a")["Mean"] = 2
+        self.assertDictEqual(cache.get("a"), {"Mean" : 1})
+
+    def test_wrong_arguments(self):
+        with self.assertRaises(ValueError):
+            ResultCache(max_entries=-1)
+        with self.assertRaises(ValueError):
+            BatchCalculator(self.config, cache="test")
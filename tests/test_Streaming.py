@@ -0,0 +1,71 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import glyculator.Index as indices
+from glyculator.Streaming import StreamingAccumulator
+from glyculator.utils import DT, GLUCOSE, DEFAULT_INDEX_KWARGS
+from glyculator.configs import CalcConfig
+
+
+class TestStreamingAccumulator(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(0)
+        periods = 2 * 288
+        glucose = np.round(np.random.uniform(40, 300, periods))
+        glucose[np.random.choice(periods, 30, replace=False)] = np.nan
+        glucose[100:110] = 50
+        # Hypoglycemic event lasting until the end of the measurement
+        glucose[-5:] = 55
+        self.glucose = glucose
+        self.df = pd.DataFrame({
+            DT : pd.date_range("2020/11/19", freq="5min", periods=periods),
+            GLUCOSE : glucose,
+        })
+        self.config = CalcConfig(interval=5)
+
+    def test_indices_equal_single_indices(self):
+        accumulator = StreamingAccumulator(self.config)
+        accumulator.extend(self.glucose)
+        res = accumulator.indices()
+
+        for name, value in res.items():
+            index = indices.INDICES_TO_CALC[name](calc_config=self.config)
+            expected = index(self.df.copy(), **DEFAULT_INDEX_KWARGS.get(name, {}))
+            np.testing.assert_allclose(value, expected, rtol=1e-10, err_msg="Index {} differs".format(name))
+
+    def test_values_after_every_reading(self):
+        accumulator = StreamingAccumulator(self.config)
+        for i, value in enumerate(self.glucose[:120]):
+            accumulator.update(value)
+            df = self.df.iloc[:i + 1].copy()
+            self.assertAlmostEqual(accumulator.mean(), indices.GVMean(calc_config=self.config)(df))
+            self.assertEqual(accumulator.hypo_events_count(),
+                             indices.GVhypo_events_count(calc_config=self.config)(df, threshold=70))
+
+    def test_missing_readings(self):
+        accumulator = StreamingAccumulator(self.config)
+        accumulator.extend([100, None, float("nan"), 120])
+        self.assertEqual(accumulator.length, 4)
+        self.assertEqual(accumulator.valid_count, 2)
+        self.assertAlmostEqual(accumulator.mean(), 110)
+        self.assertAlmostEqual(accumulator.missing_values(), 0.5)
+
+    def test_empty(self):
+        accumulator = StreamingAccumulator(self.config)
+        self.assertTrue(np.isnan(accumulator.mean()))
+        self.assertTrue(np.isnan(accumulator.time_in_range()))
+        self.assertEqual(accumulator.hypo_events_count(), 0)
+
+    def test_reset(self):
+        accumulator = StreamingAccumulator(self.config)
+        accumulator.extend(self.glucose)
+        accumulator.reset()
+        accumulator.extend([100, 50, 50, 50])
+        self.assertEqual(accumulator.length, 4)
+        self.assertEqual(accumulator.hypo_events_count(), 1)
+
+    def test_calc_config_wrong_type(self):
+        with self.assertRaises(ValueError):
+            StreamingAccumulator("test")
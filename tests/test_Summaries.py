@@ -0,0 +1,101 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import glyculator.Index as indices
+from glyculator.Summaries import GlucoseSummary, SUMMARY_INDICES
+from glyculator.BatchCalculator import BatchCalculator
+from glyculator.utils import DT, GLUCOSE
+from glyculator.configs import CalcConfig
+
+
+class TestGlucoseSummary(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(0)
+        periods = 4 * 288
+        glucose = np.round(np.random.uniform(40, 300, periods))
+        glucose[np.random.choice(periods, 40, replace=False)] = np.nan
+        glucose[100:140] = 50
+        glucose[-3:] = 60
+        self.glucose = glucose
+        self.config = CalcConfig(interval=5)
+        self.calculator = BatchCalculator(self.config)
+
+    def frame(self, glucose):
+        return pd.DataFrame({
+            DT : pd.date_range("2020/11/19", freq="5min", periods=len(glucose)),
+            GLUCOSE : glucose,
+        })
+
+    def assert_indices_equal(self, res, glucose):
+        expected = self.calculator(self.frame(glucose), indices=list(res.keys()))
+        for name in res:
+            np.testing.assert_allclose(res[name], expected[name], rtol=1e-9, err_msg="Index {} differs".format(name))
+
+    def test_whole_measurement_equals_single_indices(self):
+        res = GlucoseSummary.from_glucose(self.glucose, self.config).calculate()
+        self.assertNotIn("MAGE", res)
+        self.assertListEqual(list(res.keys()), [name for name in indices.INDICES_TO_CALC if name != "MAGE"])
+        self.assert_indices_equal(res, self.glucose)
+
+    def test_merged_chunks_equal_whole_measurement(self):
+        # Chunks shorter and longer than the longest lag, split inside a hypoglycemic run
+        bounds = [0, 7, 120, 130, 131, 500, 1000, len(self.glucose)]
+        summaries = [GlucoseSummary.from_glucose(self.glucose[start:end], self.config)
+                     for start, end in zip(bounds[:-1], bounds[1:])]
+
+        res = GlucoseSummary.merge_all(summaries).calculate()
+        self.assert_indices_equal(res, self.glucose)
+
+        # Merging in a different grouping gives the same result
+        tree = (summaries[0] + summaries[1] + summaries[2]) + ((summaries[3] + summaries[4]) + (summaries[5] + summaries[6]))
+        for name, value in tree.calculate().items():
+            np.testing.assert_allclose(value, res[name], rtol=1e-9)
+
+    def test_merge_full_runs(self):
+        glucose = np.array([100, 50, 50, 50, 50, 50, 50, 100, 50, 50, 50, 50], dtype=np.float64)
+        summaries = [GlucoseSummary.from_glucose(glucose[i:i + 2], self.config) for i in range(0, len(glucose), 2)]
+        res = GlucoseSummary.merge_all(summaries).calculate(["Hypoglycemic events No", "Mean duration of hypoglycemic event"])
+        self.assertEqual(res["Hypoglycemic events No"], 2)
+        self.assertEqual(res["Mean duration of hypoglycemic event"], 25)
+
+    def test_pooled_measurements(self):
+        first, second = self.glucose[:500], self.glucose[500:]
+        pooled = GlucoseSummary.from_glucose(first, self.config).merge(
+            GlucoseSummary.from_glucose(second, self.config), contiguous=False)
+        self.assertTrue(pooled.sealed)
+
+        names = ["Mean", "Median", "Variance", "GRADE", "Time in range", "Low Blood Glucose Index"]
+        self.assert_indices_equal(pooled.calculate(names), self.glucose)
+
+        events = pooled.calculate(["Hypoglycemic events No"])["Hypoglycemic events No"]
+        expected = [indices.GVhypo_events_count(calc_config=self.config)(self.frame(part), threshold=70)
+                    for part in [first, second]]
+        self.assertEqual(events, sum(expected))
+
+        with self.assertRaises(ValueError):
+            pooled.merge(GlucoseSummary.from_glucose(first, self.config))
+
+    def test_untracked_lag(self):
+        summary = GlucoseSummary.from_glucose(self.glucose, self.config)
+        with self.assertRaises(ValueError):
+            summary.calculate(["CONGA"], index_kwargs={"CONGA" : {"hours" : 2}})
+
+        summary = GlucoseSummary.from_glucose(self.glucose, self.config, lags=[120])
+        res = summary.calculate(["CONGA"], index_kwargs={"CONGA" : {"hours" : 2}})
+        self.assertAlmostEqual(res["CONGA"], indices.GVcongaX(calc_config=self.config)(self.frame(self.glucose), hours=2))
+
+    def test_incompatible_summaries(self):
+        summary = GlucoseSummary.from_glucose(self.glucose, self.config)
+        with self.assertRaises(ValueError):
+            summary.merge(GlucoseSummary.from_glucose(self.glucose, self.config, lags=[60]))
+        with self.assertRaises(ValueError):
+            summary.merge(GlucoseSummary.from_glucose(self.glucose, CalcConfig(interval=15), lags=[60, 1440]))
+
+    def test_unknown_index(self):
+        with self.assertRaises(ValueError):
+            GlucoseSummary.from_glucose(self.glucose, self.config).calculate(["MAGE"])
+
+    def test_summary_indices_cover_index(self):
+        self.assertSetEqual(set(SUMMARY_INDICES), set(indices.INDICES_TO_CALC) - {"MAGE"})
@@ -0,0 +1,104 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from glyculator.Synthetic import SyntheticCGM, ON_GRID, to_csv, to_excel, score_flags
+from glyculator.FileReader import FileReader
+from glyculator.utils import DT, GLUCOSE
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+
+class TestSyntheticCGM(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.generator = SyntheticCGM(interval=5, seed=1, extra_fraction=0.05, duplicate_fraction=0.02,
+                                      gaps=3, empty_fraction=0.02)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_deterministic(self):
+        pd.testing.assert_frame_equal(self.generator(days=2), self.generator(days=2))
+        other = SyntheticCGM(interval=5, seed=2, extra_fraction=0.05)(days=2)
+        self.assertFalse(self.generator(days=2)[GLUCOSE].equals(other[GLUCOSE]))
+
+    def test_ground_truth(self):
+        df = self.generator(records=2000)
+        grid = df[df[ON_GRID]]
+
+        self.assertTrue(df[DT].is_monotonic_increasing)
+        self.assertLess(len(grid), 2000)
+        self.assertEqual(len(df) - len(grid), int(0.05 * len(grid)) + int(0.02 * len(grid)))
+        # Grid readings lie on the grid and are unique
+        self.assertTrue(np.all((grid[DT] - grid[DT].iloc[0]) % pd.Timedelta(minutes=5) == pd.Timedelta(0)))
+        self.assertFalse(grid[DT].duplicated().any())
+        # Extra readings are off the grid, duplicates repeat a grid reading
+        extra = df[~df[ON_GRID]]
+        off_grid = (extra[DT] - grid[DT].iloc[0]) % pd.Timedelta(minutes=5) != pd.Timedelta(0)
+        self.assertEqual(off_grid.sum(), int(0.05 * len(grid)))
+        self.assertTrue(extra.loc[~off_grid, DT].isin(grid[DT]).all())
+        self.assertEqual(grid[GLUCOSE].isnull().sum(), int(0.02 * len(grid)))
+
+    def test_drift(self):
+        df = SyntheticCGM(interval=5, drift=60, gaps=0, extra_fraction=0, duplicate_fraction=0)(days=1)
+        self.assertEqual(df[DT].iloc[-1] - df[DT].iloc[0], pd.Timedelta(minutes=5 * 287, seconds=round(287 * 60 * 5 / 1440)))
+
+    def test_csv_round_trip(self):
+        df = self.generator(days=1)
+        for layout in ["date_time", "date_and_time"]:
+            file_name = os.path.join(self.directory, "{}.csv".format(layout))
+            read_config = to_csv(df, file_name, layout=layout)
+            res = FileReader(file_name, read_config=read_config, columnar=True).read_file()
+            np.testing.assert_array_equal(res[DT].values, df[DT].values)
+            np.testing.assert_array_equal(res[GLUCOSE].values, df[GLUCOSE].values)
+
+    def test_csv_row_reader(self):
+        df = SyntheticCGM(interval=15, empty_fraction=0)(days=1)
+        file_name = os.path.join(self.directory, "test.txt")
+        read_config = to_csv(df, file_name, layout="date_and_time", delimiter="\t")
+        res = FileReader(file_name, read_config=read_config).read_file()
+        np.testing.assert_array_equal(pd.to_datetime(res[DT]).values, df[DT].values)
+
+    @unittest.skipIf(openpyxl is None, "openpyxl is not installed")
+    def test_excel_round_trip(self):
+        df = self.generator(days=1)
+        file_name = os.path.join(self.directory, "test.xlsx")
+        read_config = to_excel(df, file_name)
+        res = FileReader(file_name, read_config=read_config).read_file()
+        self.assertEqual(len(res), len(df))
+
+    @unittest.skipIf(openpyxl is not None, "openpyxl is installed")
+    def test_excel_without_openpyxl(self):
+        with self.assertRaises(ImportError):
+            to_excel(self.generator(days=1), os.path.join(self.directory, "test.xlsx"))
+
+    def test_score_flags(self):
+        df = self.generator(days=1)
+        self.assertEqual(score_flags(df[ON_GRID], df)["Accuracy"], 1)
+
+        flags = np.ones(len(df), dtype=bool)
+        flags[np.flatnonzero(df[ON_GRID])[0]] = False
+        score = score_flags(flags, df)
+        self.assertEqual(score["Dropped grid readings"], 1)
+        self.assertEqual(score["Kept extra readings"], (~df[ON_GRID]).sum())
+
+        with self.assertRaises(ValueError):
+            score_flags(flags[1:], df)
+
+    def test_wrong_arguments(self):
+        with self.assertRaises(ValueError):
+            SyntheticCGM(extra_fraction=2)
+        with self.assertRaises(ValueError):
+            SyntheticCGM(gap_length=(5, 1))
+        with self.assertRaises(ValueError):
+            self.generator()
+        with self.assertRaises(ValueError):
+            to_csv(self.generator(days=1), os.path.join(self.directory, "test.csv"), layout="test")